@@ -0,0 +1,134 @@
+# backend/benchmarks/async_capacity.py
+"""
+Compare how many concurrent students a sync (WSGI) and an async (ASGI)
+deployment can carry on the answer-submission hot path.
+
+Run both deployments on the same machine against the same database, e.g.
+
+    # sync workers, the current deployment
+    gunicorn cbt_project.wsgi:application -w 4 -b 127.0.0.1:8001
+    # async workers with the async exam views switched on
+    EXAMS_ASYNC_VIEWS=1 gunicorn cbt_project.asgi:application -w 4 \
+        -k uvicorn.workers.UvicornWorker -b 127.0.0.1:8002
+
+then
+
+    python -m benchmarks.async_capacity --exam-id 1 \
+        --target sync=http://127.0.0.1:8001 --target async=http://127.0.0.1:8002 \
+        --levels 25,50,100,200,400 --duration 20 --output capacity.json
+
+Every simulated student registers, starts the exam, loads the paper and then
+re-submits answers in a tight loop. For each concurrency level the script
+reports throughput and latency percentiles; the capacity of a target is the
+highest level whose p99 stays under --slo-ms with less than 1% errors.
+The exam must be active and must not be restricted to a single attempt that
+the throwaway students have already used up.
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .client import ApiError, new_run_id, register_student, summarize
+
+
+def answer_payload(question):
+    """A valid answer for any question type."""
+    payload = {'question_id': question['id']}
+    choices = question.get('choices') or []
+    if question['question_type'] == 'FB':
+        payload['answer_text'] = 'benchmark'
+    elif question['question_type'] == 'MS':
+        payload['answer_text'] = ','.join(str(c['id']) for c in choices[:1])
+    elif choices:
+        payload['chosen_choice_id'] = choices[0]['id']
+    return payload
+
+
+def prepare_student(base_url, run_id, index, exam_id, password):
+    client = register_student(base_url, run_id, index, password)
+    attempt = client.post(f'/api/exams/{exam_id}/start/')
+    questions = client.get(f'/api/exams/{exam_id}/questions/')
+    return client, attempt['id'], [answer_payload(q) for q in questions]
+
+
+def run_level(students, duration):
+    """Let every student submit answers for `duration` seconds."""
+    stop_at = time.perf_counter() + duration
+    lock = threading.Lock()
+    latencies, errors = [], [0]
+
+    def loop(student):
+        client, attempt_id, payloads = student
+        local, local_errors, i = [], 0, 0
+        while payloads and time.perf_counter() < stop_at:
+            try:
+                client.post(f'/api/attempts/{attempt_id}/submit-answer/', payloads[i % len(payloads)])
+                local.append(client.last[1])
+            except (ApiError, OSError):
+                local_errors += 1
+            i += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(students)) as pool:
+        list(pool.map(loop, students))
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+
+def benchmark_target(name, base_url, args):
+    run_id = new_run_id()
+    max_level = max(args.levels)
+    print(f"[{name}] preparing {max_level} students on {base_url} ...")
+    with ThreadPoolExecutor(max_workers=min(max_level, 32)) as pool:
+        students = list(pool.map(
+            lambda i: prepare_student(base_url, run_id, i, args.exam_id, args.password),
+            range(max_level)
+        ))
+
+    results, capacity = [], 0
+    for level in args.levels:
+        stats = run_level(students[:level], args.duration)
+        stats['concurrency'] = level
+        results.append(stats)
+        print(f"[{name}] c={level:<5} {stats['throughput_rps']:>8} req/s  "
+              f"p50={stats['p50_ms']}ms  p99={stats['p99_ms']}ms  errors={stats['error_rate']:.2%}")
+        if stats['p99_ms'] is not None and stats['p99_ms'] <= args.slo_ms and stats['error_rate'] < 0.01:
+            capacity = level
+
+    for client, _, _ in students:
+        client.close()
+    return {'base_url': base_url, 'capacity': capacity, 'levels': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--exam-id', type=int, required=True)
+    parser.add_argument('--target', action='append', required=True,
+                        help="name=base_url, e.g. sync=http://127.0.0.1:8001 (repeatable)")
+    parser.add_argument('--levels', type=lambda s: [int(x) for x in s.split(',')], default=[25, 50, 100, 200])
+    parser.add_argument('--duration', type=float, default=20, help="Seconds per concurrency level.")
+    parser.add_argument('--slo-ms', type=float, default=500, help="p99 latency budget for 'capacity'.")
+    parser.add_argument('--password', default='Bench-pass-2024!')
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    report = {}
+    for target in args.target:
+        name, _, base_url = target.partition('=')
+        report[name] = benchmark_target(name, base_url, args)
+
+    print()
+    for name, result in report.items():
+        print(f"{name:<10} capacity: {result['capacity']} concurrent students (p99 <= {args.slo_ms}ms)")
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# backend/benchmarks/client.py
+"""
+Stdlib-only HTTP client and latency helpers shared by the benchmark scripts.
+
+The scripts talk to a running server over HTTP, so they work the same against
+`manage.py runserver`, gunicorn (WSGI) or an ASGI server.
+"""
+import http.client
+import json
+import time
+import uuid
+from urllib.parse import urlsplit
+
+
+class ApiError(Exception):
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}: {body[:200]!r}")
+        self.status = status
+        self.body = body
+
+
+class ApiClient:
+    """One keep-alive connection to the API, authenticated with a DRF token."""
+
+    def __init__(self, base_url, token=None, timeout=30):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+        self.conn = None
+        # Filled in by request(): (status, seconds, response headers)
+        self.last = None
+
+    def _connect(self):
+        conn_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        self.conn = conn_class(self.host, timeout=self.timeout)
+
+    def request(self, method, path, data=None):
+        if self.conn is None:
+            self._connect()
+        headers = {'Accept': 'application/json'}
+        body = None
+        if data is not None:
+            body = json.dumps(data)
+            headers['Content-Type'] = 'application/json'
+        if self.token:
+            headers['Authorization'] = f"Token {self.token}"
+
+        started = time.perf_counter()
+        try:
+            self.conn.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            raw = response.read()
+        except (http.client.HTTPException, OSError):
+            # Drop the broken connection so the next request reconnects.
+            self.conn.close()
+            self.conn = None
+            raise
+        elapsed = time.perf_counter() - started
+        self.last = (response.status, elapsed, response.headers)
+
+        if response.status >= 400:
+            raise ApiError(response.status, raw)
+        return json.loads(raw) if raw else None
+
+    def get(self, path):
+        return self.request('GET', path)
+
+    def post(self, path, data=None):
+        return self.request('POST', path, data or {})
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def register_student(base_url, run_id, index, password, client=None):
+    """Register a throwaway student and return an authenticated ApiClient (`client`, if given)."""
+    client = client or ApiClient(base_url)
+    username = f"bench-{run_id}-{index}"
+    data = client.post('/api/auth/register/', {
+        'username': username,
+        'email': f"{username}@bench.invalid",
+        'first_name': 'Bench',
+        'last_name': str(index),
+        'password': password,
+        'password_confirm': password,
+    })
+    client.token = data['auth_token']
+    return client
+
+
+def new_run_id():
+    return uuid.uuid4().hex[:8]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies, errors, wall_seconds):
+    """Throughput and latency summary (milliseconds) for one batch of requests."""
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        'requests': total,
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'throughput_rps': round(len(latencies) / wall_seconds, 1) if wall_seconds else 0.0,
+        'p50_ms': _ms(percentile(latencies, 50)),
+        'p95_ms': _ms(percentile(latencies, 95)),
+        'p99_ms': _ms(percentile(latencies, 99)),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
@@ -0,0 +1,69 @@
+# backend/benchmarks/gradebook_read.py
+"""
+Class gradebook reads (exams/gradebook.py) on the configured database:
+
+    python manage.py generate_synthetic_data --students 2000 --exams 40 --classes 1 \
+        --bank-size 10 --paper-size 10 --answers 800000 --in-progress 0
+    python manage.py rebuild_gradebook
+    python -m benchmarks.gradebook_read [--student-class JSS1A] [--repeat 5]
+
+Times, per class (the largest one by default), building the grid from
+GradebookEntry (the ranked query, the exams and the students, plus
+rendering) and a read of the cached, rendered grid the gradebook endpoint
+serves until a result in the class changes. Reports the best of --repeat.
+"""
+import argparse
+import os
+import time
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cbt_project.settings')
+    import django
+    django.setup()
+
+
+def best_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--student-class', help="Default: the class with the most gradebook entries.")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models import Count
+
+    from cbt_project.fastjson import FastJSONRenderer
+    from exams.caching import get_gradebook, invalidate_gradebook
+    from exams.gradebook import class_gradebook
+    from exams.models import GradebookEntry
+
+    student_class = args.student_class
+    if student_class is None:
+        largest = (GradebookEntry.objects.values('student_class').annotate(n=Count('id')).order_by('-n').first())
+        if largest is None:
+            raise SystemExit("The gradebook is empty: run manage.py rebuild_gradebook first.")
+        student_class = largest['student_class']
+
+    def build():
+        return FastJSONRenderer().render(class_gradebook(student_class))
+
+    data = class_gradebook(student_class)
+    print(f"{student_class}: {len(data['students'])} students x {len(data['exams'])} exams")
+    print(f"  build and render  {best_ms(build, args.repeat):8.1f} ms")
+    invalidate_gradebook(student_class)
+    body = get_gradebook(student_class, build)
+    print(f"  cached read       {best_ms(lambda: get_gradebook(student_class, build), args.repeat):8.1f} ms"
+          f"  ({len(body) / 1e6:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
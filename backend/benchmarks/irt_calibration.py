@@ -0,0 +1,93 @@
+# backend/benchmarks/irt_calibration.py
+"""
+IRT calibration (exams/irt.py) on a synthetic response matrix:
+
+    python -m benchmarks.irt_calibration [--attempts 50000] [--questions 500] \
+        [--coverage 0.8] [--model 2pl] [--seed 0]
+    OMP_NUM_THREADS=1 python -m benchmarks.irt_calibration --exams 8 --workers 4
+
+Draws true abilities N(0, 1), discriminations lognormal around 1 and
+difficulties N(0, 1), simulates who answered what (each attempt sees
+--coverage of the questions) and times fit(). Reports the iterations, the
+time per iteration and how well the true parameters were recovered
+(correlation and RMSE). With --exams above 1 it fits that many matrices on
+a pool of --workers processes, the way manage.py calibrate_irt --workers
+does, and reports the throughput. No database is needed.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cbt_project.settings')
+    import django
+    django.setup()
+
+
+def simulate(attempts, questions, coverage, seed):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    ability = rng.standard_normal(attempts)
+    a = rng.lognormal(0, 0.3, questions)
+    b = rng.normal(0, 1, questions)
+    on_paper = rng.random((attempts, questions), dtype=np.float32) < coverage
+    correct = np.empty((attempts, questions), dtype=bool)
+    for start in range(0, attempts, 5000):  # keep the float64 temporaries small
+        p = 1 / (1 + np.exp(-a * (ability[start:start + 5000, None] - b)))
+        correct[start:start + 5000] = rng.random(p.shape) < p
+    return a, b, correct & on_paper, on_paper
+
+
+def fit_one(attempts, questions, coverage, seed, model):
+    """Simulate and fit one matrix: (seconds, iterations, converged, a, b, true a, true b)."""
+    from exams.irt import fit
+
+    a, b, correct, on_paper = simulate(attempts, questions, coverage, seed)
+    started = time.perf_counter()
+    calibration = fit(correct, on_paper, model=model)
+    return (time.perf_counter() - started, calibration.iterations, calibration.converged,
+            calibration.a, calibration.b, a, b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--attempts', type=int, default=50000)
+    parser.add_argument('--questions', type=int, default=500)
+    parser.add_argument('--coverage', type=float, default=0.8, help="Share of the questions on each paper.")
+    parser.add_argument('--model', choices=('1pl', '2pl'), default='2pl')
+    parser.add_argument('--exams', type=int, default=1, help="Matrices to fit.")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    import numpy as np
+
+    print(f"{args.attempts} attempts x {args.questions} questions, coverage {args.coverage}, {args.model}")
+    jobs = [(args.attempts, args.questions, args.coverage, args.seed + i, args.model) for i in range(args.exams)]
+    started = time.perf_counter()
+    if args.workers > 1 and args.exams > 1:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=setup_django,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = list(pool.map(fit_one, *zip(*jobs)))
+    else:
+        results = [fit_one(*job) for job in jobs]
+    elapsed = time.perf_counter() - started
+
+    print(f"{'exam':>4}{'fit s':>9}{'iter':>6}{'ms/iter':>9}{'r(b)':>8}{'rmse(b)':>9}{'r(a)':>8}")
+    for i, (seconds, iterations, converged, a, b, true_a, true_b) in enumerate(results):
+        r_a = np.corrcoef(a, true_a)[0, 1] if args.model == '2pl' else float('nan')
+        print(f"{i:>4}{seconds:>9.2f}{iterations:>6}{seconds / iterations * 1000:>9.1f}"
+              f"{np.corrcoef(b, true_b)[0, 1]:>8.4f}{np.sqrt(((b - true_b) ** 2).mean()):>9.4f}{r_a:>8.4f}"
+              f"{'' if converged else '  (did not converge)'}")
+    if args.exams > 1:
+        print(f"{args.exams} exams on {args.workers} worker(s) in {elapsed:.1f}s, simulation included: "
+              f"{args.exams / elapsed * 60:.1f} exams/minute")
+
+
+if __name__ == '__main__':
+    main()
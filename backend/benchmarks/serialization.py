@@ -0,0 +1,145 @@
+# backend/benchmarks/serialization.py
+"""
+Per-object serialization cost of the hot endpoints: DRF serializers against
+the lean serializer functions (exams/serializers.py), and DRF's JSON
+renderer against the orjson one (cbt_project/fastjson.py).
+
+    python -m benchmarks.serialization [--objects 200] [--repeat 5]
+
+Runs in-process on unsaved model instances and reports microseconds per
+object, best of --repeat runs. Both sides serialize the same in-memory data:
+the choices are set as prefetch_related() leaves them, rankings come from a
+private in-memory cache seeded with an empty tree, and any database query
+fails the run, so no database or server is needed.
+"""
+import argparse
+import os
+from contextlib import contextmanager
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cbt_project.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def isolated():
+    """
+    No database queries, and a private in-memory cache (nothing reaches the
+    configured one) seeded with an empty ranking for the benchmark's exam.
+    """
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import override_settings
+
+    from exams import ranking
+
+    def no_queries(execute, sql, params, many, context):
+        raise AssertionError(f"The benchmark queried the database: {sql}")
+
+    with override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'serialization-benchmark',
+        'OPTIONS': {'MAX_ENTRIES': ranking.BUCKETS + 100},
+    }}), connection.execute_wrapper(no_queries):
+        cache.set_many({ranking.node_key(1, index): 0 for index in range(1, ranking.BUCKETS + 1)}, None)
+        cache.set(ranking.ready_key(1), True, None)
+        yield
+
+
+def build_objects(n):
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+
+    from exams.models import Choice, Exam, ExamAttempt, Question, StudentAnswer
+
+    exam = Exam(id=1, title='Mathematics (SS1A)', duration_minutes=45, pass_mark=50, total_questions_to_ask=40)
+    student = get_user_model()(id=1, username='student', first_name='Ada', last_name='Obi')
+    now = timezone.now()
+    questions, answers, attempts = [], [], []
+    for i in range(n):
+        question = Question(id=i + 1, exam=exam, question_text=f"Question {i + 1}: which option is correct?",
+                            question_type='MC', score_points=Decimal('1.00'), question_id=uuid.uuid4())
+        question.paper_choices = [
+            Choice(id=4 * i + k, question=question, choice_text=f"Option {k}", choice_id=uuid.uuid4())
+            for k in range(4)
+        ]
+        # question.choices.all() as after prefetch_related('choices')
+        question._prefetched_objects_cache = {'choices': question.paper_choices}
+        questions.append(question)
+        answers.append(StudentAnswer(id=i + 1, question=question, chosen_choice=question.paper_choices[1],
+                                     answer_text='', is_correct=True, score=Decimal('1.00'), answer_id=uuid.uuid4()))
+        attempt = ExamAttempt(id=i + 1, exam=exam, student=student, start_time=now - timedelta(minutes=40),
+                              end_time=now, score=Decimal('31.00'), is_completed=True, question_count=40,
+                              attempt_id=uuid.uuid4())
+        attempt.correct_answer_count = 31
+        attempts.append(attempt)
+    return questions, answers, attempts
+
+
+def best_per_object(fn, n, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--objects', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.renderers import JSONRenderer
+
+    from cbt_project.fastjson import FastJSONRenderer, orjson
+    from exams.serializers import (
+        ExamAttemptResultSerializer, QuestionSerializer, StudentAnswerSerializer, attempt_result_data,
+        question_data, student_answer_data
+    )
+
+    n = args.objects
+    questions, answers, attempts = build_objects(n)
+
+    def drf_questions():
+        # What ExamQuestionsView.list() used to do
+        choice_serializer = QuestionSerializer().fields['choices'].child
+        out = []
+        for question in questions:
+            data = QuestionSerializer(question).data
+            data['choices'] = [choice_serializer.to_representation(c) for c in question.paper_choices]
+            out.append(data)
+        return out
+
+    cases = [
+        ('questions', drf_questions, lambda: [question_data(q, q.paper_choices) for q in questions]),
+        ('student answer', lambda: [StudentAnswerSerializer(a).data for a in answers],
+         lambda: [student_answer_data(a) for a in answers]),
+        ('attempt results', lambda: ExamAttemptResultSerializer(attempts, many=True).data,
+         lambda: [attempt_result_data(a) for a in attempts]),
+    ]
+
+    print(f"{n} objects, best of {args.repeat}; microseconds per object")
+    print(f"{'':<18}{'DRF':>10}{'lean':>10}{'speedup':>9}{'render':>10}{'orjson':>10}{'speedup':>9}")
+    with isolated():
+        for name, drf, lean in cases:
+            drf_us = best_per_object(drf, n, args.repeat)
+            lean_us = best_per_object(lean, n, args.repeat)
+            data = lean()
+            render_us = best_per_object(lambda: JSONRenderer().render(data), n, args.repeat)
+            fast_us = best_per_object(lambda: FastJSONRenderer().render(data), n, args.repeat)
+            print(f"{name:<18}{drf_us:>10.1f}{lean_us:>10.1f}{drf_us / lean_us:>8.1f}x"
+                  f"{render_us:>10.2f}{fast_us:>10.2f}{render_us / fast_us:>8.1f}x")
+    if orjson is None:
+        print("(orjson is not installed: the fast renderer fell back to the stdlib)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+# backend/benchmarks/session_load.py
+"""
+End-to-end exam sitting under load.
+
+Every simulated student runs a complete session against a live server:
+
+    register (or log in) -> list exams -> start -> fetch the paper ->
+    answer every question (MC/TF/MS/FB) -> submit -> view results -> history
+
+and the script reports, per endpoint, throughput, p50/p95/p99 latency, the
+error rate and the number of SQL queries per request. Query counts come from
+the X-Query-Count header, so start the server with QUERY_COUNT_HEADERS=1:
+
+    QUERY_COUNT_HEADERS=1 gunicorn cbt_project.wsgi:application -w 4 -b 127.0.0.1:8001
+    python -m benchmarks.session_load --base-url http://127.0.0.1:8001 \
+        --exam-id 1 --students 200 --concurrency 50 --save-baseline main
+
+Baselines are JSON files in benchmarks/baselines/. Compare a later run
+against one with --compare; the script exits with status 1 when an
+endpoint's p95 latency got worse by more than --tolerance or it runs more
+queries than before:
+
+    python -m benchmarks.session_load --base-url http://127.0.0.1:8001 \
+        --exam-id 1 --students 200 --concurrency 50 --compare main
+
+Use --users with a CSV of "email,password" lines to log existing students in
+instead of registering new ones (each must not have sat the exam yet).
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .client import ApiClient, ApiError, new_run_id, percentile, register_student, summarize
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+# Report order
+ENDPOINTS = [
+    'register', 'login', 'available-exams', 'start-exam', 'exam-questions',
+    'submit-answer', 'submit-exam', 'exam-results', 'past-attempts-history',
+]
+
+
+class Recorder:
+    """Thread-safe per-endpoint latencies, errors and query counts."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.queries = {}
+
+    def call(self, name, client, method, path, data=None):
+        if method == 'POST' and data is None:
+            data = {}
+        return self.timed(name, client, lambda: client.request(method, path, data))
+
+    def timed(self, name, client, request):
+        """Run request(), which talks to the API through `client`, and record it under `name`."""
+        try:
+            result = request()
+        except (ApiError, OSError):
+            with self.lock:
+                self.errors[name] = self.errors.get(name, 0) + 1
+            raise
+        _, seconds, headers = client.last
+        queries = headers.get('X-Query-Count')
+        with self.lock:
+            self.latencies.setdefault(name, []).append(seconds)
+            if queries is not None:
+                self.queries.setdefault(name, []).append(int(queries))
+        return result
+
+    def report(self, wall_seconds):
+        endpoints = {}
+        for name in ENDPOINTS:
+            if name not in self.latencies and name not in self.errors:
+                continue
+            stats = summarize(self.latencies.get(name, []), self.errors.get(name, 0), wall_seconds)
+            queries = sorted(self.queries.get(name, []))
+            stats['queries_avg'] = round(sum(queries) / len(queries), 2) if queries else None
+            stats['queries_p95'] = percentile(queries, 95)
+            stats['queries_max'] = queries[-1] if queries else None
+            endpoints[name] = stats
+        return endpoints
+
+
+def answer_payload(question, rng):
+    """A plausible answer: random choice(s) for MC/TF/MS, some text for FB."""
+    payload = {'question_id': question['id']}
+    choices = question.get('choices') or []
+    if question['question_type'] == 'FB':
+        payload['answer_text'] = rng.choice(['answer', 'paris', '42'])
+    elif question['question_type'] == 'MS':
+        picked = rng.sample(choices, k=min(len(choices), rng.randint(1, 2)))
+        payload['answer_text'] = ','.join(str(c['id']) for c in picked)
+    elif choices:
+        payload['chosen_choice_id'] = rng.choice(choices)['id']
+    return payload
+
+
+def run_session(base_url, index, args, run_id, recorder, credentials=None):
+    """One student's sitting. Returns the session's wall time, or None if it failed."""
+    rng = random.Random(f"{args.seed}_{index}")
+    client = ApiClient(base_url)
+    started = time.perf_counter()
+    try:
+        if credentials:
+            data = recorder.call('login', client, 'POST', '/api/auth/login/', {
+                'email': credentials[0], 'password': credentials[1]
+            })
+            client.token = data['auth_token']
+        else:
+            recorder.timed('register', client, lambda: register_student(
+                base_url, run_id, index, args.password, client=client
+            ))
+
+        exams = recorder.call('available-exams', client, 'GET', '/api/exams/available/')
+        exam_id = args.exam_id or exams[0]['id']
+        attempt = recorder.call('start-exam', client, 'POST', f'/api/exams/{exam_id}/start/')
+        questions = recorder.call('exam-questions', client, 'GET', f'/api/exams/{exam_id}/questions/')
+
+        for question in questions:
+            if args.think_ms:
+                time.sleep(rng.uniform(0, 2 * args.think_ms) / 1000)
+            recorder.call('submit-answer', client, 'POST', f"/api/attempts/{attempt['id']}/submit-answer/",
+                          answer_payload(question, rng))
+
+        recorder.call('submit-exam', client, 'POST', f"/api/attempts/{attempt['id']}/submit/")
+        recorder.call('exam-results', client, 'GET', f"/api/attempts/{attempt['id']}/results/")
+        recorder.call('past-attempts-history', client, 'GET', '/api/attempts/history/')
+        return time.perf_counter() - started
+    except (ApiError, OSError) as exc:
+        if args.verbose:
+            print(f"student {index}: {exc}", file=sys.stderr)
+        return None
+    finally:
+        client.close()
+
+
+def load_users(path):
+    with open(path, newline='') as fh:
+        return [(row[0].strip(), row[1].strip()) for row in csv.reader(fh) if len(row) >= 2]
+
+
+def compare(current, baseline, tolerance):
+    """Print per-endpoint deltas against a baseline; return the list of regressions."""
+    regressions = []
+    print(f"\n{'endpoint':<24}{'p95 ms (base -> now)':>26}{'queries max (base -> now)':>30}")
+    for name, now in current['endpoints'].items():
+        base = baseline['endpoints'].get(name)
+        if base is None:
+            continue
+        print(f"{name:<24}{str(base['p95_ms']) + ' -> ' + str(now['p95_ms']):>26}"
+              f"{str(base['queries_max']) + ' -> ' + str(now['queries_max']):>30}")
+        if base['p95_ms'] and now['p95_ms'] and now['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {now['p95_ms']}ms")
+        if base['queries_max'] is not None and now['queries_max'] is not None \
+                and now['queries_max'] > base['queries_max']:
+            regressions.append(f"{name}: queries {base['queries_max']} -> {now['queries_max']}")
+        if now['error_rate'] > base['error_rate'] + 0.01:
+            regressions.append(f"{name}: error rate {base['error_rate']:.2%} -> {now['error_rate']:.2%}")
+    return regressions
+
+
+def baseline_path(name):
+    return name if name.endswith('.json') else os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', required=True)
+    parser.add_argument('--exam-id', type=int, help="Defaults to the first available exam.")
+    parser.add_argument('--students', type=int, default=50, help="Number of sessions to run.")
+    parser.add_argument('--concurrency', type=int, default=25, help="Sessions running at the same time.")
+    parser.add_argument('--think-ms', type=float, default=0, help="Average pause before each answer.")
+    parser.add_argument('--users', help="CSV of email,password to log in instead of registering.")
+    parser.add_argument('--password', default='Bench-pass-2024!')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-baseline', metavar='NAME', help="Save the results as benchmarks/baselines/NAME.json.")
+    parser.add_argument('--compare', metavar='NAME', help="Compare against a saved baseline (name or path).")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative p95 slowdown for --compare.")
+    parser.add_argument('--output', help="Also write the results as JSON to this file.")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    users = load_users(args.users) if args.users else None
+    if users is not None and len(users) < args.students:
+        parser.error(f"--users has {len(users)} students, --students asks for {args.students}")
+
+    run_id = new_run_id()
+    recorder = Recorder()
+    print(f"running {args.students} sessions, {args.concurrency} at a time, against {args.base_url} ...")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        durations = list(pool.map(
+            lambda i: run_session(args.base_url, i, args, run_id, recorder, users[i] if users else None),
+            range(args.students)
+        ))
+    wall = time.perf_counter() - started
+
+    completed = sorted(d for d in durations if d is not None)
+    result = {
+        'meta': {
+            'base_url': args.base_url,
+            'exam_id': args.exam_id,
+            'students': args.students,
+            'concurrency': args.concurrency,
+            'think_ms': args.think_ms,
+            'python': platform.python_version(),
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'sessions': {
+            'completed': len(completed),
+            'failed': len(durations) - len(completed),
+            'wall_seconds': round(wall, 2),
+            'p50_seconds': round(percentile(completed, 50), 3) if completed else None,
+            'p95_seconds': round(percentile(completed, 95), 3) if completed else None,
+        },
+        'endpoints': recorder.report(wall),
+    }
+
+    print(f"\n{'endpoint':<24}{'req':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>8}{'queries':>9}")
+    for name, stats in result['endpoints'].items():
+        print(f"{name:<24}{stats['requests']:>7}{stats['throughput_rps']:>9}{stats['p50_ms']!s:>9}"
+              f"{stats['p95_ms']!s:>9}{stats['p99_ms']!s:>9}{stats['error_rate']:>8.2%}"
+              f"{stats['queries_max']!s:>9}")
+    sessions = result['sessions']
+    print(f"\nsessions: {sessions['completed']} completed, {sessions['failed']} failed, "
+          f"p50 {sessions['p50_seconds']}s, wall {sessions['wall_seconds']}s")
+    if all(stats['queries_max'] is None for stats in result['endpoints'].values()):
+        print("(no X-Query-Count headers: start the server with QUERY_COUNT_HEADERS=1 for query counts)")
+
+    for path in filter(None, [args.output, args.save_baseline and baseline_path(args.save_baseline)]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as fh:
+            json.dump(result, fh, indent=2)
+        print(f"results written to {path}")
+
+    if args.compare:
+        with open(baseline_path(args.compare)) as fh:
+            baseline = json.load(fh)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print("\nregressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# backend/benchmarks/start_burst.py
+"""
+Exam-start burst: N students press Start within a short window, the way a
+class does when the invigilator says "begin".
+
+    python -m benchmarks.start_burst --base-url http://127.0.0.1:8001 \
+        --exam-id 1 --students 1000 --window 10 --double-click 0.2
+
+Students are registered up front (not timed). Each then sends POST
+/api/exams/<id>/start/ at a random moment inside --window seconds; a
+--double-click fraction of them sends a second Start right behind the first.
+The script reports overall and per-second latency percentiles, so you can
+check that p99 stays flat while the burst builds up, and it verifies that no
+student ended up with two attempts (both clicks must return the same attempt).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from .client import ApiClient, ApiError, new_run_id, register_student, summarize
+
+
+def press_start(client, exam_id):
+    """Returns (status, seconds, attempt_id) for one Start click."""
+    try:
+        data = client.post(f'/api/exams/{exam_id}/start/')
+        return client.last[0], client.last[1], data.get('id')
+    except ApiError as exc:
+        return exc.status, client.last[1], None
+    except OSError:
+        return None, None, None
+
+
+def run_burst(base_url, students, args):
+    rng = random.Random(args.seed)
+    schedule = sorted((rng.uniform(0, args.window), i) for i in range(len(students)))
+    double = {i for i in range(len(students)) if rng.random() < args.double_click}
+    lock = threading.Lock()
+    results = []  # (offset, student index, status, seconds, attempt_id)
+    begin = time.perf_counter() + 1.0
+
+    def student_job(offset, index):
+        clients = [students[index]]
+        if index in double:
+            # The second click races the first on its own connection.
+            clients.append(ApiClient(base_url, token=students[index].token))
+        delay = begin + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        threads, outcomes = [], []
+        for client in clients:
+            thread = threading.Thread(target=lambda c=client: outcomes.append(press_start(c, args.exam_id)))
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        for client in clients[1:]:
+            client.close()
+        with lock:
+            results.extend((offset, index, *outcome) for outcome in outcomes)
+
+    with ThreadPoolExecutor(max_workers=len(schedule)) as pool:
+        list(pool.map(lambda job: student_job(*job), schedule))
+    wall = time.perf_counter() - begin
+    return results, wall
+
+
+def report(results, wall):
+    ok = [r for r in results if r[2] in (200, 201)]
+    errors = len(results) - len(ok)
+    overall = summarize([r[3] for r in ok], errors, wall)
+
+    per_second = defaultdict(list)
+    for offset, _, _, seconds, _ in ok:
+        per_second[int(offset)].append(seconds)
+    buckets = []
+    for second in sorted(per_second):
+        stats = summarize(per_second[second], 0, 1)
+        buckets.append({'second': second, 'requests': stats['requests'],
+                        'p50_ms': stats['p50_ms'], 'p99_ms': stats['p99_ms']})
+
+    attempts = defaultdict(set)
+    for _, index, _, _, attempt_id in ok:
+        attempts[index].add(attempt_id)
+    duplicated = sorted(index for index, ids in attempts.items() if len(ids) > 1)
+    return {
+        'overall': overall,
+        'per_second': buckets,
+        'created': sum(1 for r in ok if r[2] == 201),
+        'resumed': sum(1 for r in ok if r[2] == 200),
+        'students_with_duplicate_attempts': duplicated,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', required=True)
+    parser.add_argument('--exam-id', type=int, required=True)
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--window', type=float, default=10, help="Seconds over which the Start clicks arrive.")
+    parser.add_argument('--double-click', type=float, default=0.1,
+                        help="Fraction of students that click Start twice at once.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--password', default='Bench-pass-2024!')
+    parser.add_argument('--output', help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    run_id = new_run_id()
+    print(f"registering {args.students} students on {args.base_url} ...")
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        students = list(pool.map(
+            lambda i: register_student(args.base_url, run_id, i, args.password), range(args.students)
+        ))
+
+    for client in students:
+        # Registration connections would have gone idle by now: every click opens a fresh one.
+        client.close()
+
+    print(f"{args.students} students press Start within {args.window}s ...")
+    results, wall = run_burst(args.base_url, students, args)
+    for client in students:
+        client.close()
+
+    summary = report(results, wall)
+    overall = summary['overall']
+    print(f"requests={overall['requests']} errors={overall['error_rate']:.2%} "
+          f"p50={overall['p50_ms']}ms p95={overall['p95_ms']}ms p99={overall['p99_ms']}ms")
+    for bucket in summary['per_second']:
+        print(f"  t={bucket['second']:>3}s  n={bucket['requests']:<5} "
+              f"p50={bucket['p50_ms']}ms  p99={bucket['p99_ms']}ms")
+    print(f"created={summary['created']} resumed={summary['resumed']} "
+          f"duplicate attempts={len(summary['students_with_duplicate_attempts'])}")
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(summary, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
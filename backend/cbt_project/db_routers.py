@@ -0,0 +1,140 @@
+# backend/cbt_project/db_routers.py
+"""
+Read-replica routing.
+
+Reads only go to the replica inside a `replica_reads()` block (results,
+history, catalog and reporting code paths). Everything else, every write and
+anything inside a transaction stays on the primary.
+
+Read-your-writes: ReplicaPinningMiddleware remembers callers (by auth token or
+session) that wrote to the database and keeps their reads on the primary for
+REPLICA_PIN_SECONDS, so a student who just submitted sees their own result.
+"""
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_routing_state = ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+    """Per-request routing flags, shared by the router and the middleware."""
+    __slots__ = ('caller', 'pinned', 'wrote', 'replica_depth')
+
+    def __init__(self, caller=None):
+        self.caller = caller
+        self.pinned = None  # looked up lazily, only when a replica read happens
+        self.wrote = False
+        self.replica_depth = 0
+
+    def is_pinned(self):
+        if self.pinned is None:
+            self.pinned = bool(self.caller and cache.get(pin_cache_key(self.caller)))
+        return self.pinned
+
+
+def replica_alias():
+    return getattr(settings, 'REPLICA_DATABASE_ALIAS', None)
+
+
+def pin_cache_key(caller):
+    return f"db:pin:{caller}"
+
+
+def caller_key(request):
+    """A stable, non-reversible id for whoever sent the request."""
+    credentials = (
+        request.headers.get('Authorization')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credentials:
+        return None
+    return hashlib.sha256(credentials.encode()).hexdigest()[:32]
+
+
+def mark_primary_write():
+    """Record a write the router cannot see (raw SQL on the primary)."""
+    state = _routing_state.get()
+    if state is not None:
+        state.wrote = True
+
+
+@contextmanager
+def replica_reads():
+    """Allow the reads inside this block to be served by the read replica."""
+    state = _routing_state.get()
+    token = None
+    if state is None:
+        state = RoutingState()
+        token = _routing_state.set(state)
+    state.replica_depth += 1
+    try:
+        yield
+    finally:
+        state.replica_depth -= 1
+        if token is not None:
+            _routing_state.reset(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        state = _routing_state.get()
+        if alias is None or state is None or not state.replica_depth or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if state.is_pinned():
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Always the primary, even for instances that were loaded from the replica.
+        mark_primary_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so objects from either can be related.
+        return True
+
+
+class ReplicaPinningMiddleware:
+    """Keep callers on the primary for a short window after they write."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(caller_key(request))
+        token = _routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        if state.wrote and state.caller:
+            cache.set(pin_cache_key(state.caller), True, self.pin_seconds)
+        return response
+
+    async def __acall__(self, request):
+        state = RoutingState(caller_key(request))
+        token = _routing_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        if state.wrote and state.caller:
+            await cache.aset(pin_cache_key(state.caller), True, self.pin_seconds)
+        return response
@@ -0,0 +1,68 @@
+# backend/cbt_project/fastjson.py
+"""
+Drop-in replacements for DRF's JSONRenderer and JSONParser that use orjson
+when it is installed (and fall back to DRF's stdlib json code when it isn't).
+
+The output is byte-for-byte what JSONRenderer produces with the default
+COMPACT_JSON/UNICODE_JSON settings: compact separators, UTF-8 and
+\\u2028/\\u2029 escaped. Anything orjson would format differently goes
+through DRF's encoder or renderer instead: datetimes, Decimals and lazy
+strings are converted by DRF's JSONEncoder, and indented output (the
+browsable API), non-default settings and integers beyond 64 bits use
+JSONRenderer itself. One difference remains: orjson writes NaN and Infinity
+as null where STRICT_JSON would raise.
+
+The parser returns the same data as JSONParser. Bodies orjson rejects, or
+that hold very long numbers (orjson reads integers beyond 64 bits as
+floats), are parsed by JSONParser, so errors read the same.
+"""
+import io
+import re
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+UTF8 = ('utf-8', 'utf8')
+# orjson reads integers beyond 64 bits as floats; bodies with such long digit runs go to the stdlib
+LONG_NUMBER_RE = re.compile(rb'[0-9]{19}')
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact or self.ensure_ascii or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:  # orjson.JSONEncodeError, e.g. an int beyond 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower() not in UTF8:
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read() if stream is not None else b''
+        if not LONG_NUMBER_RE.search(body):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+        # Let JSONParser accept or reject it, with its own error message.
+        return super().parse(io.BytesIO(body), media_type, parser_context)
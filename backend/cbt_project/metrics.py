@@ -0,0 +1,335 @@
+# backend/cbt_project/metrics.py
+"""
+Request metrics, exported in the Prometheus text format at /api/metrics/ (staff only).
+
+MetricsMiddleware records, per named URL route and method:
+  - requests by status code and a latency histogram
+  - SQL queries per request (histogram) and total time spent in the database
+  - cache hits and misses of the read-through caches (see record_cache)
+  - response sizes (histogram)
+
+Each worker process accumulates into an in-memory registry (a dict update
+under a lock per request) and writes a snapshot of its totals to the cache
+every METRICS_FLUSH_SECONDS. The endpoint sums the snapshots of all live
+processes, so with a shared cache (Redis/Memcached) it reports the whole
+deployment; with the default per-process memory cache it only sees the
+process that serves the scrape. Snapshots of processes that stop flushing
+expire after METRICS_PROCESS_TTL seconds.
+
+Queries are counted by an execute wrapper installed on every database
+connection. It reports into a per-request ContextVar, so queries that async
+views run through sync_to_async are attributed to the right request too.
+"""
+import bisect
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import permissions
+from rest_framework.renderers import BaseRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+PROCESS_INDEX_KEY = 'metrics:processes'
+
+_request_stats = ContextVar('request_stats', default=None)
+
+
+# --- Per-request collection -------------------------------------------------
+
+class RequestStats:
+    __slots__ = ('queries', 'query_seconds', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+@contextmanager
+def collect_request_stats():
+    """Collect query and cache stats for the code inside; nested blocks share the outer stats."""
+    stats = _request_stats.get()
+    if stats is not None:
+        yield stats
+        return
+    stats = RequestStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+def count_queries(execute, sql, params, many, context):
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - started
+
+
+def _install_query_counter(sender=None, connection=None, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def install_query_counter():
+    """Count queries on every current and future database connection."""
+    connection_created.connect(_install_query_counter, dispatch_uid='cbt_project.metrics.query_counter')
+    for connection in connections.all(initialized_only=True):
+        _install_query_counter(connection=connection)
+
+
+def record_cache(hit):
+    """Called by the read-through cache helpers on every lookup."""
+    stats = _request_stats.get()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+# --- Per-process registry ---------------------------------------------------
+
+def _new_series():
+    return {
+        'status': {},
+        'latency': [0] * (len(LATENCY_BUCKETS) + 1),
+        'latency_sum': 0.0,
+        'queries': [0] * (len(QUERY_BUCKETS) + 1),
+        'queries_sum': 0,
+        'db_seconds': 0.0,
+        'cache_hits': 0,
+        'cache_misses': 0,
+        'size': [0] * (len(SIZE_BUCKETS) + 1),
+        'size_sum': 0,
+    }
+
+
+class MetricsRegistry:
+    """This process's running totals, keyed by (route, method)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+        self.last_flush = 0.0
+
+    @property
+    def process_key(self):
+        # Not cached: workers forked after import each need their own key.
+        return f"metrics:process:{socket.gethostname()}:{os.getpid()}"
+
+    def observe(self, route, method, status, seconds, stats, size):
+        with self.lock:
+            series = self.series.get((route, method))
+            if series is None:
+                series = self.series[(route, method)] = _new_series()
+            series['status'][status] = series['status'].get(status, 0) + 1
+            series['latency'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            series['latency_sum'] += seconds
+            series['queries'][bisect.bisect_left(QUERY_BUCKETS, stats.queries)] += 1
+            series['queries_sum'] += stats.queries
+            series['db_seconds'] += stats.query_seconds
+            series['cache_hits'] += stats.cache_hits
+            series['cache_misses'] += stats.cache_misses
+            if size is not None:
+                series['size'][bisect.bisect_left(SIZE_BUCKETS, size)] += 1
+                series['size_sum'] += size
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                key: {**series, 'status': dict(series['status']), 'latency': list(series['latency']),
+                      'queries': list(series['queries']), 'size': list(series['size'])}
+                for key, series in self.series.items()
+            }
+
+    def due(self, now):
+        return now - self.last_flush >= getattr(settings, 'METRICS_FLUSH_SECONDS', 5)
+
+    def flush(self):
+        """Publish this process's totals to the shared cache."""
+        self.last_flush = time.monotonic()
+        ttl = getattr(settings, 'METRICS_PROCESS_TTL', 3600)
+        cache.set(self.process_key, self.snapshot(), ttl)
+        # Read-modify-write of the index can lose a concurrent update; the
+        # losing process re-registers itself on its next flush.
+        now = time.time()
+        index = cache.get(PROCESS_INDEX_KEY) or {}
+        index = {key: seen for key, seen in index.items() if now - seen < ttl}
+        index[self.process_key] = now
+        cache.set(PROCESS_INDEX_KEY, index, ttl)
+
+
+registry = MetricsRegistry()
+
+
+def collect_all():
+    """Sum the published totals of every live process (flushing this one first)."""
+    registry.flush()
+    index = cache.get(PROCESS_INDEX_KEY) or {}
+    merged = {}
+    for snapshot in cache.get_many(list(index)).values():
+        for key, series in snapshot.items():
+            total = merged.setdefault(key, _new_series())
+            for status, count in series['status'].items():
+                total['status'][status] = total['status'].get(status, 0) + count
+            for name in ('latency', 'queries', 'size'):
+                total[name] = [a + b for a, b in zip(total[name], series[name])]
+            for name in ('latency_sum', 'queries_sum', 'db_seconds', 'cache_hits', 'cache_misses', 'size_sum'):
+                total[name] += series[name]
+    return merged
+
+
+# --- Prometheus text format -------------------------------------------------
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _histogram(lines, name, buckets, counts, total, **labels):
+    cumulative = 0
+    for bound, count in zip((*buckets, '+Inf'), counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {total}")
+    lines.append(f"{name}_count{_labels(**labels)} {cumulative}")
+
+
+def render_prometheus(merged):
+    lines = [
+        '# HELP cbt_http_requests_total Requests by route, method and status code.',
+        '# TYPE cbt_http_requests_total counter',
+    ]
+    items = sorted(merged.items())
+    for (route, method), series in items:
+        for status, count in sorted(series['status'].items()):
+            lines.append(f"cbt_http_requests_total{_labels(route=route, method=method, status=status)} {count}")
+
+    lines += ['# HELP cbt_http_request_duration_seconds Request latency.',
+              '# TYPE cbt_http_request_duration_seconds histogram']
+    for (route, method), series in items:
+        _histogram(lines, 'cbt_http_request_duration_seconds', LATENCY_BUCKETS,
+                   series['latency'], round(series['latency_sum'], 6), route=route, method=method)
+
+    lines += ['# HELP cbt_db_queries_per_request SQL queries run per request.',
+              '# TYPE cbt_db_queries_per_request histogram']
+    for (route, method), series in items:
+        _histogram(lines, 'cbt_db_queries_per_request', QUERY_BUCKETS,
+                   series['queries'], series['queries_sum'], route=route, method=method)
+
+    lines += ['# HELP cbt_db_query_seconds_total Time spent running SQL.',
+              '# TYPE cbt_db_query_seconds_total counter']
+    for (route, method), series in items:
+        lines.append(f"cbt_db_query_seconds_total{_labels(route=route, method=method)} "
+                     f"{round(series['db_seconds'], 6)}")
+
+    lines += ['# HELP cbt_cache_lookups_total Read-through cache lookups by result.',
+              '# TYPE cbt_cache_lookups_total counter']
+    for (route, method), series in items:
+        lines.append(f"cbt_cache_lookups_total{_labels(route=route, method=method, result='hit')} "
+                     f"{series['cache_hits']}")
+        lines.append(f"cbt_cache_lookups_total{_labels(route=route, method=method, result='miss')} "
+                     f"{series['cache_misses']}")
+
+    lines += ['# HELP cbt_http_response_size_bytes Response body size.',
+              '# TYPE cbt_http_response_size_bytes histogram']
+    for (route, method), series in items:
+        _histogram(lines, 'cbt_http_response_size_bytes', SIZE_BUCKETS,
+                   series['size'], series['size_sum'], route=route, method=method)
+    return '\n'.join(lines) + '\n'
+
+
+# --- Middleware and endpoint ------------------------------------------------
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.route or 'unnamed'
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_query_counter()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with collect_request_stats() as stats:
+            response = self.get_response(request)
+        self.observe(request, response, stats, started)
+        if registry.due(time.monotonic()):
+            registry.flush()
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with collect_request_stats() as stats:
+            response = await self.get_response(request)
+        self.observe(request, response, stats, started)
+        if registry.due(time.monotonic()):
+            registry.last_flush = time.monotonic()  # don't let concurrent requests pile up flushes
+            await sync_to_async(registry.flush, thread_sensitive=False)()
+        return response
+
+    def observe(self, request, response, stats, started):
+        size = None if response.streaming else len(response.content)
+        registry.observe(route_name(request), request.method, response.status_code,
+                         time.perf_counter() - started, stats, size)
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode()
+        return json.dumps(data).encode()  # error responses, e.g. permission denied
+
+
+class MetricsView(APIView):
+    """Prometheus scrape endpoint (staff only)."""
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request, format=None):
+        response = Response(render_prometheus(collect_all()))
+        response['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+        return response
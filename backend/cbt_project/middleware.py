@@ -0,0 +1,45 @@
+# backend/cbt_project/middleware.py
+"""
+QueryCountMiddleware reports how many SQL queries a request ran (on every
+database alias) in the X-Query-Count and X-Query-Time-Ms response headers.
+
+It is meant for benchmarking (see benchmarks/session_load.py) and is only
+active when QUERY_COUNT_HEADERS is on. Queries are counted with the same
+per-request collector as the metrics (see cbt_project/metrics.py), so it also
+sees the queries that async views run in sync_to_async worker threads.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import collect_request_stats, install_query_counter
+
+
+class QueryCountMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_COUNT_HEADERS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_query_counter()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect_request_stats() as stats:
+            response = self.get_response(request)
+        return self.add_headers(response, stats)
+
+    async def __acall__(self, request):
+        with collect_request_stats() as stats:
+            response = await self.get_response(request)
+        return self.add_headers(response, stats)
+
+    def add_headers(self, response, stats):
+        response['X-Query-Count'] = str(stats.queries)
+        response['X-Query-Time-Ms'] = f"{stats.query_seconds * 1000:.2f}"
+        return response
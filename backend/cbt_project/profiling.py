@@ -0,0 +1,319 @@
+# backend/cbt_project/profiling.py
+"""
+On-demand request profiling for staff.
+
+Off by default, and free when off: unless PROFILING_ENABLED is set the
+middleware removes itself from the stack at startup (MiddlewareNotUsed).
+When it is enabled, a request is profiled if
+
+  - it carries an `X-Profile` header (`1`/`cprofile`, or `sample`) and comes
+    from a staff user (token or session), or
+  - it is picked at random with probability PROFILING_SAMPLE_RATE.
+
+Unselected requests cost one header lookup and one random() call.
+
+A profiled request is run under cProfile, or under a statistical stack
+sampler (`X-Profile: sample`, or PROFILING_MODE for sampled requests), and
+every SQL statement it runs is captured with its duration and the project
+stack frames it came from. The artifacts are written to PROFILING_DIR,
+which is a bounded ring: only the newest PROFILING_MAX_ARTIFACTS profiles
+are kept. Browse and download them at /admin/profiles/. The response carries
+an X-Profile-Id header naming the profile.
+
+The middleware is synchronous; under ASGI, Django adapts it (only when it is
+enabled).
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+from django.urls import path
+
+PROFILE_ID_RE = re.compile(r'^[0-9]+-[\w.-]+-[0-9a-f]{8}$')
+UNSAFE_CHARS_RE = re.compile(r'[^\w.-]')
+ARTIFACT_SUFFIXES = ('.json', '.prof', '.folded')
+
+_sql_log = ContextVar('profiling_sql_log', default=None)
+
+
+def profiles_dir():
+    return str(getattr(settings, 'PROFILING_DIR', os.path.join(settings.BASE_DIR, 'profiles')))
+
+
+# --- SQL capture -------------------------------------------------------------
+
+def _project_frames(limit=8):
+    """The innermost stack frames that belong to this project (not Django or other libraries)."""
+    base = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-3]
+        if frame.filename.startswith(base) and 'site-packages' not in frame.filename
+        and not frame.filename.endswith('profiling.py')
+    ]
+    return [f"{os.path.relpath(f.filename, base)}:{f.lineno} in {f.name}" for f in frames[-limit:]]
+
+
+def capture_sql(execute, sql, params, many, context):
+    log = _sql_log.get()
+    if log is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        log.append({
+            'alias': context['connection'].alias,
+            'sql': sql,
+            'ms': round((time.perf_counter() - started) * 1000, 3),
+            'stack': _project_frames(),
+        })
+
+
+def _install_sql_capture(sender=None, connection=None, **kwargs):
+    if capture_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(capture_sql)
+
+
+# --- Profilers ---------------------------------------------------------------
+
+class StackSampler:
+    """Samples one thread's stack every `interval` seconds into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        """Brendan Gregg's collapsed format, ready for flamegraph.pl or speedscope."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+# --- Artifact ring -----------------------------------------------------------
+
+def list_profiles():
+    """Metadata of the stored profiles, newest first."""
+    directory = profiles_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        meta.pop('sql', None)
+        profiles.append(meta)
+    return profiles
+
+
+def artifact_path(profile_id, suffix):
+    if not PROFILE_ID_RE.match(profile_id) or suffix not in ARTIFACT_SUFFIXES:
+        raise Http404("No such profile.")
+    return os.path.join(profiles_dir(), profile_id + suffix)
+
+
+def _write(path, data, mode='w'):
+    tmp = f"{path}.tmp"
+    with open(tmp, mode) as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _prune(directory, keep):
+    ids = sorted(name[:-5] for name in os.listdir(directory) if name.endswith('.json'))
+    for profile_id in ids[:max(0, len(ids) - keep)]:
+        for suffix in ARTIFACT_SUFFIXES:
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+# --- Middleware --------------------------------------------------------------
+
+class ProfilingMiddleware:
+    """Place after AuthenticationMiddleware (staff check) and before the view."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = float(getattr(settings, 'PROFILING_SAMPLE_RATE', 0))
+        self.sample_mode = getattr(settings, 'PROFILING_MODE', 'cprofile')
+        self.interval = float(getattr(settings, 'PROFILING_SAMPLE_INTERVAL', 0.005))
+        self.max_artifacts = int(getattr(settings, 'PROFILING_MAX_ARTIFACTS', 100))
+        connection_created.connect(_install_sql_capture, dispatch_uid='cbt_project.profiling.sql_capture')
+        for connection in connections.all(initialized_only=True):
+            _install_sql_capture(connection=connection)
+
+    def __call__(self, request):
+        mode = self.selected_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        return self.profile(request, mode)
+
+    def selected_mode(self, request):
+        requested = request.headers.get('X-Profile')
+        if requested:
+            if not self.is_staff(request):
+                return None
+            return 'sample' if requested.lower() == 'sample' else 'cprofile'
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.sample_mode
+        return None
+
+    def is_staff(self, request):
+        auth = request.headers.get('Authorization', '').split()
+        if len(auth) == 2 and auth[0].lower() == 'token':
+            from rest_framework.authtoken.models import Token
+            return Token.objects.filter(key=auth[1], user__is_staff=True, user__is_active=True).exists()
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_authenticated and user.is_staff)
+
+    def profile(self, request, mode):
+        sql = []
+        token = _sql_log.set(sql)
+        profiler = sampler = None
+        started = time.perf_counter()
+        try:
+            if mode == 'sample':
+                sampler = StackSampler(threading.get_ident(), self.interval)
+                sampler.start()
+                response = self.get_response(request)
+            else:
+                profiler = cProfile.Profile()
+                response = profiler.runcall(self.get_response, request)
+        finally:
+            elapsed = time.perf_counter() - started
+            if sampler is not None:
+                sampler.stop()
+            _sql_log.reset(token)
+
+        profile_id = self.save(request, response, mode, elapsed, sql, profiler, sampler)
+        response['X-Profile-Id'] = profile_id
+        return response
+
+    def save(self, request, response, mode, elapsed, sql, profiler, sampler):
+        match = getattr(request, 'resolver_match', None)
+        route = (match.url_name if match else None) or 'unmatched'
+        slug = UNSAFE_CHARS_RE.sub('_', route)
+        profile_id = f"{time.time_ns() // 1_000_000}-{slug}-{uuid.uuid4().hex[:8]}"
+        meta = {
+            'id': profile_id,
+            'mode': mode,
+            'route': route,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'sql_count': len(sql),
+            'sql_ms': round(sum(q['ms'] for q in sql), 3),
+            'created': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime()),
+            'sql': sql,
+        }
+
+        directory = profiles_dir()
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, profile_id)
+        if profiler is not None:
+            profiler.dump_stats(base + '.prof')
+            summary = io.StringIO()
+            pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(40)
+            meta['summary'] = summary.getvalue()
+        else:
+            _write(base + '.folded', sampler.folded())
+            leaves = Counter()
+            for stack, count in sampler.counts.items():
+                leaves[stack.rsplit(';', 1)[-1]] += count
+            meta['summary'] = f"samples  innermost frame ({self.interval * 1000:g}ms interval)\n" + ''.join(
+                f"{count:>7}  {frame}\n" for frame, count in leaves.most_common(40)
+            )
+        # The .json is written last: a profile is listed once it is complete.
+        _write(base + '.json', json.dumps(meta, indent=1))
+        _prune(directory, self.max_artifacts)
+        return profile_id
+
+
+# --- Admin pages -------------------------------------------------------------
+
+def profile_list_view(request):
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': list_profiles(),
+        'enabled': getattr(settings, 'PROFILING_ENABLED', False),
+        'max_artifacts': getattr(settings, 'PROFILING_MAX_ARTIFACTS', 100),
+    }
+    return TemplateResponse(request, 'admin/profiling/profile_list.html', context)
+
+
+def profile_detail_view(request, profile_id):
+    try:
+        with open(artifact_path(profile_id, '.json')) as fh:
+            meta = json.load(fh)
+    except FileNotFoundError:
+        raise Http404("No such profile.")
+    context = {
+        **admin.site.each_context(request),
+        'title': f"Profile {profile_id}",
+        'profile': meta,
+        'artifact': '.prof' if meta['mode'] == 'cprofile' else '.folded',
+    }
+    return TemplateResponse(request, 'admin/profiling/profile_detail.html', context)
+
+
+def profile_download_view(request, profile_id, suffix):
+    path = artifact_path(profile_id, suffix)
+    if not os.path.exists(path):
+        raise Http404("No such profile.")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
+
+
+urlpatterns = [
+    path('', admin.site.admin_view(profile_list_view), name='profile-list'),
+    path('<str:profile_id>/', admin.site.admin_view(profile_detail_view), name='profile-detail'),
+    path('<str:profile_id>/download/<str:suffix>', admin.site.admin_view(profile_download_view),
+         name='profile-download'),
+]
@@ -38,6 +38,8 @@ INSTALLED_APPS = [
 ]
 AUTH_USER_MODEL = 'users.CustomUser'
 MIDDLEWARE = [
+    'cbt_project.metrics.MetricsMiddleware',
+    'cbt_project.middleware.QueryCountMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -45,8 +47,10 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cbt_project.db_routers.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'cbt_project.profiling.ProfilingMiddleware',
 ]
 
 # --- ADD THIS SECTION ---
@@ -92,7 +96,7 @@ ROOT_URLCONF = 'cbt_project.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [BASE_DIR / 'cbt_project' / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -121,6 +125,103 @@ DATABASES = {
     }
 }
 
+# Optional read replica for results, history, catalog and reporting reads
+# (see cbt_project/db_routers.py). In tests the replica mirrors the primary.
+if os.environ.get('POSTGRES_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ.get('POSTGRES_REPLICA_HOST'),
+        'PORT': os.environ.get('POSTGRES_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['cbt_project.db_routers.ReplicaRouter']
+REPLICA_DATABASE_ALIAS = 'replica' if 'replica' in DATABASES else None
+# Seconds a caller's reads stay on the primary after they write.
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
+
+# Cache
+# Defaults to a per-process memory cache. Point DJANGO_CACHE_BACKEND/LOCATION at
+# Redis or Memcached in production so every worker shares the same cache, e.g.
+# DJANGO_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# DJANGO_CACHE_LOCATION=redis://127.0.0.1:6379/1
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+if CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    # The per-exam rankings keep a cache key per tree node, ~1,000 per exam
+    # (see exams/ranking.py): raise locmem's default cap of 300 entries.
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.environ.get('DJANGO_CACHE_MAX_ENTRIES', 100000))}
+
+# Seconds an Exam row stays in the cache (changes invalidate it immediately).
+EXAM_CACHE_TIMEOUT = int(os.environ.get('EXAM_CACHE_TIMEOUT', 300))
+
+# Seconds a student's dashboard stays cached (attempt and exam changes
+# invalidate it immediately), and how many recent results it lists.
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 120))
+DASHBOARD_RECENT_RESULTS = int(os.environ.get('DASHBOARD_RECENT_RESULTS', 10))
+
+# Seconds a class's rendered gradebook stays cached (scoring an attempt in the
+# class invalidates it immediately; see exams/gradebook.py).
+GRADEBOOK_CACHE_TIMEOUT = int(os.environ.get('GRADEBOOK_CACHE_TIMEOUT', 3600))
+
+# Seconds an exam's ranking tree stays cached before it is rebuilt from the
+# gradebook (scoring updates it in place; see exams/ranking.py).
+RANKING_CACHE_TIMEOUT = int(os.environ.get('RANKING_CACHE_TIMEOUT', 3600))
+
+# Live progress streams (see exams/live.py): seconds between updates, and how
+# long one stream lasts before the browser reconnects.
+LIVE_PROGRESS_INTERVAL = int(os.environ.get('LIVE_PROGRESS_INTERVAL', 2))
+LIVE_PROGRESS_STREAM_SECONDS = int(os.environ.get('LIVE_PROGRESS_STREAM_SECONDS', 60))
+
+# Offline exams (see exams/offline.py): how long after the deadline the answer
+# log may still be uploaded, and how far client clocks may drift.
+OFFLINE_SYNC_GRACE_SECONDS = int(os.environ.get('OFFLINE_SYNC_GRACE_SECONDS', 900))
+OFFLINE_CLOCK_SKEW_SECONDS = int(os.environ.get('OFFLINE_CLOCK_SKEW_SECONDS', 30))
+
+# 'buffered': submit-answer acknowledges once the answer is in the cache and
+# answers reach the database in batches (see exams/ingest.py; needs a shared,
+# persistent cache such as Redis, and manage.py flush_answer_buffer running).
+ANSWER_INGEST = os.environ.get('ANSWER_INGEST', 'direct')
+ANSWER_BUFFER_TIMEOUT = int(os.environ.get('ANSWER_BUFFER_TIMEOUT', 24 * 3600))
+
+# Adaptive exams (see exams/adaptive.py): the next question is drawn at random
+# from this many of the most informative ones, so no question is overexposed.
+ADAPTIVE_RANDOMESQUE = int(os.environ.get('ADAPTIVE_RANDOMESQUE', 5))
+
+# Serve start-exam, exam-questions and submit-answer from the async views in
+# exams/async_views.py. Only worth enabling under an ASGI server, e.g.
+#   gunicorn cbt_project.asgi:application -k uvicorn.workers.UvicornWorker
+EXAMS_ASYNC_VIEWS = os.environ.get('EXAMS_ASYNC_VIEWS', '0').lower() in ('true', '1', 'yes')
+
+# Add X-Query-Count / X-Query-Time-Ms headers to every response (benchmarking
+# only, see benchmarks/session_load.py and cbt_project/middleware.py).
+QUERY_COUNT_HEADERS = os.environ.get('QUERY_COUNT_HEADERS', '0').lower() in ('true', '1', 'yes')
+
+# Per-route request metrics, scraped by Prometheus from /api/metrics/ (staff
+# only). Each worker publishes its totals to the cache every
+# METRICS_FLUSH_SECONDS; use a shared cache to see all workers in one scrape.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() in ('true', '1', 'yes')
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+METRICS_PROCESS_TTL = int(os.environ.get('METRICS_PROCESS_TTL', 3600))
+
+# On-demand profiling (see cbt_project/profiling.py). Off by default; when on,
+# staff can profile a request with an `X-Profile: 1` (cProfile) or
+# `X-Profile: sample` header, and PROFILING_SAMPLE_RATE profiles a random
+# fraction of all requests. Profiles are kept in a ring of the newest
+# PROFILING_MAX_ARTIFACTS under PROFILING_DIR and browsed at /admin/profiles/.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0').lower() in ('true', '1', 'yes')
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_MODE = os.environ.get('PROFILING_MODE', 'cprofile')  # for sampled requests: 'cprofile' or 'sample'
+PROFILING_SAMPLE_INTERVAL = float(os.environ.get('PROFILING_SAMPLE_INTERVAL', 0.005))
+PROFILING_DIR = os.environ.get('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_MAX_ARTIFACTS = int(os.environ.get('PROFILING_MAX_ARTIFACTS', 100))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -175,6 +276,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson-backed, same output as DRF's JSON renderer/parser (see cbt_project/fastjson.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'cbt_project.fastjson.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'cbt_project.fastjson.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 
@@ -18,10 +18,15 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework.authtoken.views import obtain_auth_token  
 
+from . import profiling
+from .metrics import MetricsView
+
 urlpatterns = [
+    path('admin/profiles/', include(profiling)),
     path('admin/', admin.site.urls),
     path('api/', include('rest_framework.urls')),
     path('api/auth/', include('users.urls')),
     path('api/', include('exams.urls')),
     path('api-token-auth/', obtain_auth_token),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
 ]
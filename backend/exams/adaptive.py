@@ -0,0 +1,166 @@
+# backend/exams/adaptive.py
+"""
+Computerized adaptive testing (Exam.adaptive).
+
+An adaptive attempt starts with one question on its paper. Every answer to
+the newest question goes through AdaptiveSession.record(), which
+
+  1. re-estimates the student's ability: the EAP (posterior mean) under a
+     N(0, 1) prior, on the quadrature grid irt.py calibrates with, and its
+     standard error (posterior standard deviation);
+  2. stops when the standard error is down to Exam.adaptive_target_se, the
+     paper has reached total_questions_to_ask, or the bank is used up;
+  3. otherwise appends the next question to the paper (AttemptQuestion):
+     the one with the most Fisher information a^2 * P * (1 - P) at the
+     current estimate, chosen at random among the RANDOMESQUE most
+     informative ones so that the best few questions are not shown to
+     every student (exposure control).
+
+Questions keep the order they were given in and each is answered once. The
+item parameters are the calibrated ones (manage.py calibrate_irt), or for
+questions not calibrated yet a = 1 and b from their difficulty level. They
+are kept per exam as arrays (ItemBank, cached with the question bank), so
+estimating and selecting are a few vectorized operations over the bank
+(python -m benchmarks.adaptive_selection times them and compares the test
+length with fixed papers). Adaptive exams write every answer straight to
+the database, also in buffered ingest mode: the next question depends on it.
+"""
+import random
+
+import numpy as np
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .irt import quadrature
+from .models import AttemptQuestion, ExamAttempt
+from .serializers import question_data
+
+RANDOMESQUE = getattr(settings, 'ADAPTIVE_RANDOMESQUE', 5)
+# Parameters of questions that have not been calibrated
+LEVEL_DIFFICULTY = {'easy': -1.0, 'medium': 0.0, 'hard': 1.0}
+DEFAULT_DISCRIMINATION = 1.0
+GRID, LOG_PRIOR = quadrature()
+
+
+class ItemBank:
+    """An exam's question bank (PaperItems, in id order) with its item parameters as arrays."""
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.index = {item.id: i for i, item in enumerate(self.items)}
+        self.a = np.array([
+            DEFAULT_DISCRIMINATION if item.irt_discrimination is None else item.irt_discrimination
+            for item in self.items
+        ])
+        self.b = np.array([
+            LEVEL_DIFFICULTY.get(item.difficulty_level, 0.0) if item.irt_difficulty is None else item.irt_difficulty
+            for item in self.items
+        ])
+
+    def __len__(self):
+        return len(self.items)
+
+    def estimate(self, indices, correct):
+        """EAP ability and its standard error from the responses (bank indices, 0/1 correct)."""
+        indices = np.asarray(indices, dtype=np.int64)
+        z = np.outer(GRID, self.a[indices]) - self.a[indices] * self.b[indices]
+        log_posterior = LOG_PRIOR + np.where(
+            np.asarray(correct, dtype=bool), -np.logaddexp(0, -z), -np.logaddexp(0, z)
+        ).sum(axis=1)
+        posterior = np.exp(log_posterior - log_posterior.max())
+        posterior /= posterior.sum()
+        theta = float(posterior @ GRID)
+        return theta, float(np.sqrt(posterior @ (GRID - theta) ** 2))
+
+    def information(self, theta):
+        p = 1 / (1 + np.exp(-self.a * (theta - self.b)))
+        return self.a ** 2 * p * (1 - p)
+
+    def select(self, theta, exclude, rng, top=None):
+        """Bank index of the next question, or None when every question is excluded."""
+        information = self.information(theta)
+        information[np.asarray(list(exclude), dtype=np.int64)] = -np.inf
+        top = min(top or RANDOMESQUE, len(self) - len(exclude))
+        if top <= 0:
+            return None
+        best = np.argpartition(information, -top)[-top:]
+        return int(best[rng.randrange(top)])
+
+
+def first_question(exam, questions, student_id):
+    """
+    The first question of an adaptive paper, for Exam.pick_questions():
+    selected at the prior mean, deterministically per student.
+    """
+    bank = ItemBank(questions)
+    return questions[bank.select(0.0, (), random.Random(f"{exam.exam_id}_{student_id}"))]
+
+
+def max_questions(exam, bank):
+    return min(exam.total_questions_to_ask or len(bank), len(bank))
+
+
+class AdaptiveSession:
+    """
+    An adaptive attempt's state for one answer: the paper so far and the
+    responses, read in two queries.
+    """
+
+    def __init__(self, attempt, bank):
+        self.attempt = attempt
+        self.bank = bank
+        self.paper = list(attempt.paper.order_by('position').values_list('question_id', flat=True))
+        self.responses = dict(attempt.student_answers.filter(slot=0).values_list('question_id', 'is_correct'))
+
+    def can_answer(self, question_id):
+        """Only the newest question on the paper can be answered, and only once."""
+        return bool(self.paper) and self.paper[-1] == question_id and question_id not in self.responses
+
+    def record(self, question_id, is_correct):
+        """
+        Take the (saved) answer into account, add the next question to the
+        paper unless the test is over, and return what the student needs next.
+        """
+        self.responses[question_id] = is_correct
+        answered = [
+            (self.bank.index[qid], correct) for qid, correct in self.responses.items() if qid in self.bank.index
+        ]
+        theta, se = self.bank.estimate([i for i, _ in answered], [c for _, c in answered])
+
+        exam = self.attempt.exam
+        target = exam.adaptive_target_se
+        next_question = None
+        if len(self.paper) < max_questions(exam, self.bank) and not (target and se <= target):
+            on_paper = {self.bank.index[qid] for qid in self.paper if qid in self.bank.index}
+            # Seeded per attempt and position, so a retried answer picks the same question
+            rng = random.Random(f"{self.attempt.attempt_id}_{len(self.paper)}")
+            index = self.bank.select(theta, on_paper, rng)
+            if index is not None:
+                next_question = self.append(self.bank.items[index])
+
+        question_count = len(self.paper)
+        ExamAttempt.objects.filter(pk=self.attempt.pk).update(
+            ability=theta, ability_se=se, question_count=question_count
+        )
+        self.attempt.ability, self.attempt.ability_se = theta, se
+        self.attempt.question_count = question_count
+        return {
+            'ability': round(theta, 4),
+            'standard_error': round(se, 4),
+            'finished': next_question is None,
+            'next_question': next_question,
+        }
+
+    def append(self, item):
+        """Put `item` on the paper after the current questions; returns it as the student sees it."""
+        position = len(self.paper)
+        try:
+            with transaction.atomic():
+                self.attempt.assign_questions([item], start=position)
+        except IntegrityError:
+            pass  # a concurrent request for the same answer got there first (unique_attempt_position)
+        row = (AttemptQuestion.objects.select_related('question').prefetch_related('question__choices')
+               .get(attempt=self.attempt, position=position))
+        self.paper.append(row.question_id)
+        question = row.get_question()
+        return question_data(question, question.paper_choices)
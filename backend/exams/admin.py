@@ -1,16 +1,22 @@
 # backend/exams/admin.py
 from django.contrib import admin
+from django.db.models import Count, Q
 from import_export import resources, fields
 from import_export.admin import ImportExportModelAdmin
-from .models import Exam, Question, Choice, ExamAttempt, StudentAnswer
+from .models import Exam, Question, Choice, ExamAttempt, AttemptQuestion, StudentAnswer, CollusionFlag, GradebookEntry
 from django.shortcuts import get_object_or_404
 from django.http import HttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+from django.utils.http import urlencode
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
 from import_export.widgets import ForeignKeyWidget
 from django.contrib import messages
+from cbt_project.db_routers import replica_reads
 
 # --- Resources for Import/Export ---
 
@@ -96,9 +102,11 @@ class ExamAdmin(ImportExportModelAdmin):
         'randomize_questions',
         'randomize_choices',
         'created_at', 
-        'student_class'
+        'student_class',
+        'live_progress'
     )
-    list_filter = ('is_active', 'student_class', 'randomize_questions', 'randomize_choices')
+    list_filter = ('is_active', 'student_class', 'randomize_questions', 'randomize_choices', 'delivery_mode',
+                   'adaptive')
     search_fields = ('title', 'student_class')
     
     fieldsets = (
@@ -106,17 +114,44 @@ class ExamAdmin(ImportExportModelAdmin):
             'fields': ('title', 'description', 'student_class', 'duration_minutes', 'pass_mark', 'passing_score')
         }),
         ('Question Settings', {
-            'fields': ('total_questions_to_ask', 'randomize_questions', 'randomize_choices'),
+            'fields': ('total_questions_to_ask', 'randomize_questions', 'randomize_choices', 'adaptive',
+                       'adaptive_target_se'),
             'description': 'Control how many questions to ask and whether to randomize them.'
         }),
         ('Status', {
-            'fields': ('is_active',)
+            'fields': ('is_active', 'delivery_mode')
         }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(question_total=Count('questions'))
+
     def total_questions_available(self, obj):
-        return obj.questions.count()
+        return obj.question_total
     total_questions_available.short_description = "Available Questions"
+    total_questions_available.admin_order_field = 'question_total'
+
+    def live_progress(self, obj):
+        return format_html('<a href="{}">Live</a>', reverse('admin:exams_exam_live', args=[obj.pk]))
+    live_progress.short_description = "Progress"
+
+    def get_urls(self):
+        live = path('<int:exam_id>/live/', self.admin_site.admin_view(self.live_progress_view), name='exams_exam_live')
+        return [live] + super().get_urls()
+
+    def live_progress_view(self, request, exam_id):
+        """An invigilator's page: the class's progress, updated from the live-progress event stream."""
+        exam = get_object_or_404(Exam, id=exam_id)
+        student_class = request.GET.get('student_class', exam.student_class or '')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'exam': exam,
+            'student_class': student_class,
+            'title': f"Live progress: {exam.title}",
+            'stream_url': f"{reverse('live-progress', args=[exam.pk])}?{urlencode({'student_class': student_class})}",
+        }
+        return TemplateResponse(request, 'admin/exams/live_progress.html', context)
     
     def save_model(self, request, obj, form, change):
         """Override to validate question limits and show warnings."""
@@ -155,12 +190,19 @@ class QuestionAdmin(ImportExportModelAdmin):
         'exam', 
         'question_type', 
         'difficulty_level',
+        'irt_difficulty',
+        'irt_discrimination',
         'score_points', 
         'display_choices'
     )
     list_filter = ('exam', 'question_type', 'difficulty_level', 'exam__student_class')
+    list_select_related = ('exam',)
     search_fields = ('question_text',)
+    readonly_fields = ('irt_difficulty', 'irt_discrimination', 'irt_calibrated_at')
     inlines = [ChoiceInline]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('choices')
     
     def question_text_preview(self, obj):
         """Show a truncated version of the question text."""
@@ -176,9 +218,26 @@ class QuestionAdmin(ImportExportModelAdmin):
 class ChoiceAdmin(admin.ModelAdmin):
     list_display = ('choice_text', 'question', 'is_correct')
     list_filter = ('question__exam', 'is_correct')
+    list_select_related = ('question__exam',)
     search_fields = ('choice_text', 'question__question_text')
 
 
+class AttemptQuestionInline(admin.TabularInline):
+    """The attempt's paper, in the order the student sees it."""
+    model = AttemptQuestion
+    fields = ('position', 'question', 'choice_order', 'time_spent_ms', 'answer_count')
+    readonly_fields = fields
+    ordering = ('position',)
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('question__exam')
+
+
 @admin.register(ExamAttempt)
 class ExamAttemptAdmin(admin.ModelAdmin):
     list_display = (
@@ -192,8 +251,11 @@ class ExamAttemptAdmin(admin.ModelAdmin):
         'end_time'
     )
     list_filter = ('exam', 'exam__student_class', 'is_completed')
+    list_select_related = ('student', 'exam')
+    raw_id_fields = ('student', 'exam')
     actions = ['download_results_pdf']
-    readonly_fields = ('assigned_question_ids', 'questions_assigned', 'questions_answered')
+    readonly_fields = ('questions_assigned', 'questions_answered')
+    inlines = [AttemptQuestionInline]
     search_fields = [
         'student__first_name',
         'student__last_name',
@@ -202,14 +264,23 @@ class ExamAttemptAdmin(admin.ModelAdmin):
     
     def questions_assigned(self, obj):
         """Show number of questions assigned to this attempt."""
-        return len(obj.assigned_question_ids) if obj.assigned_question_ids else 0
+        return obj.question_count
     questions_assigned.short_description = "Questions Assigned"
     
+    def get_queryset(self, request):
+        # Answer rows only (slot 0): MS selection rows are not separate answers
+        return super().get_queryset(request).annotate(
+            answered_count=Count('student_answers', filter=Q(student_answers__slot=0)),
+            correct_count=Count('student_answers', filter=Q(student_answers__slot=0, student_answers__is_correct=True)),
+        )
+
     def questions_answered(self, obj):
         """Show number of questions answered in this attempt."""
-        return obj.student_answers.count()
+        return obj.answered_count
     questions_answered.short_description = "Questions Answered"
+    questions_answered.admin_order_field = 'answered_count'
 
+    @replica_reads()
     def download_results_pdf(self, request, queryset):
         response = HttpResponse(content_type='application/pdf')
         response['Content-Disposition'] = 'attachment; filename="exam_results.pdf"'
@@ -231,8 +302,8 @@ class ExamAttemptAdmin(admin.ModelAdmin):
             user = attempt.student
             student_class = getattr(user, 'student_class', '')
 
-            questions_assigned = len(attempt.assigned_question_ids) if attempt.assigned_question_ids else attempt.exam.questions.count()
-            correct_answers = attempt.student_answers.filter(is_correct=True).count()
+            questions_assigned = attempt.question_count or attempt.exam.questions.count()
+            correct_answers = attempt.correct_count
             score_display = f"{correct_answers}/{questions_assigned}"
 
             data.append([
@@ -273,9 +344,57 @@ class ExamAttemptAdmin(admin.ModelAdmin):
 class StudentAnswerAdmin(admin.ModelAdmin):
     list_display = ('attempt', 'question_preview', 'chosen_choice', 'is_correct', 'score')
     list_filter = ('is_correct', 'attempt__exam')
+    list_select_related = ('attempt__student', 'attempt__exam', 'question', 'chosen_choice')
     search_fields = ('attempt__student__username', 'question__question_text')
     
     def question_preview(self, obj):
         """Show a preview of the question text."""
         return obj.question.question_text[:30] + "..." if len(obj.question.question_text) > 30 else obj.question.question_text
     question_preview.short_description = "Question"
+
+
+@admin.register(GradebookEntry)
+class GradebookEntryAdmin(admin.ModelAdmin):
+    """The materialized gradebook (see gradebook.py); written by scoring, so read-only here."""
+    list_display = ('student', 'student_class', 'exam', 'percentage', 'correct_answers', 'total_questions',
+                    'passed', 'completed_at')
+    list_filter = ('student_class', 'exam', 'passed')
+    list_select_related = ('student', 'exam')
+    search_fields = ('student__username', 'student__first_name', 'student__last_name')
+    ordering = ('student_class', 'exam', '-percentage')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CollusionFlag)
+class CollusionFlagAdmin(admin.ModelAdmin):
+    """Pairs flagged by manage.py detect_collusion, most suspicious first."""
+    list_display = (
+        'exam', 'student_class', 'first_student', 'second_student',
+        'identical_wrong', 'both_wrong', 'expected_identical_wrong', 'z_score', 'reviewed'
+    )
+    list_filter = ('reviewed', 'exam', 'student_class')
+    list_select_related = ('exam', 'first_attempt__student', 'second_attempt__student')
+    search_fields = ('first_attempt__student__username', 'second_attempt__student__username')
+    readonly_fields = (
+        'exam', 'first_attempt', 'second_attempt', 'student_class', 'both_wrong',
+        'identical_wrong', 'expected_identical_wrong', 'z_score', 'created_at'
+    )
+    actions = ['mark_reviewed']
+
+    def first_student(self, obj):
+        return obj.first_attempt.student.username
+    first_student.short_description = "First Student"
+
+    def second_student(self, obj):
+        return obj.second_attempt.student.username
+    second_student.short_description = "Second Student"
+
+    def mark_reviewed(self, request, queryset):
+        updated = queryset.update(reviewed=True)
+        messages.success(request, f"{updated} flag(s) marked as reviewed; detect_collusion will keep them.")
+    mark_reviewed.short_description = "Mark selected flags as reviewed"
@@ -0,0 +1,247 @@
+# backend/exams/analysis.py
+"""
+Classical item analysis of an exam, from the attempt x question response
+matrix:
+
+  facility        share of the attempts with the question on their paper
+                  that answered it correctly
+  discrimination  corrected point-biserial: the correlation between getting
+                  the question right and the score on the rest of the paper
+  distractors     share of those attempts that selected each choice
+  KR-20           the paper's reliability, with the mean paper length as k
+  distribution    mean, standard deviation and a histogram of the
+                  percentage correct
+
+Scores are numbers of correct answers (StudentAnswer.is_correct on the
+answer rows). Everything above is a function of a few running sums per
+question and choice (ItemAnalysis.sums), so completed attempts are added in
+vectorized batches as they come in and nothing is ever recomputed: bring an
+exam up to date with update_item_analysis() (the item-analysis endpoint does
+it on every read, and manage.py update_item_analysis from cron), then read
+it with item_analysis_report(). Attempts changed after completion (regrades)
+need manage.py update_item_analysis --rebuild.
+"""
+import numpy as np
+from django.db import transaction
+
+from .models import AttemptQuestion, Choice, ExamAttempt, ItemAnalysis, Question, StudentAnswer
+
+BATCH_SIZE = 2000
+HISTOGRAM_BINS = 10
+
+# Per-question sums over the attempts that had the question on their paper:
+#   n   attempts              x   correct answers      xt  sum of T when correct
+#   t   sum of T              tt  sum of T squared
+# where T is the attempt's number of correct answers.
+QUESTION_SUMS = ('n', 'x', 'xt', 't', 'tt')
+
+
+class ResponseSums:
+    """The running sums of ItemAnalysis.sums as NumPy arrays, aligned with sorted question and choice ids."""
+
+    def __init__(self, question_ids, choice_ids, stored=None):
+        self.question_ids = np.asarray(sorted(question_ids), dtype=np.int64)
+        self.choice_ids = np.asarray(sorted(choice_ids), dtype=np.int64)
+        self.per_question = {name: np.zeros(len(self.question_ids)) for name in QUESTION_SUMS}
+        self.choice_n = np.zeros(len(self.choice_ids))
+        self.attempts = 0
+        self.total = {'t': 0.0, 'tt': 0.0, 'k': 0.0}
+        self.histogram = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+        if stored:
+            self._load(stored)
+
+    def _load(self, stored):
+        # Realign on the current questions and choices (some may be new, some deleted)
+        columns = self._columns(self.question_ids, stored['questions'])
+        for name in QUESTION_SUMS:
+            self.per_question[name][columns[0]] = np.asarray(stored[name])[columns[1]]
+        columns = self._columns(self.choice_ids, stored['choices'])
+        self.choice_n[columns[0]] = np.asarray(stored['choice_n'])[columns[1]]
+        self.attempts = stored['attempts']
+        self.total = dict(stored['total'])
+        self.histogram = np.asarray(stored['histogram'], dtype=np.int64)
+
+    @staticmethod
+    def _columns(current, stored_ids):
+        """(positions in `current`, positions in `stored_ids`) of the ids both have."""
+        stored_ids = np.asarray(stored_ids, dtype=np.int64)
+        _, in_current, in_stored = np.intersect1d(current, stored_ids, assume_unique=True, return_indices=True)
+        return in_current, in_stored
+
+    def dump(self):
+        return {
+            'questions': self.question_ids.tolist(),
+            'choices': self.choice_ids.tolist(),
+            **{name: values.tolist() for name, values in self.per_question.items()},
+            'choice_n': self.choice_n.tolist(),
+            'attempts': self.attempts,
+            'total': self.total,
+            'histogram': self.histogram.tolist(),
+        }
+
+    def add(self, attempt_ids):
+        """Add a batch of completed attempts: three queries and a handful of matrix operations."""
+        attempt_ids = np.asarray(sorted(attempt_ids), dtype=np.int64)
+        m, k = len(attempt_ids), len(self.question_ids)
+
+        paper, correct = response_indices(attempt_ids, self.question_ids)
+        chosen = np.fromiter(
+            StudentAnswer.objects.filter(attempt_id__in=attempt_ids.tolist(), chosen_choice__isnull=False)
+            .values_list('chosen_choice_id', flat=True), dtype=np.int64
+        )
+
+        P = np.zeros((m, k))
+        P[paper] = 1
+        X = np.zeros((m, k))
+        X[correct] = 1
+        X *= P  # an answer to a question that is not on the paper does not count
+        T = X.sum(axis=1)
+
+        sums = self.per_question
+        sums['n'] += P.sum(axis=0)
+        sums['x'] += X.sum(axis=0)
+        sums['xt'] += X.T @ T
+        sums['t'] += P.T @ T
+        sums['tt'] += P.T @ (T * T)
+
+        position, known = _lookup(self.choice_ids, chosen)
+        self.choice_n += np.bincount(position[known], minlength=len(self.choice_ids))
+
+        paper_length = P.sum(axis=1)
+        self.attempts += m
+        self.total['t'] += float(T.sum())
+        self.total['tt'] += float((T * T).sum())
+        self.total['k'] += float(paper_length.sum())
+        percent = np.divide(T * 100, paper_length, out=np.zeros(m), where=paper_length > 0)
+        self.histogram += np.histogram(percent, bins=HISTOGRAM_BINS, range=(0, 100))[0]
+
+
+
+def _pairs(rows, attempt_ids, question_ids):
+    """Matrix indices (rows, columns) of (attempt_id, question_id) pairs, dropping unknown questions."""
+    pairs = np.array(list(rows), dtype=np.int64).reshape(-1, 2)
+    columns, known = _lookup(question_ids, pairs[:, 1])
+    return np.searchsorted(attempt_ids, pairs[known, 0]), columns[known]
+
+
+def response_indices(attempt_ids, question_ids):
+    """
+    Matrix indices of the attempts' papers and of their correct answers, for
+    an attempt x question matrix over sorted `attempt_ids` and `question_ids`:
+    two queries.
+    """
+    ids = attempt_ids.tolist()
+    paper = _pairs(AttemptQuestion.objects.filter(attempt_id__in=ids).values_list('attempt_id', 'question_id'),
+                   attempt_ids, question_ids)
+    correct = _pairs(StudentAnswer.objects.filter(attempt_id__in=ids, slot=0, is_correct=True)
+                     .values_list('attempt_id', 'question_id'), attempt_ids, question_ids)
+    return paper, correct
+
+
+def _lookup(sorted_ids, values):
+    """Positions of `values` in `sorted_ids`, and which of them are there at all."""
+    position = np.searchsorted(sorted_ids, values)
+    if not len(sorted_ids):
+        return position, np.zeros(len(values), dtype=bool)
+    return position, (position < len(sorted_ids)) & (sorted_ids[np.minimum(position, len(sorted_ids) - 1)] == values)
+
+
+def update_item_analysis(exam, rebuild=False, batch_size=BATCH_SIZE):
+    """
+    Add the exam's completed attempts that are not counted yet (all of them
+    with `rebuild`) to its ItemAnalysis, and return it.
+    """
+    question_ids = list(Question.objects.filter(exam=exam).values_list('id', flat=True))
+    choice_ids = list(Choice.objects.filter(question__exam=exam).values_list('id', flat=True))
+    with transaction.atomic():
+        # One updater per exam at a time
+        analysis, _ = ItemAnalysis.objects.select_for_update().get_or_create(exam=exam)
+        if rebuild:
+            ExamAttempt.objects.filter(exam=exam, in_item_analysis=True).update(in_item_analysis=False)
+        sums = ResponseSums(question_ids, choice_ids, None if rebuild else analysis.sums)
+
+        pending = list(ExamAttempt.objects.filter(exam=exam, is_completed=True, in_item_analysis=False)
+                       .order_by('id').values_list('id', flat=True))
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            sums.add(batch)
+            ExamAttempt.objects.filter(id__in=batch).update(in_item_analysis=True)
+
+        if pending or rebuild or not analysis.sums:
+            analysis.sums = sums.dump()
+            analysis.attempt_count = sums.attempts
+            analysis.save()
+    return analysis
+
+
+def _divide(a, b):
+    return np.divide(a, b, out=np.full(np.shape(a), np.nan), where=b > 0)
+
+
+def _number(value, digits=4):
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+
+def item_analysis_report(analysis):
+    """The teacher-facing report of an ItemAnalysis: per question, then for the paper as a whole."""
+    exam = analysis.exam
+    questions = list(Question.objects.filter(exam=exam).prefetch_related('choices').order_by('id'))
+    sums = ResponseSums([q.id for q in questions], [c.id for q in questions for c in q.choices.all()],
+                        analysis.sums or None)
+    s = sums.per_question
+
+    facility = _divide(s['x'], s['n'])
+    # Corrected point-biserial: correlate x with R = T - x (x is 0/1, so x squared = x)
+    mean_rest = _divide(s['t'] - s['x'], s['n'])
+    cov = _divide(s['xt'] - s['x'], s['n']) - facility * mean_rest
+    var_rest = _divide(s['tt'] - 2 * s['xt'] + s['x'], s['n']) - mean_rest ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        discrimination = cov / np.sqrt(facility * (1 - facility) * var_rest)
+
+    choice_position = {choice_id: i for i, choice_id in enumerate(sums.choice_ids.tolist())}
+    items = []
+    for i, question in enumerate(questions):
+        n = s['n'][i]
+        items.append({
+            'id': question.id,
+            'text': question.question_text[:100],
+            'type': question.question_type,
+            'difficulty': question.difficulty_level,
+            'irt_difficulty': question.irt_difficulty,
+            'irt_discrimination': question.irt_discrimination,
+            'attempts': int(n),
+            'facility': _number(facility[i]),
+            'discrimination': _number(discrimination[i]),
+            'choices': [
+                {
+                    'id': choice.id,
+                    'text': choice.choice_text[:50],
+                    'is_correct': choice.is_correct,
+                    'selection_rate': _number(sums.choice_n[choice_position[choice.id]] / n) if n else None,
+                }
+                for choice in sorted(question.choices.all(), key=lambda choice: choice.id)
+            ],
+        })
+
+    attempts = sums.attempts
+    mean = sums.total['t'] / attempts if attempts else None
+    variance = sums.total['tt'] / attempts - mean ** 2 if attempts else None
+    k = sums.total['k'] / attempts if attempts else 0
+    # Each question contributes its p*q on the share of papers it was on
+    item_variance = float(np.nansum(facility * (1 - facility) * s['n'])) / attempts if attempts else None
+    kr20 = k / (k - 1) * (1 - item_variance / variance) if k > 1 and variance else None
+    width = 100 // HISTOGRAM_BINS
+    return {
+        'exam': exam.id,
+        'attempts': attempts,
+        'updated_at': analysis.updated_at,
+        'mean_correct': _number(mean),
+        'sd_correct': _number(np.sqrt(variance) if variance is not None and variance >= 0 else None),
+        'mean_paper_length': _number(k, 2),
+        'kr20': _number(kr20),
+        'score_distribution': [
+            {'range': f"{i * width}-{(i + 1) * width}", 'count': int(count)}
+            for i, count in enumerate(sums.histogram)
+        ],
+        'questions': items,
+    }
@@ -0,0 +1,354 @@
+# backend/exams/async_views.py
+"""
+Async (ASGI) versions of the exam hot path: start, questions and submit-answer.
+
+DRF's APIView is synchronous, so these are plain Django async views that
+mirror the request/response contract of the views in views.py. Reads and
+single-row writes use Django's async ORM; anything that needs a transaction
+(Multiple Select answers, scoring) is handed to a worker thread with
+sync_to_async because transaction.atomic() is not async-aware yet.
+
+Enable them with EXAMS_ASYNC_VIEWS=1 and serve the project through asgi.py.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authentication import CSRFCheck
+from rest_framework.authtoken.models import Token
+
+from .adaptive import AdaptiveSession
+from .caching import aget_exam, aget_item_bank, aget_question_bank, ainvalidate_dashboard, ainvalidate_live_roster
+from .models import Choice, ExamAttempt, StudentAnswer
+from .ingest import abuffer_answer, buffered_ingest, flush_answers
+from .live import acount_answered, aevents
+from .offline import issue_bundle
+from .timing import arecord_answer_time, parse_time_spent
+from cbt_project.fastjson import FastJSONRenderer
+
+from .serializers import (
+    ExamAttemptResultSerializer, ExamAttemptStartSerializer, question_data, resume_data, student_answer_data
+)
+from .utils import (
+    calculate_and_save_score, get_assigned_question, grade_choice, grade_fill_in_blank,
+    is_attempt_expired, multiple_select_rows, parse_selected_choice_ids, save_multiple_select_answer,
+    saved_answer_rows
+)
+
+
+def json_response(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def _csrf_failure(request):
+    """Run Django's CSRF check the same way DRF's SessionAuthentication does."""
+    check = CSRFCheck(lambda req: None)
+    check.process_request(request)
+    return check.process_view(request, None, (), {})
+
+
+async def authenticate(request):
+    """
+    Authenticate like REST_FRAMEWORK's TokenAuthentication + SessionAuthentication.
+    Returns (user, error_response).
+    """
+    auth = request.headers.get('Authorization', '').split()
+    if auth and auth[0].lower() == 'token':
+        if len(auth) != 2:
+            return None, json_response({"detail": "Invalid token header."}, status=401)
+        token = await Token.objects.select_related('user').filter(key=auth[1]).afirst()
+        if token is None:
+            return None, json_response({"detail": "Invalid token."}, status=401)
+        if not token.user.is_active:
+            return None, json_response({"detail": "User inactive or deleted."}, status=401)
+        return token.user, None
+
+    user = await request.auser()
+    if user.is_authenticated:
+        if _csrf_failure(request) is not None:
+            return None, json_response({"detail": "CSRF Failed."}, status=403)
+        return user, None
+
+    response = json_response({"detail": "Authentication credentials were not provided."}, status=401)
+    response['WWW-Authenticate'] = 'Token'
+    return None, response
+
+
+class AsyncAPIView(View):
+    """Tiny async stand-in for APIView: token/session auth, JSON in, JSON out."""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Like APIView, CSRF is only enforced for session-authenticated requests.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        user, error = await authenticate(request)
+        if error is not None:
+            return error
+        request.user = user
+        try:
+            self.data = self.parse_body(request)
+        except ValueError as exc:
+            return json_response({"detail": f"JSON parse error - {exc}"}, status=400)
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404 as exc:
+            return json_response({"detail": str(exc) or "Not found."}, status=404)
+
+    def parse_body(self, request):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return {}
+        if request.content_type == 'application/json':
+            return json.loads(request.body or b'{}')
+        return request.POST
+
+
+def _submit_attempt(attempt):
+    """Score the attempt and serialize the result (runs in a worker thread)."""
+    with transaction.atomic():
+        attempt, correct, total = calculate_and_save_score(attempt)
+        return ExamAttemptResultSerializer(attempt, context={
+            'correct_answers': correct,
+            'total_questions': total
+        }).data
+
+
+def _assign_paper(attempt, paper):
+    with transaction.atomic():
+        attempt.question_count = len(paper)
+        attempt.save(update_fields=['question_count'])
+        attempt.assign_questions(paper)
+    return attempt.get_paper()
+
+
+def _save_multiple_select(attempt, question, selected_ids):
+    with transaction.atomic():
+        return save_multiple_select_answer(attempt, question, selected_ids)
+
+
+async def _record_time(attempt_id, question_id, time_spent):
+    """Time an answer once it is saved or buffered (see timing.py)."""
+    if await arecord_answer_time(attempt_id, question_id, time_spent):
+        await acount_answered(attempt_id)
+
+
+class AsyncExamQuestionsView(AsyncAPIView):
+
+    async def get(self, request, exam_id):
+        exam = await aget_exam(exam_id)
+        if exam is None or not exam.is_active:
+            raise Http404("No Exam matches the given query.")
+
+        # Check if user has an active attempt
+        student = request.user
+        attempt = await ExamAttempt.objects.filter(
+            student=student,
+            exam=exam,
+            is_completed=False
+        ).afirst()
+
+        questions = await attempt.aget_paper() if attempt else []
+        if not questions:
+            if attempt:
+                # Active attempt without a paper: assign one to it
+                attempt.exam = exam
+                paper = exam.pick_questions(await aget_question_bank(exam), student.id)
+                questions = await sync_to_async(_assign_paper)(attempt, paper)
+            else:
+                # Get questions based on exam settings (randomized or not)
+                questions = await sync_to_async(exam.get_questions_for_student)(student.id)
+                await sync_to_async(prefetch_related_objects)(questions, 'choices')
+                for question in questions:
+                    question.exam = exam
+                    question.paper_choices = question.get_randomized_choices(student.id)
+
+        return json_response([question_data(question, question.paper_choices) for question in questions])
+
+
+class AsyncStartExamView(AsyncAPIView):
+
+    async def post(self, request, exam_id):
+        exam = await aget_exam(exam_id)
+        if exam is None:
+            raise Http404("No Exam matches the given query.")
+        student = request.user
+
+        if not exam.is_active:
+            return json_response({"detail": "This exam is not currently active."}, status=400)
+
+        paper = exam.pick_questions(await aget_question_bank(exam), student.id)
+        attempt, created = await sync_to_async(ExamAttempt.objects.start_or_resume)(student, exam, paper)
+        if created:
+            await ainvalidate_dashboard(student.id)
+            await ainvalidate_live_roster(exam.id)
+
+        if attempt is None:
+            return json_response({"detail": "You have already completed this exam."}, status=400)
+        attempt.exam = exam
+
+        if not created and is_attempt_expired(attempt, exam):
+            response_data = await sync_to_async(_submit_attempt)(attempt)
+            response_data["detail"] = "Time limit exceeded. Your attempt has been automatically submitted."
+            return json_response(response_data)
+
+        # questions_assigned counts the exam's questions when the paper is empty
+        response_data = await sync_to_async(lambda: ExamAttemptStartSerializer(attempt).data)()
+        if exam.delivery_mode == 'offline':
+            response_data.update(issue_bundle(attempt, await attempt.aget_paper()))
+        if not created:
+            return json_response(response_data)
+
+        response_data['total_questions'] = len(paper)
+        response_data['message'] = f"Exam started with {len(paper)} questions"
+        return json_response(response_data, status=201)
+
+
+class AsyncResumeAttemptView(AsyncAPIView):
+
+    async def get(self, request, attempt_id):
+        attempt = await aget_object_or_404(
+            ExamAttempt.objects.select_related('exam', 'student'),
+            id=attempt_id, student=request.user, is_completed=False
+        )
+        exam = attempt.exam
+
+        if is_attempt_expired(attempt, exam):
+            response_data = await sync_to_async(_submit_attempt)(attempt)
+            response_data["detail"] = "Time limit exceeded. Your attempt has been automatically submitted."
+            return json_response(response_data)
+
+        questions = await attempt.aget_paper()
+        if not questions:
+            paper = exam.pick_questions(await aget_question_bank(exam), request.user.id)
+            questions = await sync_to_async(_assign_paper)(attempt, paper)
+
+        if buffered_ingest():
+            await sync_to_async(flush_answers)(attempt.id, [question.id for question in questions])
+        answer_rows = [row async for row in saved_answer_rows(attempt)]
+        return json_response(resume_data(attempt, questions, answer_rows))
+
+
+class AsyncSubmitAnswerView(AsyncAPIView):
+
+    async def post(self, request, attempt_id):
+        attempt = await aget_object_or_404(
+            ExamAttempt.objects.select_related('exam', 'student'),
+            id=attempt_id, student=request.user, is_completed=False
+        )
+        exam = attempt.exam
+        if exam.delivery_mode == 'offline':
+            # Its answers arrive once, in the signed log (OfflineSyncView)
+            return json_response({"error": "Answers to an offline exam are uploaded with the answer log."},
+                                 status=400)
+
+        question_id = self.data.get('question_id')
+        chosen_choice_id = self.data.get('chosen_choice_id')
+        answer_text = self.data.get('answer_text', '').strip()
+        chosen_choice = None
+
+        if not question_id:
+            return json_response({"error": "question_id is required."}, status=400)
+
+        # Ensure the question is on the student's paper
+        question = await sync_to_async(get_assigned_question)(attempt, question_id)
+        if question is None:
+            return json_response({"error": "This question is not assigned to your attempt."}, status=400)
+        question.exam = exam
+
+        session = None
+        if exam.adaptive:
+            session = await sync_to_async(AdaptiveSession)(attempt, await aget_item_bank(exam))
+            if not session.can_answer(question.id):
+                return json_response({"error": "Adaptive exams take each question once, in the order given."},
+                                     status=400)
+        # The next adaptive question depends on this answer, so it cannot wait in the buffer
+        buffered = buffered_ingest() and session is None
+        time_spent = parse_time_spent(self.data.get('time_spent_ms'), exam)
+
+        if question.question_type == 'MS':
+            selected_ids = parse_selected_choice_ids(answer_text)
+            if buffered:
+                choices = [choice async for choice in question.choices.all()]
+                graded = multiple_select_rows(attempt, question, choices, selected_ids)
+                if graded is not None:
+                    rows, is_correct, question_score = graded
+                    await abuffer_answer(attempt.id, question.id, rows)
+            else:
+                graded = await sync_to_async(_save_multiple_select)(attempt, question, selected_ids)
+                if graded is not None:
+                    is_correct, question_score = graded
+            if graded is None:
+                return json_response({"error": "This question has no correct answers defined."}, status=400)
+            await _record_time(attempt.id, question.id, time_spent)
+            response_data = {
+                "question_id": question_id,
+                "selected_choices": selected_ids,
+                "score": float(question_score),
+                "is_correct": is_correct,
+                "message": "Multiple select answer saved successfully."
+            }
+            if session is not None:
+                response_data['adaptive'] = await sync_to_async(session.record)(question.id, is_correct)
+            return json_response(response_data, status=202 if buffered else 201)
+
+        if question.question_type == 'FB':
+            is_correct, question_score = grade_fill_in_blank(question, answer_text)
+        else:  # MC, TF questions
+            if chosen_choice_id:
+                chosen_choice = await aget_object_or_404(Choice, id=chosen_choice_id, question=question)
+            is_correct, question_score = grade_choice(question, chosen_choice)
+
+        if buffered:
+            # Acknowledge once buffered; the answer is written in a later batch
+            student_answer = StudentAnswer(
+                attempt=attempt, question=question, chosen_choice=chosen_choice,
+                answer_text=answer_text, is_correct=is_correct, score=question_score
+            )
+            await abuffer_answer(attempt.id, question.id, [student_answer])
+            response_status = 202
+        else:
+            student_answer, created = await StudentAnswer.objects.aupsert(
+                attempt,
+                question,
+                chosen_choice=chosen_choice,
+                answer_text=answer_text,
+                is_correct=is_correct,
+                score=question_score
+            )
+            response_status = 201 if created else 200
+        await _record_time(attempt.id, question.id, time_spent)
+
+        # Check for timeout after saving
+        if is_attempt_expired(attempt, exam):
+            result = await sync_to_async(_submit_attempt)(attempt)
+            return json_response({
+                "detail": "Time limit exceeded. Exam auto-submitted.",
+                "result": result
+            }, status=400)
+
+        response_data = student_answer_data(student_answer)
+        if session is not None:
+            response_data['adaptive'] = await sync_to_async(session.record)(question.id, is_correct)
+        return json_response(response_data, status=response_status)
+
+
+class AsyncLiveProgressView(AsyncAPIView):
+    """Async version of LiveProgressView: an open stream holds a coroutine, not a worker thread."""
+
+    async def get(self, request, exam_id):
+        if not request.user.is_staff:
+            return json_response({"detail": "You do not have permission to perform this action."}, status=403)
+        exam = await aget_exam(exam_id)
+        if exam is None:
+            raise Http404("No Exam matches the given query.")
+        student_class = request.GET.get('student_class', exam.student_class or '')
+        response = StreamingHttpResponse(aevents(exam, student_class), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,263 @@
+# backend/exams/caching.py
+"""
+Small read-through caches for the exam hot path.
+
+The exam and question-bank helpers come in a sync and an async flavour so
+that the WSGI views and the ASGI views (see async_views.py) share the same
+keys and invalidation.
+"""
+import time
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from cbt_project.metrics import record_cache
+
+from .models import Exam
+
+EXAM_CACHE_TIMEOUT = getattr(settings, 'EXAM_CACHE_TIMEOUT', 300)
+
+
+def exam_cache_key(exam_id):
+    return f"exams:exam:{exam_id}"
+
+
+def get_exam(exam_id):
+    """Return the Exam with this id (or None), served from the cache when possible."""
+    key = exam_cache_key(exam_id)
+    exam = cache.get(key)
+    record_cache(hit=exam is not None)
+    if exam is None:
+        exam = Exam.objects.filter(id=exam_id).first()
+        if exam is not None:
+            cache.set(key, exam, EXAM_CACHE_TIMEOUT)
+    return exam
+
+
+async def aget_exam(exam_id):
+    """Async version of get_exam()."""
+    key = exam_cache_key(exam_id)
+    exam = await cache.aget(key)
+    record_cache(hit=exam is not None)
+    if exam is None:
+        exam = await Exam.objects.filter(id=exam_id).afirst()
+        if exam is not None:
+            await cache.aset(key, exam, EXAM_CACHE_TIMEOUT)
+    return exam
+
+
+def question_bank_cache_key(exam_id):
+    return f"exams:bank:{exam_id}"
+
+
+def get_question_bank(exam):
+    """Return exam.get_question_bank(), served from the cache when possible."""
+    key = question_bank_cache_key(exam.pk)
+    bank = cache.get(key)
+    record_cache(hit=bank is not None)
+    if bank is None:
+        bank = exam.get_question_bank()
+        cache.set(key, bank, EXAM_CACHE_TIMEOUT)
+    return bank
+
+
+async def aget_question_bank(exam):
+    """Async version of get_question_bank()."""
+    key = question_bank_cache_key(exam.pk)
+    bank = await cache.aget(key)
+    record_cache(hit=bank is not None)
+    if bank is None:
+        bank = await sync_to_async(exam.get_question_bank)()
+        await cache.aset(key, bank, EXAM_CACHE_TIMEOUT)
+    return bank
+
+
+def item_bank_cache_key(exam_id):
+    return f"exams:item-bank:{exam_id}"
+
+
+def get_item_bank(exam):
+    """The question bank as an adaptive.ItemBank (parameter arrays), served from the cache when possible."""
+    from .adaptive import ItemBank
+
+    key = item_bank_cache_key(exam.pk)
+    bank = cache.get(key)
+    record_cache(hit=bank is not None)
+    if bank is None:
+        bank = ItemBank(get_question_bank(exam))
+        cache.set(key, bank, EXAM_CACHE_TIMEOUT)
+    return bank
+
+
+async def aget_item_bank(exam):
+    """Async version of get_item_bank()."""
+    from .adaptive import ItemBank
+
+    key = item_bank_cache_key(exam.pk)
+    bank = await cache.aget(key)
+    record_cache(hit=bank is not None)
+    if bank is None:
+        bank = ItemBank(await aget_question_bank(exam))
+        await cache.aset(key, bank, EXAM_CACHE_TIMEOUT)
+    return bank
+
+
+def invalidate_exam(exam_id):
+    cache.delete(exam_cache_key(exam_id))
+
+
+def invalidate_question_bank(exam_id):
+    cache.delete_many([question_bank_cache_key(exam_id), item_bank_cache_key(exam_id)])
+
+
+def _get_versioned(key, version_key, build, timeout):
+    """
+    Return build(), cached under `key` together with the value of
+    `version_key` it was built from; setting a new version makes it stale.
+    """
+    cached = cache.get_many([key, version_key])
+    version = cached.get(version_key)
+    entry = cached.get(key)
+    hit = entry is not None and version is not None and entry[0] == version
+    record_cache(hit=hit)
+    if hit:
+        return entry[1]
+    if version is None:
+        version = time.time_ns()
+        cache.set(version_key, version, None)
+    data = build()
+    cache.set(key, (version, data), timeout)
+    return data
+
+
+# --- Student dashboard -------------------------------------------------------
+#
+# One entry per student, dropped whenever one of their attempts starts or
+# changes state. Changes to exams (or to their question banks) concern every
+# dashboard, so instead of deleting them all, each entry records the exam-list
+# version it was built from and a bump makes every entry stale at once.
+
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 120)
+EXAM_LIST_VERSION_KEY = "exams:list-version"
+
+
+def dashboard_cache_key(user_id):
+    return f"exams:dashboard:{user_id}"
+
+
+def get_dashboard(user_id, build):
+    """Return build() for this student, served from the cache when it is still current."""
+    return _get_versioned(dashboard_cache_key(user_id), EXAM_LIST_VERSION_KEY, build, DASHBOARD_CACHE_TIMEOUT)
+
+
+def invalidate_dashboard(user_id):
+    cache.delete(dashboard_cache_key(user_id))
+
+
+async def ainvalidate_dashboard(user_id):
+    await cache.adelete(dashboard_cache_key(user_id))
+
+
+def bump_exam_list_version():
+    """Make every cached dashboard stale (an exam or its question bank changed)."""
+    version = time.time_ns()
+    cache.set(EXAM_LIST_VERSION_KEY, version, None)
+    return version
+
+
+# --- Exam statistics -----------------------------------------------------------
+#
+# Staff statistics per exam, and the overview of every exam. Question and
+# choice changes drop the exam's entry and bump the statistics version, which
+# makes the cached overview stale.
+
+STATISTICS_VERSION_KEY = "exams:statistics-version"
+
+
+def statistics_cache_key(exam_id):
+    return f"exams:statistics:{exam_id}"
+
+
+def get_statistics(exam_id, build):
+    """Return build() for this exam, served from the cache when possible."""
+    key = statistics_cache_key(exam_id)
+    data = cache.get(key)
+    record_cache(hit=data is not None)
+    if data is None:
+        data = build()
+        cache.set(key, data, EXAM_CACHE_TIMEOUT)
+    return data
+
+
+def get_statistics_overview(build):
+    """Return build() (every exam's statistics), served from the cache while no exam changed."""
+    return _get_versioned(statistics_cache_key('all'), STATISTICS_VERSION_KEY, build, EXAM_CACHE_TIMEOUT)
+
+
+def invalidate_statistics(exam_id):
+    cache.delete(statistics_cache_key(exam_id))
+    cache.set(STATISTICS_VERSION_KEY, time.time_ns(), None)
+
+
+# --- Class gradebook -----------------------------------------------------------
+#
+# A class's whole grid, rendered, versioned per class: scoring an attempt of a
+# student in the class sets a new version (see gradebook.record_attempt).
+
+GRADEBOOK_CACHE_TIMEOUT = getattr(settings, 'GRADEBOOK_CACHE_TIMEOUT', 3600)
+
+
+def gradebook_cache_key(student_class):
+    return f"exams:gradebook:{quote(student_class)}"
+
+
+def gradebook_version_key(student_class):
+    return f"exams:gradebook-version:{quote(student_class)}"
+
+
+def get_gradebook(student_class, build):
+    """Return build() for this class, served from the cache while none of its results changed."""
+    return _get_versioned(
+        gradebook_cache_key(student_class), gradebook_version_key(student_class), build, GRADEBOOK_CACHE_TIMEOUT
+    )
+
+
+def invalidate_gradebook(student_class):
+    cache.set(gradebook_version_key(student_class), time.time_ns(), None)
+
+
+# --- Live progress -------------------------------------------------------------
+#
+# The roster of a class's live progress stream (see live.py), per exam and
+# class, versioned per exam: starting or submitting an attempt at the exam
+# sets a new version. Every invigilator's stream reads the same entry.
+
+
+def live_roster_cache_key(exam_id, student_class):
+    return f"exams:live:{exam_id}:{quote(student_class)}"
+
+
+def live_roster_version_key(exam_id):
+    return f"exams:live-version:{exam_id}"
+
+
+def get_live_roster(exam_id, student_class, build):
+    """Return build() for this exam and class, served from the cache while no attempt started or ended."""
+    return _get_versioned(
+        live_roster_cache_key(exam_id, student_class), live_roster_version_key(exam_id), build, EXAM_CACHE_TIMEOUT
+    )
+
+
+async def aget_live_roster(exam_id, student_class, build):
+    """Async version of get_live_roster() (build is synchronous)."""
+    return await sync_to_async(get_live_roster)(exam_id, student_class, build)
+
+
+def invalidate_live_roster(exam_id):
+    cache.set(live_roster_version_key(exam_id), time.time_ns(), None)
+
+
+async def ainvalidate_live_roster(exam_id):
+    await cache.aset(live_roster_version_key(exam_id), time.time_ns(), None)
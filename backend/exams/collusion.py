@@ -0,0 +1,155 @@
+# backend/exams/collusion.py
+"""
+Collusion screening: pairs of students in the same class whose wrong answers
+to an exam agree more often than chance allows.
+
+Each completed attempt is encoded as one int32 per question: 0 for a correct
+answer, -1 for none, otherwise the code of its wrong answer (the wrong
+choice, or for Fill-in-the-Blank and Multiple Select the normalized answer
+text). Two students who both got a question wrong give the same wrong
+answer by chance with probability
+
+    pi_q = sum over q's wrong answers k of p_qk^2
+
+where p_qk is the share of the exam's wrong answers to q that were k. For a
+pair, the number of identical wrong answers is then a sum of independent
+Bernoulli(pi_q) over the questions both got wrong, with expectation E and
+variance V, and the pair is flagged when
+
+    z = (identical wrong - E) / sqrt(V)
+
+reaches the threshold and there are at least `min_identical` identical
+wrong answers. With W the one-hot matrix of wrong answers and X the
+both-wrong indicator (attempts x questions), every pair's counts are matrix
+products: identical = W W^T, E = (X * pi) X^T, V = (X * pi (1 - pi)) X^T.
+A class of 2,000 attempts is four 2,000 x 2,000 products, done in blocks of
+BLOCK_ROWS rows to bound memory, so no candidate pre-filtering (locality
+sensitive hashing and the like) is needed at class sizes.
+
+detect_collusion() replaces an exam's unreviewed CollusionFlags; reviewed
+ones are kept. manage.py detect_collusion runs it; flags are listed in the
+admin.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+
+from .models import CollusionFlag, ExamAttempt, StudentAnswer
+from .utils import normalize
+
+Z_THRESHOLD = 4.0
+MIN_IDENTICAL = 5
+BLOCK_ROWS = 1024
+
+
+def encode_responses(exam):
+    """
+    (attempt ids, classes, codes, pi, code_question): the exam's completed
+    attempts, their students' classes, the attempts x questions code matrix,
+    pi per question and the question (column) of every wrong answer code.
+    """
+    attempts = list(ExamAttempt.objects.filter(exam=exam, is_completed=True).order_by('id')
+                    .values_list('id', 'student__student_class'))
+    row = {attempt_id: i for i, (attempt_id, _) in enumerate(attempts)}
+    column = {}
+    wrong_codes = {}  # (question column, answer) -> code
+    code_question = []
+    entries = []
+    answers = (StudentAnswer.objects.filter(attempt__exam=exam, attempt__is_completed=True, slot=0)
+               .values_list('attempt_id', 'question_id', 'chosen_choice_id', 'answer_text', 'is_correct'))
+    for attempt_id, question_id, chosen_choice_id, answer_text, is_correct in answers.iterator(chunk_size=5000):
+        r = row.get(attempt_id)
+        if r is None:
+            continue  # completed after the attempts were read: in the next run
+        q = column.setdefault(question_id, len(column))
+        if is_correct:
+            entries.append((r, q, 0))
+            continue
+        answer = chosen_choice_id if chosen_choice_id is not None else normalize(answer_text)
+        if answer in (None, ''):
+            continue  # left blank
+        code = wrong_codes.get((q, answer))
+        if code is None:
+            code = wrong_codes[(q, answer)] = len(code_question) + 1
+            code_question.append(q)
+        entries.append((r, q, code))
+
+    codes = np.full((len(attempts), len(column)), -1, dtype=np.int32)
+    if entries:
+        rows, columns, values = np.array(entries, dtype=np.int64).T
+        codes[rows, columns] = values
+
+    # pi per question from the exam's whole spread of wrong answers
+    code_question = np.asarray(code_question, dtype=np.int64)
+    counts = np.bincount(codes[codes > 0] - 1, minlength=len(code_question)).astype(np.float64)
+    wrong = np.bincount(code_question, weights=counts, minlength=len(column))
+    share = np.divide(counts, wrong[code_question], out=np.zeros_like(counts), where=wrong[code_question] > 0)
+    pi = np.bincount(code_question, weights=share ** 2, minlength=len(column))
+    classes = [student_class or '' for _, student_class in attempts]
+    return [attempt_id for attempt_id, _ in attempts], classes, codes, pi, code_question
+
+
+def score_pairs(codes, pi, z_threshold=Z_THRESHOLD, min_identical=MIN_IDENTICAL):
+    """
+    The suspicious pairs among the rows of `codes`: a list of (i, j,
+    both_wrong, identical_wrong, expected, z) with i < j.
+    """
+    n = len(codes)
+    wrong_rows, wrong_columns = np.nonzero(codes > 0)
+    wrong_codes = codes[wrong_rows, wrong_columns] - 1
+    # W only needs the wrong answers given at least twice among these rows:
+    # one given once matches no other row
+    shared = np.flatnonzero(np.bincount(wrong_codes) >= 2)
+    column = np.full(wrong_codes.max(initial=-1) + 1, -1, dtype=np.int64)
+    column[shared] = np.arange(len(shared))
+    keep = column[wrong_codes] >= 0
+    one_hot = np.zeros((n, len(shared)), dtype=np.float32)
+    one_hot[wrong_rows[keep], column[wrong_codes[keep]]] = 1
+    both = (codes > 0).astype(np.float32)
+    weighted = both * pi.astype(np.float32)
+    weighted_var = both * (pi * (1 - pi)).astype(np.float32)
+
+    pairs = []
+    for start in range(0, n, BLOCK_ROWS):
+        stop = min(start + BLOCK_ROWS, n)
+        identical = one_hot[start:stop] @ one_hot.T
+        expected = weighted[start:stop] @ both.T
+        variance = weighted_var[start:stop] @ both.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(variance > 0, (identical - expected) / np.sqrt(variance), 0)
+        # Upper triangle only: each pair once, no self-pairs
+        upper = np.arange(start, stop)[:, None] < np.arange(n)[None, :]
+        for i, j in zip(*np.nonzero(upper & (identical >= min_identical) & (z >= z_threshold))):
+            both_wrong = int(both[start + i] @ both[j])
+            pairs.append((start + i, int(j), both_wrong, int(identical[i, j]), float(expected[i, j]), float(z[i, j])))
+    return pairs
+
+
+def detect_collusion(exam, z_threshold=Z_THRESHOLD, min_identical=MIN_IDENTICAL):
+    """Screen the exam's completed attempts, class by class, and save the flags. Returns the new flags."""
+    attempt_ids, classes, codes, pi, _ = encode_responses(exam)
+    groups = defaultdict(list)
+    for i, student_class in enumerate(classes):
+        groups[student_class].append(i)
+
+    flags = []
+    for student_class, members in groups.items():
+        if len(members) < 2:
+            continue
+        members = np.asarray(members)
+        for i, j, both_wrong, identical, expected, z in score_pairs(
+            codes[members], pi, z_threshold, min_identical
+        ):
+            flags.append(CollusionFlag(
+                exam=exam, first_attempt_id=attempt_ids[members[i]], second_attempt_id=attempt_ids[members[j]],
+                student_class=student_class, both_wrong=both_wrong, identical_wrong=identical,
+                expected_identical_wrong=round(expected, 3), z_score=round(z, 2)
+            ))
+
+    with transaction.atomic():
+        CollusionFlag.objects.filter(exam=exam, reviewed=False).delete()
+        reviewed = set(CollusionFlag.objects.filter(exam=exam).values_list('first_attempt_id', 'second_attempt_id'))
+        flags = [flag for flag in flags if (flag.first_attempt_id, flag.second_attempt_id) not in reviewed]
+        CollusionFlag.objects.bulk_create(flags)
+    return flags
@@ -0,0 +1,266 @@
+# backend/exams/export.py
+"""
+Columnar export of completed attempts and their answers, as Parquet, for
+bulk analysis.
+
+Two datasets, with typed columns (timestamps in UTC, scores as decimals,
+ids as int64) and low-cardinality text dictionary-encoded (exam titles,
+classes, question types, choice texts):
+
+  attempts  one row per completed attempt, with its correct answers,
+            percentage and pass/fail
+  answers   one row per StudentAnswer of a completed attempt (Multiple
+            Select selections are rows with slot = the chosen choice)
+
+Rows are read with iterator(), a server-side cursor on PostgreSQL, and
+written BATCH_SIZE rows (one Parquet row group) at a time, so memory stays
+bounded whatever the history size.
+
+manage.py export_results writes partitioned datasets to a directory
+(<dataset>/exam=<id>/ or <dataset>/month=<YYYY-MM>/, hive style; the keys
+are not column names, so readers can add them as columns), and
+with --incremental only the attempts completed since its previous run,
+which it records in STATE_FILE. The results-export endpoint streams one
+dataset as a single Parquet file. pyarrow is required for both.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Exam, ExamAttempt, StudentAnswer
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow is in requirements.txt
+    pa = pq = None
+
+BATCH_SIZE = 50000
+STATE_FILE = '_export_state.json'
+DATASETS = ('attempts', 'answers')
+PARTITIONS = ('exam', 'month')
+# Attempts completing right now may not be committed yet: exports stop this
+# far back, and the next incremental run picks them up.
+SETTLE = timedelta(minutes=1)
+
+
+class ExportError(Exception):
+    pass
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ExportError("Exporting results needs pyarrow (pip install pyarrow).")
+
+
+def schema(dataset):
+    text = pa.dictionary(pa.int32(), pa.string())
+    timestamp = pa.timestamp('us', tz='UTC')
+    if dataset == 'attempts':
+        return pa.schema([
+            ('attempt_id', pa.int64()), ('attempt_uuid', pa.string()), ('exam_id', pa.int64()),
+            ('exam_title', text), ('student_id', pa.int64()), ('student_username', pa.string()),
+            ('student_class', text), ('start_time', timestamp), ('end_time', timestamp),
+            ('questions', pa.int32()), ('correct_answers', pa.int32()), ('percentage', pa.float64()),
+            ('passed', pa.bool_()), ('score', pa.decimal128(7, 2)), ('ability', pa.float64()),
+            ('ability_se', pa.float64()),
+        ])
+    return pa.schema([
+        ('answer_id', pa.int64()), ('attempt_id', pa.int64()), ('exam_id', pa.int64()),
+        ('student_id', pa.int64()), ('question_id', pa.int64()), ('question_type', text),
+        ('slot', pa.int64()), ('chosen_choice_id', pa.int64()), ('chosen_choice', text),
+        ('answer_text', pa.string()), ('is_correct', pa.bool_()), ('score', pa.decimal128(5, 2)),
+        ('completed_at', timestamp),
+    ])
+
+
+def _attempts(filters, order):
+    """(exam id, end time, row) per completed attempt, in `order`."""
+    question_totals = dict(Exam.objects.annotate(n=Count('questions')).values_list('id', 'n'))
+    rows = (
+        ExamAttempt.objects.filter(filters, is_completed=True).order_by(*order)
+        .annotate(correct=Count('student_answers', filter=Q(student_answers__slot=0, student_answers__is_correct=True)))
+        .values_list('id', 'attempt_id', 'exam_id', 'exam__title', 'student_id', 'student__username',
+                     'student__student_class', 'start_time', 'end_time', 'question_count', 'correct', 'score',
+                     'ability', 'ability_se', 'exam__total_questions_to_ask', 'exam__pass_mark')
+    )
+    for (attempt_id, uuid, exam_id, title, student_id, username, student_class, start_time, end_time,
+         question_count, correct, score, ability, ability_se, to_ask, pass_mark) in rows.iterator(chunk_size=BATCH_SIZE):
+        # Like the results the students see (see serializers.attempt_result_data)
+        questions = question_count or to_ask or question_totals.get(exam_id, 0)
+        percentage = round((correct / questions) * 100, 1) if questions else 0.0
+        yield exam_id, end_time, (
+            attempt_id, str(uuid), exam_id, title, student_id, username, student_class or '', start_time, end_time,
+            questions, correct, percentage, percentage >= pass_mark, score, ability, ability_se,
+        )
+
+
+def _answers(filters, order):
+    """(exam id, end time, row) per answer row of a completed attempt, in `order`."""
+    rows = (
+        StudentAnswer.objects.filter(filters, attempt__is_completed=True).order_by(*order)
+        .values_list('id', 'attempt_id', 'attempt__exam_id', 'attempt__student_id', 'question_id',
+                     'question__question_type', 'slot', 'chosen_choice_id', 'chosen_choice__choice_text',
+                     'answer_text', 'is_correct', 'score', 'attempt__end_time')
+    )
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        yield row[2], row[-1], row
+
+
+def rows(dataset, exam_ids=None, since=None, until=None, partition='exam'):
+    """
+    (partition, row) for the dataset's rows, with the attempts completed
+    after `since` and up to `until` (either may be None), grouped by
+    partition: 'exam' (the exam id), 'month' (YYYY-MM of the completion) or
+    None (everything in one).
+    """
+    prefix = '' if dataset == 'attempts' else 'attempt__'
+    filters = Q()
+    if exam_ids is not None:
+        filters &= Q(**{f'{prefix}exam_id__in': exam_ids})
+    if since is not None:
+        filters &= Q(**{f'{prefix}end_time__gt': since})
+    if until is not None:
+        filters &= Q(**{f'{prefix}end_time__lte': until})
+    by = [f'{prefix}exam_id'] if partition == 'exam' else [f'{prefix}end_time']
+    order = by + (['id'] if dataset == 'attempts' else ['attempt_id', 'id'])
+    source = _attempts if dataset == 'attempts' else _answers
+    for exam_id, end_time, row in source(filters, order):
+        if partition == 'exam':
+            yield exam_id, row
+        elif partition == 'month':
+            yield timezone.localtime(end_time).strftime('%Y-%m'), row
+        else:
+            yield None, row
+
+
+def batches(dataset, partitioned_rows):
+    """(partition, RecordBatch of at most BATCH_SIZE rows), cut wherever the partition changes."""
+    names = schema(dataset).names
+    current, chunk = None, []
+
+    def batch():
+        return pa.RecordBatch.from_pydict(dict(zip(names, zip(*chunk))), schema=schema(dataset))
+
+    for partition, row in partitioned_rows:
+        if chunk and (partition != current or len(chunk) == BATCH_SIZE):
+            yield current, batch()
+            chunk = []
+        current = partition
+        chunk.append(row)
+    if chunk:
+        yield current, batch()
+
+
+def partition_dir(directory, dataset, partition_by, value):
+    return os.path.join(directory, dataset, f"{partition_by}={value}")
+
+
+def write_dataset(directory, dataset, partition_by, part_name, **filters):
+    """
+    Write the dataset under `directory`, one file named `part_name` per
+    partition, one partition open at a time. Returns (rows, files) written.
+    """
+    written, files = 0, 0
+    writer, current = None, None
+    try:
+        for partition, batch in batches(dataset, rows(dataset, partition=partition_by, **filters)):
+            if writer is None or partition != current:
+                if writer is not None:
+                    writer.close()
+                path = partition_dir(directory, dataset, partition_by, partition)
+                os.makedirs(path, exist_ok=True)
+                writer = pq.ParquetWriter(os.path.join(path, part_name), batch.schema, compression='zstd')
+                current = partition
+                files += 1
+            writer.write_batch(batch)
+            written += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return written, files
+
+
+def read_state(directory):
+    path = os.path.join(directory, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def export_results(directory, partition_by='exam', exam_ids=None, incremental=False, datasets=DATASETS):
+    """
+    Export the datasets to `directory`. A first run exports everything
+    completed until a minute ago (see SETTLE); with `incremental`, a later
+    run exports what was completed since the previous one, in new part
+    files. Returns {'since', 'until', dataset: (rows, files), ...}.
+    """
+    require_pyarrow()
+    state = read_state(directory)
+    if incremental:
+        if state is None:
+            raise ExportError(f"{directory} holds no previous export to continue.")
+        if exam_ids is not None:
+            raise ExportError("An incremental export covers the exams of the export it continues.")
+        partition_by, datasets, exam_ids = state['partition'], state['datasets'], state['exams']
+        since = datetime.fromisoformat(state['until'])
+    elif state is not None:
+        raise ExportError(f"{directory} already holds an export: continue it with --incremental, "
+                          f"or export to a new directory.")
+    else:
+        since = None
+
+    until = timezone.now() - SETTLE
+    part_name = f"part-{until.strftime('%Y%m%dT%H%M%S%f')}.parquet"
+    report = {'since': since, 'until': until}
+    for dataset in datasets:
+        report[dataset] = write_dataset(directory, dataset, partition_by, part_name,
+                                        exam_ids=exam_ids, since=since, until=until)
+
+    # Recorded last: an interrupted run is redone from the previous watermark
+    state = {'partition': partition_by, 'datasets': list(datasets), 'until': until.isoformat(),
+             'exams': exam_ids}
+    with open(os.path.join(directory, STATE_FILE), 'w') as fh:
+        json.dump(state, fh)
+    return report
+
+
+class _Chunks:
+    """A write-only file for ParquetWriter whose bytes are taken as they are written."""
+
+    def __init__(self):
+        self.chunks, self.position, self.closed = [], 0, False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def stream_dataset(dataset, **filters):
+    """The dataset as one Parquet file, yielded a row group at a time (for a streaming response)."""
+    require_pyarrow()
+    sink = _Chunks()
+    writer = pq.ParquetWriter(sink, schema(dataset), compression='zstd')
+    for _, batch in batches(dataset, rows(dataset, partition=None, **filters)):
+        writer.write_batch(batch)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
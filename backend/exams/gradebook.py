@@ -0,0 +1,206 @@
+# backend/exams/gradebook.py
+"""
+The class gradebook: a student_class x exam grid of results with per-exam
+cohort figures (average, median, pass rate against Exam.pass_mark) and
+ranks.
+
+Results are materialized in GradebookEntry, one row per student and exam,
+written by calculate_and_save_score() with a single upsert whenever an
+attempt is scored (record_attempt). A class's grid is then one indexed
+range of that table, (student_class, exam, -percentage), ranked by the
+database with window functions:
+
+  rank        RANK() over the class's results for the exam, best first
+  percentile  PERCENT_RANK() * 100: the share of the class below the student
+
+so reads never scan ExamAttempt or StudentAnswer. record_attempt() also
+counts the result in the exam's ranking (see ranking.py) once the scoring
+commits, taking a retake's previous result out. A class's full grid is
+also cached, rendered, until a result in the class changes (see
+caching.get_gradebook). manage.py rebuild_gradebook fills the table from the
+completed attempts (after deploying, or when answers were regraded).
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Avg, Count, F, Q, Window
+from django.db.models.functions import PercentRank, Rank
+
+from . import ranking
+from .caching import invalidate_gradebook
+from .models import Exam, ExamAttempt, GradebookEntry
+
+BATCH_SIZE = 2000
+UPDATE_FIELDS = (
+    'attempt', 'student_class', 'score', 'correct_answers', 'total_questions', 'percentage', 'passed',
+    'completed_at'
+)
+
+
+def entry_for(attempt, correct_answers, total_questions):
+    """The GradebookEntry of a scored attempt; the percentage is the one results show."""
+    percentage = round((correct_answers / total_questions) * 100, 1) if total_questions else 0
+    return GradebookEntry(
+        student_id=attempt.student_id, exam_id=attempt.exam_id, attempt_id=attempt.pk,
+        student_class=attempt.student.student_class or '', score=attempt.score,
+        correct_answers=correct_answers, total_questions=total_questions, percentage=percentage,
+        passed=percentage >= attempt.exam.pass_mark, completed_at=attempt.end_time
+    )
+
+
+def save_entries(entries):
+    """Insert or overwrite the entries (one per student and exam) in one statement per batch."""
+    GradebookEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, update_conflicts=True,
+        unique_fields=['student', 'exam'], update_fields=UPDATE_FIELDS
+    )
+
+
+def record_attempt(attempt, correct_answers, total_questions):
+    """Put a scored attempt in the gradebook (see calculate_and_save_score)."""
+    entry = entry_for(attempt, correct_answers, total_questions)
+    # Locked, so two scorings of a retake cannot both take the same result out
+    previous = (GradebookEntry.objects.select_for_update()
+                .filter(student_id=entry.student_id, exam_id=entry.exam_id)
+                .values_list('percentage', flat=True).first())
+    save_entries([entry])
+    # The ranking counts the change once committed, so a rolled-back scoring
+    # leaves it as it was; until then the attempt's own result reads it from
+    # ranking_pending (see ranking.positions)
+    attempt.ranking_pending = [(entry.percentage, 1)] + ([(previous, -1)] if previous is not None else [])
+
+    def count(changes=attempt.ranking_pending):
+        for percentage, delta in changes:
+            ranking.add(entry.exam_id, percentage, delta)
+        attempt.ranking_pending = []
+
+    transaction.on_commit(count)
+    transaction.on_commit(lambda: invalidate_gradebook(entry.student_class))
+
+
+def rebuild_gradebook(exam_ids=None):
+    """
+    Rewrite the gradebook entries of these exams (all when None) from their
+    completed attempts, the latest one of a retaken exam. Returns the number
+    of entries written.
+    """
+    exams = Exam.objects.annotate(question_total=Count('questions'))
+    # A student's attempts at an exam come in a row, the latest last
+    attempts = (ExamAttempt.objects.with_results().filter(is_completed=True)
+                .order_by('student_id', 'exam_id', 'end_time', 'id'))
+    entries = GradebookEntry.objects.all()
+    if exam_ids is not None:
+        exams = exams.filter(id__in=exam_ids)
+        attempts = attempts.filter(exam_id__in=exam_ids)
+        entries = entries.filter(exam_id__in=exam_ids)
+    question_totals = {exam.pk: exam.question_total for exam in exams}
+
+    written = 0
+    with transaction.atomic():
+        entries.delete()
+        batch, latest = [], None
+        for attempt in attempts.iterator(chunk_size=BATCH_SIZE):
+            exam = attempt.exam
+            total = attempt.question_count or exam.total_questions_to_ask or question_totals.get(exam.pk, 0)
+            entry = entry_for(attempt, attempt.correct_answer_count, total)
+            # One entry per (student, exam): ON CONFLICT cannot update a row twice in a statement
+            if latest is not None and (latest.student_id, latest.exam_id) != (entry.student_id, entry.exam_id):
+                batch.append(latest)
+                if len(batch) == BATCH_SIZE:
+                    save_entries(batch)
+                    written += len(batch)
+                    batch = []
+            latest = entry
+        if latest is not None:
+            batch.append(latest)
+        save_entries(batch)
+        written += len(batch)
+        classes = set(GradebookEntry.objects.values_list('student_class', flat=True).distinct())
+        transaction.on_commit(lambda: [invalidate_gradebook(student_class) for student_class in classes])
+        transaction.on_commit(lambda: ranking.invalidate(question_totals))
+    return written
+
+
+def class_overview():
+    """Per student_class: students, results, average percentage and pass rate, from one grouped query."""
+    rows = (
+        GradebookEntry.objects.order_by('student_class').values('student_class')
+        .annotate(students=Count('student', distinct=True), results=Count('id'),
+                  average=Avg('percentage'), passed=Count('id', filter=Q(passed=True)))
+    )
+    return [
+        {
+            'student_class': row['student_class'],
+            'students': row['students'],
+            'results': row['results'],
+            'average': round(row['average'], 1),
+            'pass_rate': round(row['passed'] / row['results'], 4),
+        }
+        for row in rows
+    ]
+
+
+def class_gradebook(student_class, exam_ids=None):
+    """
+    The class's grid: its exams (with cohort figures) and its students,
+    each with one cell per exam, aligned with the exams (None where the
+    student has no result). Three queries: the ranked entries, the exams and
+    the students.
+    """
+    entries = GradebookEntry.objects.filter(student_class=student_class)
+    if exam_ids is not None:
+        entries = entries.filter(exam_id__in=exam_ids)
+    rows = list(
+        entries.annotate(
+            rank=Window(Rank(), partition_by=F('exam_id'), order_by=F('percentage').desc()),
+            percentile=Window(PercentRank(), partition_by=F('exam_id'), order_by=F('percentage').asc()),
+        ).values_list('student_id', 'exam_id', 'percentage', 'passed', 'rank', 'percentile')
+    )
+
+    by_exam = defaultdict(list)
+    by_student = defaultdict(dict)
+    for student_id, exam_id, percentage, passed, rank, percentile in rows:
+        by_exam[exam_id].append((percentage, passed))
+        by_student[student_id][exam_id] = {
+            'percentage': percentage,
+            'passed': passed,
+            'rank': rank,
+            'percentile': round(percentile * 100, 1),
+        }
+
+    exams = list(Exam.objects.filter(id__in=by_exam).order_by('title').values('id', 'title', 'pass_mark'))
+    for exam in exams:
+        percentages = np.array([percentage for percentage, _ in by_exam[exam['id']]])
+        passed = sum(1 for _, passed in by_exam[exam['id']] if passed)
+        lower, median, upper = np.percentile(percentages, [25, 50, 75])
+        exam.update({
+            'students': len(percentages),
+            'average': round(float(percentages.mean()), 1),
+            'median': round(float(median), 1),
+            'lower_quartile': round(float(lower), 1),
+            'upper_quartile': round(float(upper), 1),
+            'highest': float(percentages.max()),
+            'lowest': float(percentages.min()),
+            'pass_rate': round(passed / len(percentages), 4),
+        })
+
+    students = []
+    names = get_user_model().objects.filter(id__in=by_student).values_list('id', 'username', 'first_name', 'last_name')
+    for student_id, username, first_name, last_name in names:
+        cells = by_student[student_id]
+        students.append({
+            'id': student_id,
+            'username': username,
+            'name': f"{first_name} {last_name}".strip(),
+            'average': round(sum(cell['percentage'] for cell in cells.values()) / len(cells), 1),
+            'results': [cells.get(exam['id']) for exam in exams],
+        })
+    students.sort(key=lambda student: (-student['average'], student['username']))
+    for position, student in enumerate(students):
+        # Standard competition ranking on the overall average, like RANK()
+        tied = position and student['average'] == students[position - 1]['average']
+        student['class_rank'] = students[position - 1]['class_rank'] if tied else position + 1
+
+    return {'student_class': student_class, 'exams': exams, 'students': students}
@@ -0,0 +1,177 @@
+# backend/exams/ingest.py
+"""
+Write-behind answer ingest (ANSWER_INGEST = 'buffered').
+
+In the default 'direct' mode SubmitAnswerView commits every answer to
+StudentAnswer before it responds. In buffered mode it grades the answer, puts
+it in the cache and acknowledges (202) without writing to the database; the
+buffered answers reach StudentAnswer in batches:
+
+  - when the attempt is scored: calculate_and_save_score() flushes first, so
+    the final submit, the auto-submit on expiry and the expired-attempt
+    sweeper (manage.py submit_expired_attempts) always score every answer;
+  - when the paper is resumed (the resume view reads saved answers);
+  - periodically, from manage.py flush_answer_buffer.
+
+The buffer holds one entry per (attempt, question): a later answer to the
+same question replaces the earlier one, so a student who changes their mind
+ten times costs one row write, and a flush writes all of an attempt's
+answers in one DELETE and one INSERT. Each entry carries a random token;
+the flusher remembers the token it last wrote per question and skips
+entries it has already written.
+
+Durability is the cache's: use Redis with persistence (appendonly) in
+production. The default local-memory cache is a stand-in for development and
+tests only, since it is neither shared between worker processes nor kept
+across restarts.
+"""
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import AttemptQuestion, ExamAttempt, StudentAnswer
+
+BUFFER_TIMEOUT = getattr(settings, 'ANSWER_BUFFER_TIMEOUT', 24 * 3600)
+FLUSH_LOCK_TIMEOUT = 30
+
+logger = logging.getLogger(__name__)
+
+
+def buffered_ingest():
+    return getattr(settings, 'ANSWER_INGEST', 'direct') == 'buffered'
+
+
+def answer_key(attempt_id, question_id):
+    return f"exams:ingest:answer:{attempt_id}:{question_id}"
+
+
+def pending_key(attempt_id):
+    return f"exams:ingest:pending:{attempt_id}"
+
+
+def flushed_key(attempt_id):
+    return f"exams:ingest:flushed:{attempt_id}"
+
+
+def lock_key(attempt_id):
+    return f"exams:ingest:lock:{attempt_id}"
+
+
+def _entry(rows):
+    """A cache entry for a question's StudentAnswer rows (unsaved, already graded)."""
+    return (uuid.uuid4().hex, [
+        (row.slot, row.chosen_choice_id, row.answer_text, row.is_correct, str(row.score)) for row in rows
+    ])
+
+
+def buffer_answer(attempt_id, question_id, rows):
+    """Buffer the answer to a question (its graded StudentAnswer rows), replacing any earlier one."""
+    # The entry goes in before the pending mark, which a flush clears before reading
+    cache.set(answer_key(attempt_id, question_id), _entry(rows), BUFFER_TIMEOUT)
+    cache.add(pending_key(attempt_id), True, BUFFER_TIMEOUT)
+
+
+async def abuffer_answer(attempt_id, question_id, rows):
+    """Async version of buffer_answer()."""
+    await cache.aset(answer_key(attempt_id, question_id), _entry(rows), BUFFER_TIMEOUT)
+    await cache.aadd(pending_key(attempt_id), True, BUFFER_TIMEOUT)
+
+
+@contextmanager
+def _flush_lock(attempt_id):
+    """
+    One flusher per attempt (a scoring flush waits for a periodic one to
+    finish), held until the transaction commits, when its writes and the
+    flushed tokens become visible to the next flusher. On an error it is
+    released at once; if the caller's transaction rolls back later, it
+    expires after FLUSH_LOCK_TIMEOUT.
+    """
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + FLUSH_LOCK_TIMEOUT
+    while not cache.add(lock_key(attempt_id), token, FLUSH_LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            break  # a flusher died holding the lock; rewriting the same answers is harmless
+        time.sleep(0.01)
+
+    def release():
+        if cache.get(lock_key(attempt_id)) == token:
+            cache.delete(lock_key(attempt_id))
+
+    try:
+        yield
+    except BaseException:
+        release()
+        raise
+    transaction.on_commit(release)
+
+
+def _write(attempt_id, question_ids=None):
+    cache.delete(pending_key(attempt_id))
+    if question_ids is None:
+        question_ids = list(AttemptQuestion.objects.filter(attempt_id=attempt_id).values_list('question_id', flat=True))
+    keys = {answer_key(attempt_id, question_id): question_id for question_id in question_ids}
+    entries = cache.get_many(list(keys))
+    flushed = cache.get(flushed_key(attempt_id)) or {}
+    todo = {
+        keys[key]: entry for key, entry in entries.items() if flushed.get(keys[key]) != entry[0]
+    }
+    if not todo:
+        return 0
+
+    rows = [
+        StudentAnswer(
+            attempt_id=attempt_id, question_id=question_id, slot=slot, chosen_choice_id=chosen_choice_id,
+            answer_text=answer_text, is_correct=is_correct, score=Decimal(score)
+        )
+        for question_id, (_, answer_rows) in todo.items()
+        for slot, chosen_choice_id, answer_text, is_correct, score in answer_rows
+    ]
+    StudentAnswer.objects.filter(attempt_id=attempt_id, question_id__in=todo).delete()
+    StudentAnswer.objects.bulk_create(rows)
+
+    flushed.update((question_id, entry[0]) for question_id, entry in todo.items())
+    transaction.on_commit(lambda: cache.set(flushed_key(attempt_id), flushed, BUFFER_TIMEOUT))
+    return len(todo)
+
+
+def flush_answers(attempt_id, question_ids=None):
+    """
+    Write the attempt's buffered answers to StudentAnswer. `question_ids` is
+    the attempt's paper (read from AttemptQuestion when not given). Returns
+    the number of questions written. Joins the caller's transaction; the
+    answers only count as flushed once it commits.
+    """
+    with _flush_lock(attempt_id), transaction.atomic():
+        return _write(attempt_id, question_ids)
+
+
+def flush_pending():
+    """
+    Flush every open attempt with buffered answers. Returns (attempts,
+    questions) written. An attempt that fails is logged and left to the next
+    run, so that flush_answer_buffer --interval keeps going.
+    """
+    open_ids = list(ExamAttempt.objects.filter(is_completed=False).values_list('id', flat=True))
+    pending = cache.get_many([pending_key(attempt_id) for attempt_id in open_ids])
+    attempts = questions = 0
+    for attempt_id in open_ids:
+        if pending_key(attempt_id) not in pending:
+            continue
+        try:
+            with _flush_lock(attempt_id), transaction.atomic():
+                # Scored since open_ids was read: the scoring flushed its answers
+                if not ExamAttempt.objects.select_for_update().filter(pk=attempt_id, is_completed=False).exists():
+                    continue
+                written = _write(attempt_id)
+        except Exception:
+            logger.exception("Flushing the buffered answers of attempt %s failed", attempt_id)
+            continue
+        attempts += bool(written)
+        questions += written
+    return attempts, questions
@@ -0,0 +1,203 @@
+# backend/exams/irt.py
+"""
+Item response theory calibration of question banks from stored answers.
+
+Each question gets a difficulty b and a discrimination a, fitted to the exam's
+completed attempts under the logistic model
+
+    P(correct | ability) = 1 / (1 + exp(-a * (ability - b)))
+
+with abilities distributed N(0, 1) over the exam's candidates ('2pl'), or
+with one discrimination shared by every question ('1pl'). Scores are
+dichotomous (StudentAnswer.is_correct), and a question off an attempt's
+paper is missing data, not a wrong answer.
+
+fit() is marginal maximum likelihood by EM over a fixed quadrature grid of
+abilities (Bock and Aitkin): the E step is two matrix products of the
+attempt x question response matrix with the grid's log-probabilities, and
+the M step a few Newton steps for all questions at once. Weak normal priors
+on a and on the intercept keep questions that (almost) everyone gets right
+or wrong finite.
+
+calibrate_exam() loads an exam's matrix, fits it and writes irt_difficulty,
+irt_discrimination and irt_calibrated_at onto its questions; questions with
+fewer than `min_responses` answers are set back to null.
+manage.py calibrate_irt runs it over many exams on a process pool, and
+benchmarks/irt_calibration.py times fit() on synthetic data.
+"""
+import time
+from collections import namedtuple
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .analysis import BATCH_SIZE, response_indices
+from .caching import invalidate_question_bank
+from .models import ExamAttempt, Question
+
+MODELS = ('1pl', '2pl')
+QUADRATURE_POINTS = 41
+MAX_ITERATIONS = 500
+TOLERANCE = 1e-3
+NEWTON_STEPS = 3
+MIN_RESPONSES = 50
+# Prior standard deviations: intercept around 0, discrimination around 1
+PRIOR_SD_INTERCEPT = 4.0
+PRIOR_SD_DISCRIMINATION = 1.0
+DISCRIMINATION_RANGE = (0.05, 5.0)
+# Log posterior weights below this (relative to the mode) are taken as zero
+NEGLIGIBLE = -60.0
+# irt_difficulty cut-offs between the hand-set difficulty levels
+LEVEL_CUTOFFS = (-0.5, 0.5)
+
+Calibration = namedtuple('Calibration', ['a', 'b', 'responses', 'iterations', 'converged', 'log_likelihood'])
+
+
+def quadrature(points=QUADRATURE_POINTS):
+    """Ability grid on [-4, 4] and the log of its N(0, 1) weights."""
+    theta = np.linspace(-4, 4, points)
+    log_weights = -theta ** 2 / 2
+    log_weights -= np.logaddexp.reduce(log_weights)
+    return theta, log_weights
+
+
+def _probabilities(theta, a, c):
+    """log P(correct) and log P(wrong), grid points x questions."""
+    z = np.outer(theta, a) + c
+    return -np.logaddexp(0, -z), -np.logaddexp(0, z)
+
+
+def _m_step(theta, r, n, a, c, model):
+    """Newton steps on each question's expected log-likelihood; r and n are expected correct/answered per grid point."""
+    a, c = a.copy(), c.copy()
+    for _ in range(NEWTON_STEPS):
+        p = np.exp(_probabilities(theta, a, c)[0])
+        residual = r - n * p
+        information = n * p * (1 - p)
+        g_c = residual.sum(axis=0) - c / PRIOR_SD_INTERCEPT ** 2
+        h_cc = information.sum(axis=0) + 1 / PRIOR_SD_INTERCEPT ** 2
+        g_a = residual.T @ theta - (a - 1) / PRIOR_SD_DISCRIMINATION ** 2
+        h_aa = information.T @ theta ** 2 + 1 / PRIOR_SD_DISCRIMINATION ** 2
+        if model == '1pl':
+            # The intercepts, then the shared discrimination
+            c += g_c / h_cc
+            a += g_a.sum() / h_aa.sum()
+        else:
+            h_ac = information.T @ theta
+            det = h_aa * h_cc - h_ac ** 2
+            a += (h_cc * g_a - h_ac * g_c) / det
+            c += (h_aa * g_c - h_ac * g_a) / det
+        np.clip(a, *DISCRIMINATION_RANGE, out=a)
+    return a, c
+
+
+def fit(correct, on_paper=None, model='2pl', max_iterations=MAX_ITERATIONS, tolerance=TOLERANCE,
+        points=QUADRATURE_POINTS):
+    """
+    Fit item parameters to a response matrix: `correct` is attempts x
+    questions (1 for a correct answer, else 0) and `on_paper` marks the
+    questions each attempt was asked (all of them when None). Returns a
+    Calibration with per-question a, b and number of responses.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown IRT model {model!r}; use one of {', '.join(MODELS)}.")
+    # float32 halves the memory of a 50k x 500 matrix; the products are accumulated in float64
+    correct = np.asarray(correct, dtype=np.float32)
+    on_paper = np.ones_like(correct) if on_paper is None else np.asarray(on_paper, dtype=np.float32)
+    correct = correct * on_paper
+    wrong = on_paper - correct
+    responses = on_paper.sum(axis=0)
+
+    theta, log_weights = quadrature(points)
+    proportion = (correct.sum(axis=0) + 0.5) / (responses + 1)
+    a = np.ones(correct.shape[1])
+    c = np.log(proportion / (1 - proportion))
+    log_likelihood = -np.inf
+    converged = False
+    for iteration in range(1, max_iterations + 1):
+        # E step: posterior over the grid for every attempt
+        log_p, log_q = _probabilities(theta, a, c)
+        log_posterior = (correct @ log_p.T.astype(np.float32)).astype(np.float64)
+        log_posterior += wrong @ log_q.T.astype(np.float32)
+        log_posterior += log_weights
+        top = log_posterior.max(axis=1, keepdims=True)
+        log_posterior -= top
+        # Grid points this far from the mode weigh nothing, and would be float32 subnormals (slow in BLAS)
+        posterior = np.exp(log_posterior, out=np.zeros_like(log_posterior), where=log_posterior > NEGLIGIBLE)
+        marginal = posterior.sum(axis=1, keepdims=True)
+        log_likelihood = float((top + np.log(marginal)).sum())
+        posterior = (posterior / marginal).astype(np.float32)
+
+        # M step on the expected counts per grid point
+        r = (posterior.T @ correct).astype(np.float64)
+        n = (posterior.T @ on_paper).astype(np.float64)
+        new_a, new_c = _m_step(theta, r, n, a, c, model)
+        change = max(np.abs(new_a - a).max(initial=0), np.abs(new_c - c).max(initial=0))
+        a, c = new_a, new_c
+        if change < tolerance:
+            converged = True
+            break
+    return Calibration(a, -c / a, responses.astype(np.int64), iteration, converged, log_likelihood)
+
+
+def difficulty_level(b):
+    """The hand-set difficulty level an irt_difficulty corresponds to."""
+    if b < LEVEL_CUTOFFS[0]:
+        return 'easy'
+    return 'hard' if b > LEVEL_CUTOFFS[1] else 'medium'
+
+
+def response_matrix(exam_id, batch_size=BATCH_SIZE):
+    """(question ids, correct, on_paper) over the exam's completed attempts, as float32 matrices."""
+    question_ids = np.asarray(sorted(Question.objects.filter(exam_id=exam_id).values_list('id', flat=True)),
+                              dtype=np.int64)
+    attempt_ids = np.asarray(
+        ExamAttempt.objects.filter(exam_id=exam_id, is_completed=True).order_by('id').values_list('id', flat=True),
+        dtype=np.int64
+    )
+    correct = np.zeros((len(attempt_ids), len(question_ids)), dtype=np.float32)
+    on_paper = np.zeros_like(correct)
+    for start in range(0, len(attempt_ids), batch_size):
+        batch = attempt_ids[start:start + batch_size]
+        (rows, columns), (correct_rows, correct_columns) = response_indices(batch, question_ids)
+        on_paper[rows + start, columns] = 1
+        correct[correct_rows + start, correct_columns] = 1
+    return question_ids, correct, on_paper
+
+
+def calibrate_exam(exam_id, model='2pl', min_responses=MIN_RESPONSES):
+    """
+    Calibrate an exam's questions and save the parameters. Returns a summary
+    dict; safe to run in a worker process (it takes and returns plain data).
+    """
+    started = time.monotonic()
+    question_ids, correct, on_paper = response_matrix(exam_id)
+    summary = {'exam': exam_id, 'attempts': len(correct), 'questions': 0, 'iterations': 0, 'converged': True,
+               'level_mismatches': 0}
+    if len(correct) and len(question_ids):
+        calibration = fit(correct, on_paper, model=model)
+        summary.update(iterations=calibration.iterations, converged=calibration.converged)
+        parameters = {
+            question_id: (float(b), float(a)) if responses >= min_responses else (None, None)
+            for question_id, a, b, responses in zip(question_ids.tolist(), calibration.a, calibration.b,
+                                                    calibration.responses)
+        }
+    else:
+        parameters = dict.fromkeys(question_ids.tolist(), (None, None))
+
+    now = timezone.now()
+    questions = list(Question.objects.filter(id__in=parameters).only('id', 'difficulty_level'))
+    for question in questions:
+        question.irt_difficulty, question.irt_discrimination = parameters[question.id]
+        question.irt_calibrated_at = now if question.irt_difficulty is not None else None
+        if question.irt_difficulty is not None:
+            summary['questions'] += 1
+            summary['level_mismatches'] += difficulty_level(question.irt_difficulty) != question.difficulty_level
+    with transaction.atomic():
+        Question.objects.bulk_update(questions, ['irt_difficulty', 'irt_discrimination', 'irt_calibrated_at'],
+                                     batch_size=500)
+    # bulk_update() sends no signals; the cached banks carry the parameters (see adaptive.py)
+    invalidate_question_bank(exam_id)
+    summary['seconds'] = round(time.monotonic() - started, 2)
+    return summary
@@ -0,0 +1,226 @@
+# backend/exams/live.py
+"""
+Live progress of a sitting for invigilators: for an exam and a class, who
+has started, how many questions each student has answered, their time left
+and who has submitted, streamed as server-sent events.
+
+Nothing here scans the attempt or answer tables on a refresh:
+
+  - answered counts are cache counters, one per attempt, incremented by the
+    answer path once an answer is saved, on the question's first saved
+    answer (timing's per-question counter tells it, see
+    timing.record_answer_time), so rejected answers do not count;
+  - the roster (the class's students and their attempts at the exam) takes
+    two queries, and is cached per exam and class until an attempt at the
+    exam starts or ends (see caching.get_live_roster);
+
+so an update is two get_many() calls. Updates are rendered once per
+interval and shared (cached for INTERVAL seconds) by every invigilator
+watching the class. Like timing, the counters need a shared cache (Redis)
+in production.
+
+A stream sends a snapshot every LIVE_PROGRESS_INTERVAL seconds and ends
+after LIVE_PROGRESS_STREAM_SECONDS; the browser's EventSource then
+reconnects by itself. Under WSGI an open stream holds a worker thread;
+with EXAMS_ASYNC_VIEWS=1 under ASGI it only holds a coroutine.
+"""
+import asyncio
+import time
+from collections import Counter
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer
+
+from cbt_project.fastjson import FastJSONRenderer
+
+from .caching import aget_live_roster, get_live_roster
+from .models import ExamAttempt
+
+INTERVAL = getattr(settings, 'LIVE_PROGRESS_INTERVAL', 2)
+STREAM_SECONDS = getattr(settings, 'LIVE_PROGRESS_STREAM_SECONDS', 60)
+COUNTER_TIMEOUT = getattr(settings, 'ANSWER_BUFFER_TIMEOUT', 24 * 3600)
+
+_datetime = serializers.DateTimeField().to_representation
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets DRF views accept EventSource's `Accept: text/event-stream`; errors are sent as one event."""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return event(data)
+
+
+def answered_key(attempt_id):
+    return f"exams:live:answered:{attempt_id}"
+
+
+def count_answered(attempt_id):
+    """Count a question answered for the first time in the attempt."""
+    key = answered_key(attempt_id)
+    cache.add(key, 0, COUNTER_TIMEOUT)
+    try:
+        cache.incr(key)
+    except ValueError:  # expired in between
+        cache.set(key, 1, COUNTER_TIMEOUT)
+
+
+async def acount_answered(attempt_id):
+    """Async version of count_answered()."""
+    key = answered_key(attempt_id)
+    await cache.aadd(key, 0, COUNTER_TIMEOUT)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, COUNTER_TIMEOUT)
+
+
+def build_roster(exam, student_class):
+    """
+    The class's students, by name, each with their attempt at the exam (or
+    None); times are formatted here, once, rather than on every update.
+    """
+    duration = timedelta(minutes=exam.duration_minutes)
+    attempts = {}
+    for attempt in (ExamAttempt.objects.filter(exam=exam, student__student_class=student_class)
+                    .values('id', 'student_id', 'start_time', 'end_time', 'is_completed', 'question_count')):
+        ends_at = attempt['start_time'] + duration
+        attempts[attempt['student_id']] = {
+            'id': attempt['id'],
+            'is_completed': attempt['is_completed'],
+            'questions': attempt['question_count'] or exam.total_questions_to_ask,
+            'started_at': _datetime(attempt['start_time']),
+            'ends_at': _datetime(ends_at),
+            'ends_timestamp': ends_at.timestamp(),
+            'submitted_at': _datetime(attempt['end_time']) if attempt['is_completed'] and attempt['end_time'] else None,
+        }
+    students = (get_user_model().objects.filter(Q(is_student=True) | Q(id__in=attempts), student_class=student_class)
+                .order_by('last_name', 'first_name', 'username').values_list('id', 'username', 'first_name', 'last_name'))
+    return [
+        {
+            'student_id': student_id,
+            'username': username,
+            'name': f"{first_name} {last_name}".strip(),
+            'attempt': attempts.get(student_id),
+        }
+        for student_id, username, first_name, last_name in students
+    ]
+
+
+def snapshot(exam, student_class, roster, answered, now):
+    """The stream's payload from the roster and the answered counters ({attempt id: count})."""
+    timestamp = now.timestamp()
+    summary = Counter()
+    students = []
+    for student in roster:
+        attempt = student['attempt']
+        row = {'student_id': student['student_id'], 'username': student['username'], 'name': student['name']}
+        if attempt is None:
+            row.update(status='not_started', attempt_id=None, answered=0, questions=None,
+                       started_at=None, ends_at=None, remaining_seconds=None, submitted_at=None)
+        else:
+            if attempt['is_completed']:
+                status = 'submitted'
+            else:
+                status = 'in_progress' if timestamp < attempt['ends_timestamp'] else 'time_up'
+            row.update(
+                status=status,
+                attempt_id=attempt['id'],
+                answered=answered.get(attempt['id'], 0),
+                questions=attempt['questions'],
+                started_at=attempt['started_at'],
+                ends_at=attempt['ends_at'],
+                remaining_seconds=int(attempt['ends_timestamp'] - timestamp) if status == 'in_progress' else 0,
+                submitted_at=attempt['submitted_at'],
+            )
+        summary[row['status']] += 1
+        students.append(row)
+    return {
+        'exam_id': exam.id,
+        'title': exam.title,
+        'student_class': student_class,
+        'duration_minutes': exam.duration_minutes,
+        'now': _datetime(now),
+        'summary': {status: summary[status] for status in ('not_started', 'in_progress', 'time_up', 'submitted')},
+        'students': students,
+    }
+
+
+def _attempt_ids(roster):
+    return [student['attempt']['id'] for student in roster if student['attempt'] is not None]
+
+
+def _answered(counters):
+    return {int(key.rsplit(':', 1)[1]): count for key, count in counters.items()}
+
+
+def progress(exam, student_class):
+    """The class's live progress at the exam, from the cache."""
+    roster = get_live_roster(exam.id, student_class, lambda: build_roster(exam, student_class))
+    counters = cache.get_many([answered_key(attempt_id) for attempt_id in _attempt_ids(roster)])
+    return snapshot(exam, student_class, roster, _answered(counters), timezone.now())
+
+
+async def aprogress(exam, student_class):
+    """Async version of progress()."""
+    roster = await aget_live_roster(exam.id, student_class, lambda: build_roster(exam, student_class))
+    counters = await cache.aget_many([answered_key(attempt_id) for attempt_id in _attempt_ids(roster)])
+    return snapshot(exam, student_class, roster, _answered(counters), timezone.now())
+
+
+def event(data):
+    return b'data: ' + FastJSONRenderer().render(data) + b'\n\n'
+
+
+def event_cache_key(exam_id, student_class):
+    return f"exams:live-event:{exam_id}:{quote(student_class)}"
+
+
+def progress_event(exam, student_class):
+    """progress() as an event, rendered at most once per INTERVAL for all streams."""
+    key = event_cache_key(exam.id, student_class)
+    data = cache.get(key)
+    if data is None:
+        data = event(progress(exam, student_class))
+        cache.set(key, data, INTERVAL)
+    return data
+
+
+async def aprogress_event(exam, student_class):
+    """Async version of progress_event()."""
+    key = event_cache_key(exam.id, student_class)
+    data = await cache.aget(key)
+    if data is None:
+        data = event(await aprogress(exam, student_class))
+        await cache.aset(key, data, INTERVAL)
+    return data
+
+
+def events(exam, student_class):
+    """The server-sent events of one stream: a snapshot every INTERVAL seconds for STREAM_SECONDS."""
+    yield f"retry: {INTERVAL * 1000}\n\n".encode()
+    deadline = time.monotonic() + STREAM_SECONDS
+    while True:
+        yield progress_event(exam, student_class)
+        if time.monotonic() + INTERVAL > deadline:
+            return
+        time.sleep(INTERVAL)
+
+
+async def aevents(exam, student_class):
+    """Async version of events()."""
+    yield f"retry: {INTERVAL * 1000}\n\n".encode()
+    deadline = time.monotonic() + STREAM_SECONDS
+    while True:
+        yield await aprogress_event(exam, student_class)
+        if time.monotonic() + INTERVAL > deadline:
+            return
+        await asyncio.sleep(INTERVAL)
@@ -0,0 +1,70 @@
+# backend/exams/management/commands/calibrate_irt.py
+"""
+Fit IRT parameters to the exams' stored answers and write them onto the
+questions (see exams/irt.py):
+
+    python manage.py calibrate_irt                      # every exam, 2PL
+    python manage.py calibrate_irt --exam 12 --model 1pl
+    OMP_NUM_THREADS=1 python manage.py calibrate_irt --workers 8
+
+With --workers above 1 the exams are calibrated in parallel worker
+processes, each with its own database connection. Give each worker one BLAS
+thread (OMP_NUM_THREADS=1 or OPENBLAS_NUM_THREADS=1), or the processes fight
+over the cores. The output counts the calibrated questions whose
+difficulty_level disagrees with their fitted difficulty.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from exams.irt import MIN_RESPONSES, MODELS, calibrate_exam
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Calibrate IRT difficulty and discrimination of the exams' questions from their answers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, action='append', help="Exam id (repeatable; default: all exams).")
+        parser.add_argument('--model', choices=MODELS, default='2pl')
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes.")
+        parser.add_argument('--min-responses', type=int, default=MIN_RESPONSES,
+                            help="Leave questions with fewer answers uncalibrated.")
+
+    def handle(self, *args, **options):
+        exam_ids = list(Exam.objects.order_by('id').values_list('id', flat=True))
+        if options['exam']:
+            missing = set(options['exam']) - set(exam_ids)
+            if missing:
+                raise CommandError(f"No exam with id {', '.join(map(str, sorted(missing)))}.")
+            exam_ids = [exam_id for exam_id in exam_ids if exam_id in options['exam']]
+        arguments = (options['model'], options['min_responses'])
+
+        if options['workers'] > 1 and len(exam_ids) > 1:
+            # Fresh interpreters, so no worker inherits this process's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup,
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = [pool.submit(calibrate_exam, exam_id, *arguments) for exam_id in exam_ids]
+                summaries = [self.report(future.result()) for future in as_completed(futures)]
+        else:
+            summaries = [self.report(calibrate_exam(exam_id, *arguments)) for exam_id in exam_ids]
+
+        questions = sum(summary['questions'] for summary in summaries)
+        mismatches = sum(summary['level_mismatches'] for summary in summaries)
+        self.stdout.write(self.style.SUCCESS(
+            f"Calibrated {questions} questions in {len(summaries)} exams; "
+            f"{mismatches} disagree with their difficulty level."
+        ))
+
+    def report(self, summary):
+        message = (f"Exam {summary['exam']}: {summary['questions']} questions from {summary['attempts']} attempts, "
+                   f"{summary['iterations']} iterations ({summary['seconds']:.2f}s)")
+        if summary['converged']:
+            self.stdout.write(message)
+        else:
+            self.stdout.write(self.style.WARNING(f"{message}, did not converge"))
+        return summary
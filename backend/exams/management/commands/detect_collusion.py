@@ -0,0 +1,43 @@
+# backend/exams/management/commands/detect_collusion.py
+"""
+Screen exams for students of the same class with improbably many identical
+wrong answers (see exams/collusion.py):
+
+    python manage.py detect_collusion                   # every exam
+    python manage.py detect_collusion --exam 12 --z 3.5 --min-identical 4
+
+Each run replaces the exams' unreviewed flags; flags marked reviewed in the
+admin are kept.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.collusion import MIN_IDENTICAL, Z_THRESHOLD, detect_collusion
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Flag pairs of attempts whose wrong answers agree more often than chance."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, action='append', help="Exam id (repeatable; default: all exams).")
+        parser.add_argument('--z', type=float, default=Z_THRESHOLD, help="Smallest z-score to flag.")
+        parser.add_argument('--min-identical', type=int, default=MIN_IDENTICAL,
+                            help="Smallest number of identical wrong answers to flag.")
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.order_by('id')
+        if options['exam']:
+            exams = exams.filter(id__in=options['exam'])
+            missing = set(options['exam']) - set(exams.values_list('id', flat=True))
+            if missing:
+                raise CommandError(f"No exam with id {', '.join(map(str, sorted(missing)))}.")
+        total = 0
+        for exam in exams:
+            started = time.monotonic()
+            flags = detect_collusion(exam, z_threshold=options['z'], min_identical=options['min_identical'])
+            total += len(flags)
+            if flags:
+                self.stdout.write(f"{exam.title}: {len(flags)} pairs flagged ({time.monotonic() - started:.2f}s)")
+        self.stdout.write(self.style.SUCCESS(f"{total} pairs flagged."))
@@ -0,0 +1,57 @@
+# backend/exams/management/commands/export_results.py
+"""
+Export completed attempts and their answers as partitioned Parquet
+datasets (see exams/export.py):
+
+    python manage.py export_results /data/cbt                  # by exam
+    python manage.py export_results /data/cbt --partition month
+    python manage.py export_results /data/cbt --exam 12 --dataset attempts
+    python manage.py export_results /data/cbt --incremental    # e.g. nightly
+
+The first run exports everything; --incremental runs add the attempts
+completed since the previous run, with its partitioning, exams and datasets.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cbt_project.db_routers import replica_reads
+from exams.export import DATASETS, PARTITIONS, ExportError, export_results
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Export completed attempts and answers to partitioned Parquet files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help="Directory of the datasets (created if missing).")
+        parser.add_argument('--partition', choices=PARTITIONS, default='exam', help="Partition by exam or by month.")
+        parser.add_argument('--exam', type=int, action='append', help="Exam id (repeatable; default: all exams).")
+        parser.add_argument('--dataset', choices=DATASETS, action='append',
+                            help="attempts or answers (repeatable; default: both).")
+        parser.add_argument('--incremental', action='store_true',
+                            help="Only the attempts completed since the previous export to this directory.")
+
+    def handle(self, *args, **options):
+        if options['exam']:
+            missing = set(options['exam']) - set(Exam.objects.filter(id__in=options['exam']).values_list('id', flat=True))
+            if missing:
+                raise CommandError(f"No exam with id {', '.join(map(str, sorted(missing)))}.")
+        started = time.monotonic()
+        try:
+            with replica_reads():
+                report = export_results(
+                    options['directory'], partition_by=options['partition'], exam_ids=options['exam'],
+                    incremental=options['incremental'], datasets=options['dataset'] or DATASETS
+                )
+        except ExportError as e:
+            raise CommandError(str(e))
+        for dataset in DATASETS:
+            if dataset in report:
+                rows, files = report[dataset]
+                self.stdout.write(f"{dataset}: {rows} rows in {files} files")
+        since = f" since {report['since']:%Y-%m-%d %H:%M}" if report['since'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported the attempts completed{since} until {report['until']:%Y-%m-%d %H:%M} "
+            f"({time.monotonic() - started:.2f}s)."
+        ))
@@ -0,0 +1,38 @@
+# backend/exams/management/commands/flush_answer_buffer.py
+"""
+Write buffered answers to StudentAnswer (ANSWER_INGEST = 'buffered', see
+exams/ingest.py):
+
+    python manage.py flush_answer_buffer               # once
+    python manage.py flush_answer_buffer --interval 5  # every 5 seconds, until stopped
+
+Scoring flushes an attempt's answers by itself; this keeps the database (and
+so the admin, reports and statistics) close behind what students have
+answered while the exam is running.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from exams.ingest import buffered_ingest, flush_pending
+
+
+class Command(BaseCommand):
+    help = "Write the answers in the write-behind buffer to the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Keep flushing, every this many seconds (default: flush once).")
+
+    def handle(self, *args, **options):
+        if not buffered_ingest():
+            self.stdout.write(self.style.WARNING("ANSWER_INGEST is not 'buffered': there is nothing to flush."))
+        while True:
+            started = time.monotonic()
+            attempts, questions = flush_pending()
+            if attempts or not options['interval']:
+                self.stdout.write(f"Flushed {questions} answers of {attempts} attempts "
+                                  f"in {time.monotonic() - started:.2f}s.")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
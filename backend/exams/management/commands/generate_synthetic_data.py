@@ -0,0 +1,392 @@
+# backend/exams/management/commands/generate_synthetic_data.py
+"""
+Bulk-generate a realistic dataset for benchmarking:
+
+    python manage.py generate_synthetic_data --students 50000 --exams 500 \
+        --classes 40 --answers 20000000 --seed 1
+
+creates students spread over classes, exams for each class with a mixed
+MC/TF/FB/MS question bank, and each student's attempts at their class's
+exams: papers picked the way the app picks them, and answer histories
+(including Multiple Select selection rows) graded with the app's rules.
+
+Answers follow an item response model, so score distributions look like a
+real school's: every student has an ability (around a class mean), every
+question a difficulty (from its difficulty level) and discrimination, and
+P(correct) = guess + (1 - guess) / (1 + exp(-a * (ability - difficulty))).
+A few questions are skipped, and --in-progress of the attempts are still
+open with part of their paper answered. Answered questions get a time on
+task (lognormal around TIME_ON_TASK_MS, longer for harder questions) and
+sometimes a changed answer.
+
+Everything is written with bulk inserts (COPY on PostgreSQL), one
+transaction per --chunk-size students, and all students share one password
+hash (--password), so there is no per-user PBKDF2. The data is a function
+of --seed and --prefix: the same pair on an empty database gives the same
+dataset, and further runs into the same database need a new --prefix.
+--users-csv writes the students' "email,password" lines for
+benchmarks/session_load.py --users.
+"""
+import csv
+import math
+import random
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from exams.models import AttemptQuestion, Choice, Exam, ExamAttempt, PaperItem, Question, StudentAnswer, shuffle_choices
+from exams.utils import grade_fill_in_blank, grade_multiple_select
+
+LEVELS = ('JSS1', 'JSS2', 'JSS3', 'SS1', 'SS2', 'SS3')
+SUBJECTS = (
+    'Mathematics', 'English Language', 'Basic Science', 'Physics', 'Chemistry', 'Biology',
+    'Economics', 'Geography', 'Civic Education', 'Computer Studies', 'Agricultural Science', 'Literature',
+)
+QUESTION_TYPES = (('MC', 0.6), ('TF', 0.15), ('FB', 0.1), ('MS', 0.15))
+DIFFICULTY = {'easy': -1.0, 'medium': 0.0, 'hard': 1.0}
+GUESS = {'MC': 0.25, 'TF': 0.5, 'FB': 0.0, 'MS': 0.0}
+WORDS = ('photosynthesis', 'abuja', 'oxygen', 'seven', 'democracy', 'equator', 'noun', 'gravity', 'nile', 'supply')
+SKIP_RATE = 0.02
+TIME_ON_TASK_MS = 40000
+CHANGE_RATE = 0.15
+
+# Simulation parameters of one question, next to what grading needs.
+Item = namedtuple('Item', ['question', 'type', 'points', 'a', 'b', 'guess', 'correct_ids', 'wrong_ids', 'answer',
+                           'choice_texts'])
+
+ANSWER_FIELDS = ('attempt', 'question', 'chosen_choice', 'answer_text', 'is_correct', 'score', 'answer_id', 'slot')
+PAPER_FIELDS = ('attempt', 'position', 'question', 'choice_order', 'time_spent_ms', 'answer_count')
+ATTEMPT_FIELDS = ('student', 'exam', 'start_time', 'end_time', 'score', 'is_completed', 'attempt_id', 'question_count')
+
+
+def _uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _prep(connection, fields):
+    """The columns whose values the driver can't take as they are (in COPY or executemany)."""
+    if connection.vendor == 'postgresql':
+        types = ('JSONField',)
+    else:
+        types = ('JSONField', 'UUIDField', 'DateTimeField')
+    return [(i, field) for i, field in enumerate(fields) if field.get_internal_type() in types]
+
+
+def _prepared(connection, fields, rows):
+    prep = _prep(connection, fields)
+    for row in rows:
+        if prep:
+            row = list(row)
+            for i, field in prep:
+                row[i] = field.get_db_prep_save(row[i], connection)
+        yield row
+
+
+def copy_rows(using, model, field_names, rows):
+    """Append rows (tuples in field_names order; foreign keys as ids): COPY on PostgreSQL, executemany elsewhere."""
+    connection = connections[using]
+    opts = model._meta
+    qn = connection.ops.quote_name
+    fields = [opts.get_field(name) for name in field_names]
+    columns = ', '.join(qn(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            with cursor.cursor.copy(f"COPY {qn(opts.db_table)} ({columns}) FROM STDIN") as copy:
+                for row in _prepared(connection, fields, rows):
+                    copy.write_row(row)
+        else:
+            placeholders = ', '.join(['%s'] * len(fields))
+            cursor.executemany(f"INSERT INTO {qn(opts.db_table)} ({columns}) VALUES ({placeholders})",
+                               list(_prepared(connection, fields, rows)))
+
+
+def insert_returning_ids(using, model, field_names, rows, batch_size=500):
+    """
+    Insert rows and return their primary keys in order. Unlike bulk_create()
+    this keeps the given values of auto_now_add fields (attempt start times).
+    """
+    connection = connections[using]
+    opts = model._meta
+    qn = connection.ops.quote_name
+    fields = [opts.get_field(name) for name in field_names]
+    columns = ', '.join(qn(field.column) for field in fields)
+    row_sql = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    rows = [[field.get_db_prep_save(value, connection) for field, value in zip(fields, row)] for row in rows]
+    ids = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.execute(
+                f"INSERT INTO {qn(opts.db_table)} ({columns}) VALUES {', '.join([row_sql] * len(batch))} "
+                f"RETURNING {qn(opts.pk.column)}",
+                [value for row in batch for value in row]
+            )
+            ids += [pk for pk, in cursor.fetchall()]
+    return ids
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate students, exams, attempts and answers for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--exams', type=int, default=50)
+        parser.add_argument('--classes', type=int, default=10)
+        parser.add_argument('--answers', type=int, default=400000,
+                            help="Target number of answered questions (attempts = answers / paper size).")
+        parser.add_argument('--bank-size', type=int, default=60, help="Questions per exam.")
+        parser.add_argument('--paper-size', type=int, default=40, help="Questions asked per attempt.")
+        parser.add_argument('--in-progress', type=float, default=0.01, help="Fraction of attempts left open.")
+        parser.add_argument('--days', type=int, default=180, help="Spread attempts over this many days.")
+        parser.add_argument('--until', help="Last day of the attempts (YYYY-MM-DD); defaults to today.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='synth', help="Prefix of the generated emails, usernames and student IDs.")
+        parser.add_argument('--password', default='Synthetic-pass-1', help="Password of every generated student.")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Students generated per transaction.")
+        parser.add_argument('--users-csv', help="Write the students' email,password lines to this file.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        self.using = options['database']
+        if connections[self.using].vendor not in ('postgresql', 'sqlite'):
+            raise CommandError("generate_synthetic_data needs PostgreSQL or SQLite.")
+        if min(options['students'], options['exams'], options['classes'], options['paper_size']) < 1:
+            raise CommandError("--students, --exams, --classes and --paper-size must be positive.")
+        if options['bank_size'] < options['paper_size']:
+            raise CommandError("--bank-size must be at least --paper-size.")
+
+        self.options = options
+        # The prefix is part of the seed: runs with different prefixes don't collide on UUIDs.
+        self.rng = random.Random(f"{options['seed']}:{options['prefix']}")
+        until = datetime.strptime(options['until'], '%Y-%m-%d').date() if options['until'] else datetime.now().date()
+        self.until = datetime.combine(until, dt_time(18, 0), tzinfo=dt_timezone.utc)
+        started = time.perf_counter()
+
+        classes = [f"{LEVELS[i % len(LEVELS)]}{chr(ord('A') + i // len(LEVELS) % 26)}{i // (26 * len(LEVELS)) or ''}"
+                   for i in range(options['classes'])]
+        self.class_means = {name: self.rng.gauss(0, 0.4) for name in classes}
+        with transaction.atomic(using=self.using):
+            self.class_exams, self.items, self.banks = self.create_exams(classes)
+        self.stdout.write(f"{options['exams']} exams with {options['bank_size']} questions each "
+                          f"({time.perf_counter() - started:.1f}s)")
+
+        # Attempts per student, as a fraction: each student sits int() or int() + 1 exams.
+        per_student = options['answers'] / options['paper_size'] / options['students']
+        most = min(len(exams) for exams in self.class_exams.values())
+        if per_student > most:
+            self.stdout.write(self.style.WARNING(
+                f"Only {most} exams per class: capping at {most} attempts per student "
+                f"(add --exams for more answers)."
+            ))
+        self.per_student = min(per_student, most)
+
+        self.password_hash = make_password(options['password'])
+        totals = {'students': 0, 'attempts': 0, 'answers': 0, 'rows': 0}
+        csv_file = open(options['users_csv'], 'w', newline='') if options['users_csv'] else None
+        try:
+            for start in range(0, options['students'], options['chunk_size']):
+                count = min(options['chunk_size'], options['students'] - start)
+                with transaction.atomic(using=self.using):
+                    students = self.create_students(start, count, classes)
+                    self.create_attempts(students, totals)
+                totals['students'] += count
+                if csv_file:
+                    csv.writer(csv_file).writerows((student.email, options['password']) for student in students)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{totals['students']} students, {totals['attempts']} attempts, "
+                                  f"{totals['answers']} answers ({totals['rows'] / elapsed:,.0f} rows/s)")
+        finally:
+            if csv_file:
+                csv_file.close()
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s."))
+
+    def create_exams(self, classes):
+        rng, options = self.rng, self.options
+        exams = []
+        for i in range(options['exams']):
+            student_class = classes[i % len(classes)]
+            exams.append(Exam(
+                title=f"{SUBJECTS[i // len(classes) % len(SUBJECTS)]} ({student_class}) #{i + 1}",
+                description="Synthetic exam.",
+                duration_minutes=rng.choice((30, 45, 60)),
+                pass_mark=50,
+                passing_score=50,
+                is_active=True,
+                exam_id=_uuid(rng),
+                student_class=student_class,
+                total_questions_to_ask=options['paper_size'] if options['bank_size'] > options['paper_size'] else None,
+                randomize_questions=options['bank_size'] > options['paper_size'] or rng.random() < 0.5,
+                randomize_choices=rng.random() < 0.5,
+            ))
+        Exam.objects.using(self.using).bulk_create(exams)
+
+        questions, specs = [], []
+        types, weights = zip(*QUESTION_TYPES)
+        for exam in exams:
+            for n in range(options['bank_size']):
+                question_type = rng.choices(types, weights)[0]
+                difficulty = rng.choice(tuple(DIFFICULTY))
+                answer = rng.choice(WORDS) if question_type == 'FB' else None
+                questions.append(Question(
+                    exam=exam,
+                    question_text=f"{exam.title}: question {n + 1}",
+                    question_type=question_type,
+                    score_points=Decimal(2 if question_type == 'MS' else 1),
+                    correct_answer=answer,
+                    question_id=_uuid(rng),
+                    difficulty_level=difficulty,
+                ))
+                specs.append((rng.uniform(0.6, 2.0), rng.gauss(DIFFICULTY[difficulty], 0.5)))
+        Question.objects.using(self.using).bulk_create(questions, batch_size=2000)
+
+        choices = []
+        for question in questions:
+            if question.question_type == 'TF':
+                correct = rng.random() < 0.5
+                choices += [Choice(question=question, choice_text='True', is_correct=correct, choice_id=_uuid(rng)),
+                            Choice(question=question, choice_text='False', is_correct=not correct,
+                                   choice_id=_uuid(rng))]
+            elif question.question_type in ('MC', 'MS'):
+                size = 4 if question.question_type == 'MC' else 5
+                correct = set(rng.sample(range(size), 1 if question.question_type == 'MC' else rng.randint(2, 3)))
+                choices += [
+                    Choice(question=question, choice_text=f"Option {chr(ord('A') + k)}", is_correct=k in correct,
+                           choice_id=_uuid(rng))
+                    for k in range(size)
+                ]
+        Choice.objects.using(self.using).bulk_create(choices, batch_size=5000)
+
+        by_question = {}
+        for choice in choices:
+            by_question.setdefault(choice.question_id, []).append(choice)
+        items, banks, class_exams = {}, {}, {}
+        for question, (a, b) in zip(questions, specs):
+            question_choices = by_question.get(question.pk, [])
+            items[question.pk] = Item(
+                question=question, type=question.question_type, points=question.score_points, a=a, b=b,
+                guess=GUESS[question.question_type],
+                correct_ids=frozenset(c.pk for c in question_choices if c.is_correct),
+                wrong_ids=tuple(c.pk for c in question_choices if not c.is_correct),
+                answer=question.correct_answer,
+                choice_texts={c.pk: c.choice_text for c in question_choices},
+            )
+            banks.setdefault(question.exam_id, []).append(
+                PaperItem(question.pk, question.question_id, tuple(c.pk for c in question_choices))
+            )
+        for exam in exams:
+            class_exams.setdefault(exam.student_class, []).append(exam)
+        return class_exams, items, banks
+
+    def create_students(self, start, count, classes):
+        rng, prefix = self.rng, self.options['prefix']
+        User = get_user_model()
+        students = []
+        for i in range(start, start + count):
+            first, last = f"Student{i + 1}", prefix.capitalize()
+            students.append(User(
+                email=f"{prefix}{i + 1}@example.com",
+                username=f"{prefix}{i + 1}",
+                first_name=first,
+                last_name=last,
+                password=self.password_hash,
+                is_student=True,
+                student=True,
+                student_id=f"{prefix.upper()}-{i + 1:07d}",
+                student_class=rng.choice(classes),
+                date_joined=self.until - timedelta(days=self.options['days'] + rng.randint(0, 60)),
+            ))
+            students[-1].ability = rng.gauss(self.class_means[students[-1].student_class], 1.0)
+        User.objects.using(self.using).bulk_create(students)
+        return students
+
+    def create_attempts(self, students, totals):
+        rng, options = self.rng, self.options
+        attempts, outcomes = [], []
+        for student in students:
+            exams = self.class_exams[student.student_class]
+            k = int(self.per_student) + (rng.random() < self.per_student % 1)
+            for exam in rng.sample(exams, min(k, len(exams))):
+                # Each attempt gets its own generator, so the rest of the data doesn't depend on its paper.
+                arng = random.Random(rng.getrandbits(64))
+                attempt_id = _uuid(arng)
+                completed = arng.random() >= options['in_progress']
+                if completed:
+                    start_time = self.until - timedelta(seconds=arng.uniform(0, options['days'] * 86400))
+                    end_time = start_time + timedelta(seconds=exam.duration_minutes * 60 * arng.uniform(0.35, 1.0))
+                else:
+                    start_time = self.until - timedelta(seconds=arng.uniform(0, exam.duration_minutes * 60))
+                    end_time = None
+                # The paper depends on the student's primary key, like in the app.
+                paper = exam.pick_questions(self.banks[exam.pk], student.pk)
+                answered = len(paper) if completed else arng.randint(0, len(paper))
+                answers, score = self.answer(student, paper[:answered], arng)
+                attempts.append((student.pk, exam.pk, start_time, end_time, score if completed else Decimal('0.00'),
+                                 completed, attempt_id, len(paper)))
+                outcomes.append((exam, student, paper, answers, arng))
+
+        ids = insert_returning_ids(self.using, ExamAttempt, ATTEMPT_FIELDS, attempts)
+        paper_rows, answer_rows = [], []
+        for attempt_id, (exam, student, paper, answers, arng) in zip(ids, outcomes):
+            answered = {question_id for question_id, *_, slot in answers if slot == 0}
+            for position, item in enumerate(paper):
+                choice_order = []
+                if exam.randomize_choices:
+                    choice_order = list(item.choice_ids)
+                    shuffle_choices(choice_order, item.question_id, student.pk)
+                time_spent, answer_count = 0, 0
+                if item.id in answered:
+                    mu = math.log(TIME_ON_TASK_MS) + 0.3 * self.items[item.id].b
+                    time_spent = min(int(arng.lognormvariate(mu, 0.6)), exam.duration_minutes * 60000)
+                    answer_count = 1 + (arng.random() < CHANGE_RATE)
+                paper_rows.append((attempt_id, position, item.id, choice_order, time_spent, answer_count))
+            for question_id, choice_id, text, correct, score, slot in answers:
+                answer_rows.append((attempt_id, question_id, choice_id, text, correct, score, _uuid(arng), slot))
+        copy_rows(self.using, AttemptQuestion, PAPER_FIELDS, paper_rows)
+        copy_rows(self.using, StudentAnswer, ANSWER_FIELDS, answer_rows)
+        totals['attempts'] += len(ids)
+        totals['answers'] += sum(1 for row in answer_rows if row[-1] == 0)
+        totals['rows'] += len(ids) + len(paper_rows) + len(answer_rows)
+
+    def answer(self, student, paper, rng):
+        """
+        Simulate the student's answers to `paper`. Returns the answer rows as
+        (question, chosen_choice, answer_text, is_correct, score, slot) and the total score.
+        """
+        rows, total = [], Decimal('0.00')
+        for paper_item in paper:
+            if rng.random() < SKIP_RATE:
+                continue
+            item = self.items[paper_item.id]
+            p = item.guess + (1 - item.guess) / (1 + math.exp(-item.a * (student.ability - item.b)))
+            correct = rng.random() < p
+            if item.type == 'FB':
+                text = item.answer if correct else rng.choice(WORDS + ('', 'i dont know'))
+                correct, score = grade_fill_in_blank(item.question, text)
+                rows.append((item.question.pk, None, text, correct, score, 0))
+            elif item.type == 'MS':
+                selected = set(item.correct_ids)
+                if not correct:
+                    selected.discard(rng.choice(tuple(selected)))
+                    if rng.random() < 0.6:
+                        selected.add(rng.choice(item.wrong_ids))
+                selected = sorted(selected)
+                correct, score = grade_multiple_select(item.question, selected, item.correct_ids)
+                per_choice = item.points / len(item.correct_ids)
+                for choice_id in selected:
+                    hit = choice_id in item.correct_ids
+                    rows.append((item.question.pk, choice_id, item.choice_texts[choice_id], hit,
+                                 round(per_choice if hit else Decimal('0.00'), 2), choice_id))
+                rows.append((item.question.pk, None, ','.join(map(str, selected)), correct, score, 0))
+            else:
+                choice_id = next(iter(item.correct_ids)) if correct else rng.choice(item.wrong_ids)
+                score = item.points if correct else Decimal('0.00')
+                rows.append((item.question.pk, choice_id, '', correct, score, 0))
+            total += score
+        return rows, total
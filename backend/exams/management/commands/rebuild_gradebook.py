@@ -0,0 +1,35 @@
+# backend/exams/management/commands/rebuild_gradebook.py
+"""
+Rewrite the class gradebook (see exams/gradebook.py) from the completed
+attempts:
+
+    python manage.py rebuild_gradebook                  # every exam
+    python manage.py rebuild_gradebook --exam 12 --exam 13
+
+Scoring keeps the gradebook up to date; run this once after deploying it,
+and after answers were regraded.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.gradebook import rebuild_gradebook
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Rebuild the gradebook entries from the completed attempts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, action='append', help="Exam id (repeatable; default: all exams).")
+
+    def handle(self, *args, **options):
+        if options['exam']:
+            missing = set(options['exam']) - set(Exam.objects.filter(id__in=options['exam']).values_list('id', flat=True))
+            if missing:
+                raise CommandError(f"No exam with id {', '.join(map(str, sorted(missing)))}.")
+        started = time.monotonic()
+        written = rebuild_gradebook(options['exam'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} gradebook entries ({time.monotonic() - started:.2f}s)."
+        ))
@@ -0,0 +1,39 @@
+# backend/exams/management/commands/rebuild_rankings.py
+"""
+Rebuild the cached per-exam rankings (see exams/ranking.py) from the
+gradebook:
+
+    python manage.py rebuild_rankings                  # every exam
+    python manage.py rebuild_rankings --exam 12 --exam 13
+
+A ranking missing from the cache is rebuilt on its next read; run this to
+recover from a cache that lost single entries, or to warm the cache after a
+flush.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.models import Exam
+from exams.ranking import build, total
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-exam rank and percentile structures from the gradebook."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, action='append', help="Exam id (repeatable; default: all exams).")
+
+    def handle(self, *args, **options):
+        exam_ids = set(Exam.objects.values_list('id', flat=True))
+        if options['exam']:
+            missing = set(options['exam']) - exam_ids
+            if missing:
+                raise CommandError(f"No exam with id {', '.join(map(str, sorted(missing)))}.")
+            exam_ids = set(options['exam'])
+        started = time.monotonic()
+        trees = build(exam_ids)
+        ranked = sum(total(tree) for tree in trees.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt the rankings of {len(trees)} exams, {ranked} results ({time.monotonic() - started:.2f}s)."
+        ))
@@ -0,0 +1,47 @@
+# backend/exams/management/commands/submit_expired_attempts.py
+"""
+Submit every open attempt whose time is up:
+
+    python manage.py submit_expired_attempts [--dry-run]
+
+Students who close the tab before the end are otherwise only submitted when
+they come back. Scoring flushes buffered answers first (see exams/ingest.py).
+Offline exams get OFFLINE_SYNC_GRACE_SECONDS more, for the answer log upload.
+Run it from cron every few minutes.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from exams.models import ExamAttempt
+from exams.utils import calculate_and_save_score, is_attempt_expired
+
+
+class Command(BaseCommand):
+    help = "Submit the open exam attempts whose time is up."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="List the attempts without submitting them.")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        offline_grace = timedelta(seconds=getattr(settings, 'OFFLINE_SYNC_GRACE_SECONDS', 900))
+        submitted = 0
+        for attempt in ExamAttempt.objects.filter(is_completed=False).select_related('exam', 'student'):
+            grace = offline_grace if attempt.exam.delivery_mode == 'offline' else timedelta(0)
+            if not is_attempt_expired(attempt, attempt.exam, now - grace):
+                continue
+            if options['dry_run']:
+                self.stdout.write(f"Would submit {attempt} (attempt {attempt.id})")
+            else:
+                with transaction.atomic():
+                    # Skip attempts submitted since they were listed
+                    if not ExamAttempt.objects.select_for_update().filter(pk=attempt.pk, is_completed=False).exists():
+                        continue
+                    calculate_and_save_score(attempt)
+            submitted += 1
+        verb = "Would submit" if options['dry_run'] else "Submitted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {submitted} expired attempts."))
@@ -0,0 +1,42 @@
+# backend/exams/management/commands/update_item_analysis.py
+"""
+Bring exams' item analyses up to date (see exams/analysis.py):
+
+    python manage.py update_item_analysis               # every exam, new attempts only
+    python manage.py update_item_analysis --exam 12 --rebuild
+
+Only attempts completed since the last run are read, so this is cheap enough
+for cron. --rebuild starts over from every completed attempt, e.g. after
+answers were regraded.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.analysis import update_item_analysis
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Add newly completed attempts to the exams' item analyses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, action='append', help="Exam id (repeatable; default: all exams).")
+        parser.add_argument('--rebuild', action='store_true', help="Recompute from all completed attempts.")
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.select_related('item_analysis').order_by('id')
+        if options['exam']:
+            exams = exams.filter(id__in=options['exam'])
+            missing = set(options['exam']) - set(exams.values_list('id', flat=True))
+            if missing:
+                raise CommandError(f"No exam with id {', '.join(map(str, sorted(missing)))}.")
+        for exam in exams:
+            started = time.monotonic()
+            before = 0 if options['rebuild'] else getattr(getattr(exam, 'item_analysis', None), 'attempt_count', 0)
+            analysis = update_item_analysis(exam, rebuild=options['rebuild'])
+            added = analysis.attempt_count - before
+            if added or options['rebuild']:
+                self.stdout.write(f"{exam.title}: {added} attempts added, {analysis.attempt_count} in total "
+                                  f"({time.monotonic() - started:.2f}s)")
+        self.stdout.write(self.style.SUCCESS("Item analyses are up to date."))
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:55
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min
+
+
+def backfill_slots_and_remove_duplicates(apps, schema_editor):
+    """
+    Prepare existing rows for the constraints added in 0013:
+    - Multiple Select selection rows get their chosen choice as slot.
+    - Duplicate answer rows keep only the latest one.
+    - Duplicate open attempts (double-clicked Start) keep only the first one,
+      which is the one StartExamView and ExamQuestionsView have been serving.
+      The others are deleted, with their answers (cascade), and nothing is
+      logged: back up exams_examattempt first if those answers matter.
+    """
+    db_alias = schema_editor.connection.alias
+    StudentAnswer = apps.get_model('exams', 'StudentAnswer')
+    ExamAttempt = apps.get_model('exams', 'ExamAttempt')
+
+    StudentAnswer.objects.using(db_alias).filter(
+        question__question_type='MS',
+        chosen_choice__isnull=False
+    ).update(slot=F('chosen_choice_id'))
+
+    duplicate_answers = (
+        StudentAnswer.objects.using(db_alias).values('attempt_id', 'question_id', 'slot')
+        .annotate(keep=Max('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicate_answers:
+        StudentAnswer.objects.using(db_alias).filter(
+            attempt_id=row['attempt_id'], question_id=row['question_id'], slot=row['slot']
+        ).exclude(id=row['keep']).delete()
+
+    duplicate_attempts = (
+        ExamAttempt.objects.using(db_alias).filter(is_completed=False)
+        .values('student_id', 'exam_id')
+        .annotate(keep=Min('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicate_attempts:
+        ExamAttempt.objects.using(db_alias).filter(
+            student_id=row['student_id'], exam_id=row['exam_id'], is_completed=False
+        ).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0011_remove_examattempt_pass_mark_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentanswer',
+            name='slot',
+            field=models.PositiveIntegerField(default=0, help_text='0 for the answer row of a question; the chosen choice ID for Multiple Select selection rows.'),
+        ),
+        migrations.RunPython(backfill_slots_and_remove_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0012_studentanswer_slot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(fields=['student', 'exam', 'is_completed'], name='attempt_student_exam_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['student', '-end_time'], name='attempt_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['start_time'], name='attempt_open_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['exam', 'question_type'], name='question_exam_type_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='examattempt',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_completed', False)), fields=('student', 'exam'), name='unique_open_attempt'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentanswer',
+            constraint=models.UniqueConstraint(fields=('attempt', 'question', 'slot'), name='unique_answer_slot'),
+        ),
+    ]
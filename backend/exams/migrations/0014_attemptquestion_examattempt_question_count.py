@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0013_hot_path_indexes_and_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examattempt',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, help_text="Number of questions on this attempt's paper (see AttemptQuestion)."),
+        ),
+        migrations.CreateModel(
+            name='AttemptQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('choice_order', models.JSONField(blank=True, default=list, help_text='Choice IDs in the order shown to the student; empty when choices are not randomized.')),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paper', to='exams.examattempt')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_assignments', to='exams.question')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('attempt', 'position'), name='unique_attempt_position'), models.UniqueConstraint(fields=('attempt', 'question'), name='unique_attempt_question')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:58
+
+import random
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def backfill_attempt_papers(apps, schema_editor):
+    """Copy every ExamAttempt.assigned_question_ids list into AttemptQuestion rows."""
+    ExamAttempt = apps.get_model('exams', 'ExamAttempt')
+    AttemptQuestion = apps.get_model('exams', 'AttemptQuestion')
+    Question = apps.get_model('exams', 'Question')
+    Choice = apps.get_model('exams', 'Choice')
+    db_alias = schema_editor.connection.alias
+
+    attempts = (
+        ExamAttempt.objects.using(db_alias).exclude(assigned_question_ids=[])
+        .select_related('exam')
+        .only('id', 'student_id', 'assigned_question_ids', 'exam__randomize_choices')
+    )
+    for attempt in attempts.iterator(chunk_size=500):
+        question_ids = list(dict.fromkeys(attempt.assigned_question_ids))
+        questions = Question.objects.using(db_alias).in_bulk(question_ids)
+
+        choice_ids = defaultdict(list)
+        if attempt.exam.randomize_choices:
+            rows = (Choice.objects.using(db_alias).filter(question_id__in=question_ids)
+                    .order_by('id').values_list('question_id', 'id'))
+            for question_id, choice_id in rows:
+                choice_ids[question_id].append(choice_id)
+
+        paper = []
+        for question_id in question_ids:
+            question = questions.get(question_id)
+            if question is None:
+                continue
+            choice_order = choice_ids.get(question_id, [])
+            # Same rule as models.shuffle_choices()
+            random.Random(f"{question.question_id}_{attempt.student_id}").shuffle(choice_order)
+            paper.append(AttemptQuestion(
+                attempt_id=attempt.id, position=len(paper), question_id=question_id, choice_order=choice_order
+            ))
+        AttemptQuestion.objects.using(db_alias).bulk_create(paper)
+        ExamAttempt.objects.using(db_alias).filter(id=attempt.id).update(question_count=len(paper))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0014_attemptquestion_examattempt_question_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_attempt_papers, migrations.RunPython.noop),
+    ]
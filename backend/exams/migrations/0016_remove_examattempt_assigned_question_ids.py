@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:58
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0015_backfill_attempt_papers'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='examattempt',
+            name='assigned_question_ids',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0016_remove_examattempt_assigned_question_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='delivery_mode',
+            field=models.CharField(choices=[('online', 'Online'), ('offline', 'Offline')], default='online', help_text='Offline: the paper is handed out as a signed bundle when the exam starts and the answers are uploaded in one request at the end (see exams/offline.py).', max_length=10),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0017_exam_delivery_mode'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('sums', models.JSONField(default=dict, help_text='Per-question and per-choice sums, aligned with the question and choice ids they list.')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'item analyses',
+            },
+        ),
+        migrations.AddField(
+            model_name='examattempt',
+            name='in_item_analysis',
+            field=models.BooleanField(db_default=False, default=False, help_text="Whether this completed attempt is counted in the exam's ItemAnalysis yet."),
+        ),
+        migrations.AddIndex(
+            model_name='examattempt',
+            index=models.Index(condition=models.Q(('in_item_analysis', False), ('is_completed', True)), fields=['exam'], name='attempt_analysis_pending_idx'),
+        ),
+        migrations.AddField(
+            model_name='itemanalysis',
+            name='exam',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='item_analysis', to='exams.exam'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0018_item_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='irt_calibrated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='irt_difficulty',
+            field=models.FloatField(blank=True, help_text="IRT difficulty (b) on the ability scale of the exam's candidates; null until calibrated.", null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='irt_discrimination',
+            field=models.FloatField(blank=True, help_text='IRT discrimination (a); null until calibrated.', null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0019_question_irt_parameters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='adaptive',
+            field=models.BooleanField(default=False, help_text='If true, the paper is built as the student goes: each answer updates their ability estimate and picks the next question (see exams/adaptive.py). total_questions_to_ask is then the maximum length.'),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='adaptive_target_se',
+            field=models.FloatField(blank=True, help_text="Adaptive exams stop once the ability estimate's standard error is down to this (e.g. 0.3). If blank, they run to the maximum length.", null=True),
+        ),
+        migrations.AddField(
+            model_name='examattempt',
+            name='ability',
+            field=models.FloatField(blank=True, help_text="Adaptive exams: the student's ability estimate (EAP) after their latest answer.", null=True),
+        ),
+        migrations.AddField(
+            model_name='examattempt',
+            name='ability_se',
+            field=models.FloatField(blank=True, help_text='Standard error of the ability estimate.', null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0020_adaptive_testing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollusionFlag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('student_class', models.CharField(blank=True, max_length=100)),
+                ('both_wrong', models.PositiveIntegerField(help_text='Questions both students answered wrongly.')),
+                ('identical_wrong', models.PositiveIntegerField(help_text='Of those, questions with the same wrong answer.')),
+                ('expected_identical_wrong', models.FloatField(help_text='Identical wrong answers expected by chance, from how the class spread its wrong answers.')),
+                ('z_score', models.FloatField()),
+                ('reviewed', models.BooleanField(default=False)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='collusion_flags', to='exams.exam')),
+                ('first_attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='exams.examattempt')),
+                ('second_attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='exams.examattempt')),
+            ],
+            options={
+                'ordering': ['-z_score'],
+                'constraints': [models.UniqueConstraint(fields=('first_attempt', 'second_attempt'), name='unique_collusion_pair')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0021_collusion_flag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attemptquestion',
+            name='answer_count',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Answers submitted for the question; above 1 when the student changed their answer.'),
+        ),
+        migrations.AddField(
+            model_name='attemptquestion',
+            name='time_spent_ms',
+            field=models.PositiveIntegerField(default=0, help_text='Time the student spent on the question, in milliseconds (see timing.py).'),
+        ),
+    ]
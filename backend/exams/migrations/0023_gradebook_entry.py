@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0022_attempt_question_timing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradebookEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('student_class', models.CharField(blank=True, help_text="The student's class when the attempt was completed.", max_length=100)),
+                ('score', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('correct_answers', models.PositiveIntegerField(default=0)),
+                ('total_questions', models.PositiveIntegerField(default=0)),
+                ('percentage', models.FloatField(default=0)),
+                ('passed', models.BooleanField(default=False)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('attempt', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='gradebook_entry', to='exams.examattempt')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gradebook_entries', to='exams.exam')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gradebook_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'gradebook entries',
+                'indexes': [models.Index(fields=['student_class', 'exam', '-percentage'], name='gradebook_class_exam_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'exam'), name='unique_gradebook_student_exam')],
+            },
+        ),
+    ]
@@ -1,12 +1,30 @@
 # backend/exams/models.py
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, connections, models, transaction
 from django.conf import settings
 import uuid
 import random
+from collections import defaultdict, namedtuple
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from cbt_project.db_routers import mark_primary_write
 
 User = settings.AUTH_USER_MODEL
 
+
+# One question of an exam's question bank: everything needed to put it on a paper
+# (and, for adaptive exams, to select it; see adaptive.py).
+PaperItem = namedtuple(
+    'PaperItem', ['id', 'question_id', 'choice_ids', 'difficulty_level', 'irt_difficulty', 'irt_discrimination'],
+    defaults=('medium', None, None)
+)
+
+
+def shuffle_choices(choices, question_id, student_id):
+    """Shuffle in place, deterministically for a (question, student) pair."""
+    random.Random(f"{question_id}_{student_id}").shuffle(choices)
+
 class Exam(models.Model):
     """Represents an exam with questions."""
     title = models.CharField(max_length=255)
@@ -42,10 +60,31 @@ class Exam(models.Model):
         default=False,
         help_text="If true, answer choices will be randomized for each student."
     )
+    delivery_mode = models.CharField(
+        max_length=10,
+        choices=[('online', 'Online'), ('offline', 'Offline')],
+        default='online',
+        help_text="Offline: the paper is handed out as a signed bundle when the exam starts and "
+                  "the answers are uploaded in one request at the end (see exams/offline.py)."
+    )
+    adaptive = models.BooleanField(
+        default=False,
+        help_text="If true, the paper is built as the student goes: each answer updates their ability "
+                  "estimate and picks the next question (see exams/adaptive.py). total_questions_to_ask "
+                  "is then the maximum length."
+    )
+    adaptive_target_se = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Adaptive exams stop once the ability estimate's standard error is down to this (e.g. 0.3). "
+                  "If blank, they run to the maximum length."
+    )
 
     def clean(self):
         """Validate that total_questions_to_ask doesn't exceed available questions."""
         super().clean()
+        if self.adaptive and self.delivery_mode == 'offline':
+            raise ValidationError("Adaptive exams need the server for every answer and cannot be delivered offline.")
         if self.pk and self.total_questions_to_ask:
             total_available = self.questions.count()
             if self.total_questions_to_ask > total_available:
@@ -58,17 +97,27 @@ class Exam(models.Model):
         Get questions for a specific student, applying randomization if enabled.
         Uses student_id as seed for consistent randomization per student.
         """
-        all_questions = list(self.questions.all())
-        
+        return self.pick_questions(list(self.questions.order_by('id')), student_id)
+
+    def pick_questions(self, questions, student_id):
+        """
+        Apply the exam's randomization and question limit to `questions` (the
+        question bank in id order: Questions or PaperItems).
+        """
+        if self.adaptive:
+            # Only the first question; the others are picked as the student answers
+            from .adaptive import first_question
+            return [first_question(self, questions, student_id)] if questions else []
+
         if not self.randomize_questions:
             # No randomization, return questions in order
-            questions = all_questions
+            questions = list(questions)
         else:
             # Create a deterministic random seed based on exam_id and student_id
             # This ensures the same student gets the same questions on multiple attempts
-            seed = hash(f"{self.exam_id}_{student_id}")
-            random.seed(seed)
-            questions = random.sample(all_questions, len(all_questions))
+            # (string seeds, unlike hash(), are stable across worker processes)
+            rng = random.Random(f"{self.exam_id}_{student_id}")
+            questions = rng.sample(questions, len(questions))
         
         # Limit the number of questions if specified
         if self.total_questions_to_ask:
@@ -76,6 +125,23 @@ class Exam(models.Model):
         
         return questions
 
+    def get_question_bank(self):
+        """
+        The exam's questions as PaperItems, in id order. Two small queries and
+        no Question instances; cached by caching.get_question_bank().
+        """
+        choice_ids = defaultdict(list)
+        rows = Choice.objects.filter(question__exam=self).order_by('id').values_list('question_id', 'id')
+        for question_id, choice_id in rows:
+            choice_ids[question_id].append(choice_id)
+        rows = self.questions.order_by('id').values_list(
+            'id', 'question_id', 'difficulty_level', 'irt_difficulty', 'irt_discrimination'
+        )
+        return [
+            PaperItem(pk, question_uuid, tuple(choice_ids[pk]), *parameters)
+            for pk, question_uuid, *parameters in rows
+        ]
+
     def __str__(self):
         return self.title
 
@@ -125,16 +191,31 @@ class Question(models.Model):
         default='medium',
         help_text="Difficulty level of the question for better randomization."
     )
+    # Calibrated from responses by manage.py calibrate_irt (see exams/irt.py)
+    irt_difficulty = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="IRT difficulty (b) on the ability scale of the exam's candidates; null until calibrated."
+    )
+    irt_discrimination = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="IRT discrimination (a); null until calibrated."
+    )
+    irt_calibrated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['exam', 'question_type'], name='question_exam_type_idx'),
+        ]
 
     def get_randomized_choices(self, student_id=None):
         """Get choices for this question, randomized if exam settings allow."""
-        choices = list(self.choices.all())
+        choices = sorted(self.choices.all(), key=lambda choice: choice.id)
         
         if self.exam.randomize_choices and student_id:
             # Create deterministic randomization based on question and student
-            seed = hash(f"{self.question_id}_{student_id}")
-            random.seed(seed)
-            random.shuffle(choices)
+            shuffle_choices(choices, self.question_id, student_id)
         
         return choices
 
@@ -167,6 +248,96 @@ class Choice(models.Model):
         return self.choice_text
 
 
+class ExamAttemptManager(models.Manager):
+
+    INSERT_FIELDS = ('student', 'exam', 'start_time', 'score', 'is_completed', 'attempt_id', 'question_count')
+
+    def start_or_resume(self, student, exam, paper):
+        """
+        Open an attempt, or fetch the student's open one, in one INSERT ...
+        SELECT ... ON CONFLICT statement: unique_open_attempt makes concurrent
+        starts converge on a single row, and the NOT EXISTS guard returns no row
+        at all once the student has completed the exam. A new attempt gets
+        `paper` (PaperItems) written in the same transaction.
+        Returns (attempt, created), or (None, False) for a completed exam.
+        """
+        connection = connections[self.db]
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            return self._start_or_resume_fallback(student, exam, paper)
+
+        attempt = self.model(
+            student=student, exam=exam, start_time=timezone.now(), question_count=len(paper)
+        )
+        opts = self.model._meta
+        qn = connection.ops.quote_name
+        table = qn(opts.db_table)
+        columns = [opts.get_field(name) for name in self.INSERT_FIELDS]
+        params = [f.get_db_prep_save(getattr(attempt, f.attname), connection) for f in columns]
+        params += [student.pk, exam.pk, True]
+        sql = (
+            f"INSERT INTO {table} ({', '.join(qn(f.column) for f in columns)}) "
+            f"SELECT {', '.join(['%s'] * len(columns))} WHERE NOT EXISTS ("
+            f"SELECT 1 FROM {table} WHERE {qn('student_id')} = %s AND {qn('exam_id')} = %s "
+            f"AND {qn('is_completed')} = %s) "
+            f"ON CONFLICT ({qn('student_id')}, {qn('exam_id')}) WHERE NOT {qn('is_completed')} "
+            f"DO UPDATE SET {qn('student_id')} = EXCLUDED.{qn('student_id')} "
+            f"RETURNING {qn('id')}, {qn('attempt_id')}, {qn('start_time')}, {qn('question_count')}"
+        )
+        mark_primary_write()
+        with transaction.atomic(using=self.db, savepoint=False):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                row = cursor.fetchone()
+            if row is None:
+                return None, False
+
+            # An open attempt keeps its own attempt_id on conflict, which tells us whether we inserted.
+            pk, attempt_id, start_time, question_count = row
+            attempt_id = opts.get_field('attempt_id').to_python(attempt_id)
+            created = attempt_id == attempt.attempt_id
+            attempt.pk = pk
+            attempt._state.adding = False
+            attempt._state.db = self.db
+            if created:
+                attempt.assign_questions(paper)
+            else:
+                attempt.attempt_id = attempt_id
+                attempt.start_time = self._from_db(connection, opts.get_field('start_time'), start_time)
+                attempt.question_count = question_count
+        return attempt, created
+
+    def with_results(self):
+        """
+        Attempts ready for ExamAttemptResultSerializer: exam and student joined
+        and the correct-answer count annotated, one query for any number of rows.
+        """
+        return self.select_related('exam', 'student').annotate(
+            correct_answer_count=models.Count(
+                'student_answers',
+                filter=models.Q(student_answers__slot=0, student_answers__is_correct=True)
+            )
+        )
+
+    def _start_or_resume_fallback(self, student, exam, paper):
+        if self.filter(student=student, exam=exam, is_completed=True).exists():
+            return None, False
+        try:
+            with transaction.atomic(using=self.db):
+                attempt = self.create(student=student, exam=exam, question_count=len(paper))
+                attempt.assign_questions(paper)
+            return attempt, True
+        except IntegrityError:
+            return self.get(student=student, exam=exam, is_completed=False), False
+
+    @staticmethod
+    def _from_db(connection, field, value):
+        """Convert a raw column value the way the ORM would for `field`."""
+        col = field.get_col(field.model._meta.db_table)
+        for converter in connection.ops.get_db_converters(col) + col.get_db_converters(connection):
+            value = converter(value, col, connection)
+        return value
+
+
 class ExamAttempt(models.Model):
     """Records a student's attempt at an exam."""
     student = models.ForeignKey(
@@ -193,22 +364,169 @@ class ExamAttempt(models.Model):
     is_completed = models.BooleanField(default=False)
     attempt_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     
-    # NEW FIELD TO STORE ASSIGNED QUESTIONS FOR THIS ATTEMPT
-    assigned_question_ids = models.JSONField(
-        default=list,
-        help_text="List of question IDs assigned to this student for this attempt"
+    question_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of questions on this attempt's paper (see AttemptQuestion)."
+    )
+    ability = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Adaptive exams: the student's ability estimate (EAP) after their latest answer."
+    )
+    ability_se = models.FloatField(null=True, blank=True, help_text="Standard error of the ability estimate.")
+    in_item_analysis = models.BooleanField(
+        default=False,
+        db_default=False,
+        help_text="Whether this completed attempt is counted in the exam's ItemAnalysis yet."
     )
 
-    def get_assigned_questions(self):
-        """Get the questions assigned to this attempt."""
-        if not self.assigned_question_ids:
-            return Question.objects.none()
-        return Question.objects.filter(id__in=self.assigned_question_ids).order_by('id')
+    objects = ExamAttemptManager()
+
+    class Meta:
+        indexes = [
+            # Start/resume and result lookups: (student, exam, is_completed)
+            models.Index(fields=['student', 'exam', 'is_completed'], name='attempt_student_exam_idx'),
+            # Attempt history, newest first
+            models.Index(fields=['student', '-end_time'], condition=models.Q(is_completed=True),
+                         name='attempt_history_idx'),
+            # Expiry checks only ever look at open attempts
+            models.Index(fields=['start_time'], condition=models.Q(is_completed=False),
+                         name='attempt_open_start_idx'),
+            # Completed attempts not yet folded into the item analysis
+            models.Index(fields=['exam'], condition=models.Q(is_completed=True, in_item_analysis=False),
+                         name='attempt_analysis_pending_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'exam'], condition=models.Q(is_completed=False),
+                                    name='unique_open_attempt'),
+        ]
+
+    def assign_questions(self, paper, start=0):
+        """
+        Write this attempt's paper with a single bulk insert: one AttemptQuestion
+        per PaperItem, in order from position `start`, with the student's choice
+        order when the exam randomizes choices.
+        """
+        rows = []
+        for position, item in enumerate(paper, start):
+            choice_order = list(item.choice_ids) if self.exam.randomize_choices else []
+            shuffle_choices(choice_order, item.question_id, self.student_id)
+            rows.append(AttemptQuestion(
+                attempt=self, position=position, question_id=item.id, choice_order=choice_order
+            ))
+        return AttemptQuestion.objects.bulk_create(rows)
+
+    def get_paper(self):
+        """
+        Get the questions assigned to this attempt, in paper order. Each question
+        carries `paper_choices`: its choices in the order this student sees them.
+        """
+        rows = self.paper.select_related('question').prefetch_related('question__choices').order_by('position')
+        return [row.get_question() for row in rows]
+
+    async def aget_paper(self):
+        rows = self.paper.select_related('question').prefetch_related('question__choices').order_by('position')
+        return [row.get_question() async for row in rows]
 
     def __str__(self):
         return f"{self.student.username}'s attempt on {self.exam.title}"
 
 
+class AttemptQuestion(models.Model):
+    """A question on a student's paper for one attempt, at a fixed position."""
+    attempt = models.ForeignKey(
+        ExamAttempt,
+        related_name='paper',
+        on_delete=models.CASCADE
+    )
+    position = models.PositiveIntegerField()
+    question = models.ForeignKey(
+        Question,
+        related_name='attempt_assignments',
+        on_delete=models.CASCADE
+    )
+    choice_order = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Choice IDs in the order shown to the student; empty when choices are not randomized."
+    )
+    time_spent_ms = models.PositiveIntegerField(
+        default=0,
+        help_text="Time the student spent on the question, in milliseconds (see timing.py)."
+    )
+    answer_count = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Answers submitted for the question; above 1 when the student changed their answer."
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['attempt', 'position'], name='unique_attempt_position'),
+            models.UniqueConstraint(fields=['attempt', 'question'], name='unique_attempt_question'),
+        ]
+
+    def get_choices(self):
+        """The question's choices in the order this student sees them."""
+        choices = sorted(self.question.choices.all(), key=lambda choice: choice.id)
+        if self.choice_order:
+            order = {choice_id: i for i, choice_id in enumerate(self.choice_order)}
+            choices.sort(key=lambda choice: order.get(choice.id, len(order)))
+        return choices
+
+    def get_question(self):
+        question = self.question
+        question.paper_choices = self.get_choices()
+        return question
+
+    def __str__(self):
+        return f"Attempt {self.attempt_id} - Q{self.position + 1}: {self.question_id}"
+
+
+class StudentAnswerManager(models.Manager):
+
+    UPSERT_FIELDS = ('chosen_choice', 'answer_text', 'is_correct', 'score')
+
+    def upsert(self, attempt, question, **values):
+        """
+        Insert or overwrite the answer row (slot 0) for a question in one
+        INSERT ... ON CONFLICT statement, relying on unique_answer_slot instead
+        of SELECT ... FOR UPDATE. Returns (answer, created) like update_or_create().
+        """
+        connection = connections[self.db]
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            return self.update_or_create(attempt=attempt, question=question, slot=0, defaults=values)
+
+        answer = self.model(attempt=attempt, question=question, slot=0, **values)
+        opts = self.model._meta
+        qn = connection.ops.quote_name
+        columns = [opts.get_field(name) for name in (
+            'attempt', 'question', 'slot', 'answer_id', *self.UPSERT_FIELDS
+        )]
+        params = [f.get_db_prep_save(getattr(answer, f.attname), connection) for f in columns]
+        sql = (
+            f"INSERT INTO {qn(opts.db_table)} ({', '.join(qn(f.column) for f in columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))}) "
+            f"ON CONFLICT ({qn('attempt_id')}, {qn('question_id')}, {qn('slot')}) DO UPDATE SET "
+            + ', '.join(f"{qn(f.column)} = EXCLUDED.{qn(f.column)}" for f in columns[4:])
+            + f" RETURNING {qn('id')}, {qn('answer_id')}"
+        )
+        mark_primary_write()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            pk, answer_id = cursor.fetchone()
+
+        # The row keeps its original answer_id on conflict, which tells us whether it was inserted.
+        answer_id = opts.get_field('answer_id').to_python(answer_id)
+        created = answer_id == answer.answer_id
+        answer.pk, answer.answer_id = pk, answer_id
+        answer._state.adding = False
+        answer._state.db = self.db
+        return answer, created
+
+    async def aupsert(self, attempt, question, **values):
+        return await sync_to_async(self.upsert)(attempt, question, **values)
+
+
 class StudentAnswer(models.Model):
     """Records a student's answer to a specific question in an attempt."""
     attempt = models.ForeignKey(
@@ -230,6 +548,130 @@ class StudentAnswer(models.Model):
     is_correct = models.BooleanField(default=False)
     score = models.DecimalField(default=0, decimal_places=2, max_digits=5)
     answer_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    slot = models.PositiveIntegerField(
+        default=0,
+        help_text="0 for the answer row of a question; the chosen choice ID for Multiple Select selection rows."
+    )
+
+    objects = StudentAnswerManager()
+
+    class Meta:
+        constraints = [
+            # One answer row per (attempt, question), plus one row per selected choice for MS
+            models.UniqueConstraint(fields=['attempt', 'question', 'slot'], name='unique_answer_slot'),
+        ]
 
     def __str__(self):
         return f"Answer for {self.attempt.student.username} on Q: {self.question.id}"
+
+
+class ItemAnalysis(models.Model):
+    """
+    Running sums behind an exam's classical item analysis (see analysis.py).
+    Completed attempts are added as they come in, never recomputed.
+    """
+    exam = models.OneToOneField(
+        Exam,
+        related_name='item_analysis',
+        on_delete=models.CASCADE
+    )
+    attempt_count = models.PositiveIntegerField(default=0)
+    sums = models.JSONField(
+        default=dict,
+        help_text="Per-question and per-choice sums, aligned with the question and choice ids they list."
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'item analyses'
+
+    def __str__(self):
+        return f"Item analysis of {self.exam.title} ({self.attempt_count} attempts)"
+
+
+class CollusionFlag(models.Model):
+    """
+    A pair of attempts at the same exam, by students of the same class, whose
+    wrong answers agree far more often than chance (see collusion.py).
+    """
+    exam = models.ForeignKey(
+        Exam,
+        related_name='collusion_flags',
+        on_delete=models.CASCADE
+    )
+    first_attempt = models.ForeignKey(
+        ExamAttempt,
+        related_name='+',
+        on_delete=models.CASCADE
+    )
+    second_attempt = models.ForeignKey(
+        ExamAttempt,
+        related_name='+',
+        on_delete=models.CASCADE
+    )
+    student_class = models.CharField(max_length=100, blank=True)
+    both_wrong = models.PositiveIntegerField(help_text="Questions both students answered wrongly.")
+    identical_wrong = models.PositiveIntegerField(help_text="Of those, questions with the same wrong answer.")
+    expected_identical_wrong = models.FloatField(
+        help_text="Identical wrong answers expected by chance, from how the class spread its wrong answers."
+    )
+    z_score = models.FloatField()
+    reviewed = models.BooleanField(default=False)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-z_score']
+        constraints = [
+            models.UniqueConstraint(fields=['first_attempt', 'second_attempt'], name='unique_collusion_pair'),
+        ]
+
+    def __str__(self):
+        return f"{self.exam.title}: attempts {self.first_attempt_id} and {self.second_attempt_id} (z = {self.z_score:.1f})"
+
+
+class GradebookEntry(models.Model):
+    """
+    A completed attempt's result, kept for the class gradebook (see
+    gradebook.py): written when the attempt is scored, so gradebook reads
+    never touch the attempts and their answers.
+    """
+    student = models.ForeignKey(
+        User,
+        related_name='gradebook_entries',
+        on_delete=models.CASCADE
+    )
+    exam = models.ForeignKey(
+        Exam,
+        related_name='gradebook_entries',
+        on_delete=models.CASCADE
+    )
+    attempt = models.OneToOneField(
+        ExamAttempt,
+        related_name='gradebook_entry',
+        on_delete=models.CASCADE
+    )
+    student_class = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="The student's class when the attempt was completed."
+    )
+    score = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    correct_answers = models.PositiveIntegerField(default=0)
+    total_questions = models.PositiveIntegerField(default=0)
+    percentage = models.FloatField(default=0)
+    passed = models.BooleanField(default=False)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'gradebook entries'
+        indexes = [
+            # A class's grid, ranked per exam
+            models.Index(fields=['student_class', 'exam', '-percentage'], name='gradebook_class_exam_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'exam'], name='unique_gradebook_student_exam'),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.exam.title}: {self.percentage}%"
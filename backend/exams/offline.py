@@ -0,0 +1,190 @@
+# backend/exams/offline.py
+"""
+Offline delivery (Exam.delivery_mode = 'offline') for centres with unreliable
+links: two requests per student instead of one per answer.
+
+1. StartExamView hands out the whole paper with the attempt:
+
+     bundle        the paper (question_data, without answers), the attempt
+                   ids and the deadline, for the client to keep locally
+     bundle_token  a signed, compressed token naming the attempt, its paper
+                   and deadline; the client sends it back untouched
+     log_key       the attempt's key for signing the answer log
+
+2. The client records answers locally and uploads them once, to
+   POST /api/attempts/<id>/sync/:
+
+     {"bundle_token": "...",
+      "log": "[{\"question_id\": 7, \"chosen_choice_id\": 21, \"answered_at\": 1718000000000}, ...]",
+      "signature": "<hex HMAC-SHA256 of the log string, keyed with log_key>"}
+
+   `log` is a JSON string (so that the signed bytes are unambiguous) of
+   entries with a question_id, the answer in the shape submit-answer takes
+   (chosen_choice_id, answer_text, or selected_choice_ids for Multiple
+   Select) and answered_at in epoch milliseconds. The latest entry per
+   question wins.
+
+The server checks the token and the signature, that the upload arrives by the
+deadline plus OFFLINE_SYNC_GRACE_SECONDS, and drops entries stamped after the
+deadline (give or take OFFLINE_CLOCK_SKEW_SECONDS) or that don't fit the
+paper. The rest is graded in bulk and committed, with the final score, in
+one transaction. Re-sending a log once the attempt is submitted returns the
+result again, so a client may retry an upload whose response it lost.
+"""
+import hashlib
+import hmac
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import Question, StudentAnswer
+from .serializers import question_data
+from .utils import grade_choice, grade_fill_in_blank, multiple_select_rows, parse_selected_choice_ids
+
+BUNDLE_SALT = 'exams.offline-bundle'
+LOG_KEY_SALT = 'exams.offline-log'
+
+
+class SyncRejected(Exception):
+    """The upload as a whole cannot be accepted; the message says why."""
+
+
+def attempt_deadline(attempt):
+    return attempt.start_time + timedelta(minutes=attempt.exam.duration_minutes)
+
+
+def log_key(attempt):
+    """The attempt's answer-log key: derived from SECRET_KEY, so nothing is stored."""
+    return salted_hmac(LOG_KEY_SALT, attempt.attempt_id.hex, algorithm='sha256').hexdigest()
+
+
+def sign_log(key, log):
+    """What the client computes: hex HMAC-SHA256 of the log string."""
+    return hmac.new(key.encode(), log.encode(), hashlib.sha256).hexdigest()
+
+
+def issue_bundle(attempt, questions):
+    """The offline part of the start response for an attempt and its paper (`questions`, in order)."""
+    deadline = attempt_deadline(attempt)
+    token = signing.dumps({
+        'a': attempt.attempt_id.hex,
+        'q': [question.id for question in questions],
+        'd': int(deadline.timestamp()),
+    }, salt=BUNDLE_SALT, compress=True)
+    return {
+        'bundle': {
+            'attempt': attempt.id,
+            'attempt_id': str(attempt.attempt_id),
+            'exam': attempt.exam_id,
+            'deadline': deadline.isoformat(),
+            'questions': [question_data(question, question.paper_choices) for question in questions],
+        },
+        'bundle_token': token,
+        'log_key': log_key(attempt),
+    }
+
+
+def verify_upload(attempt, data, now=None):
+    """
+    Check an upload against its attempt, and that it arrived in time unless
+    `now` is None. Returns (paper question ids, log entries); raises SyncRejected.
+    """
+    if not isinstance(data.get('log'), str) or not isinstance(data.get('signature'), str):
+        raise SyncRejected("bundle_token, log and signature are required.")
+    try:
+        bundle = signing.loads(data.get('bundle_token') or '', salt=BUNDLE_SALT)
+    except signing.BadSignature:
+        raise SyncRejected("Invalid bundle token.")
+    if bundle.get('a') != attempt.attempt_id.hex:
+        raise SyncRejected("The bundle belongs to another attempt.")
+    if not constant_time_compare(sign_log(log_key(attempt), data['log']), data['signature']):
+        raise SyncRejected("Invalid answer log signature.")
+
+    grace = timedelta(seconds=getattr(settings, 'OFFLINE_SYNC_GRACE_SECONDS', 900))
+    if now is not None and now > attempt_deadline(attempt) + grace:
+        raise SyncRejected("The answer log arrived after the upload deadline.")
+
+    try:
+        entries = json.loads(data['log'])
+    except ValueError:
+        raise SyncRejected("The answer log is not valid JSON.")
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        raise SyncRejected("The answer log must be a list of answers.")
+    return bundle['q'], entries
+
+
+def latest_entries(attempt, paper_ids, entries):
+    """
+    The latest entry per paper question stamped within the attempt's time.
+    Returns ({question_id: entry}, number of entries dropped).
+    """
+    skew = timedelta(seconds=getattr(settings, 'OFFLINE_CLOCK_SKEW_SECONDS', 30))
+    earliest, latest = attempt.start_time - skew, attempt_deadline(attempt) + skew
+    on_paper = set(paper_ids)
+    accepted = {}
+    dropped = 0
+    for entry in entries:
+        try:
+            question_id = int(entry.get('question_id'))
+            answered_at = datetime.fromtimestamp(int(entry.get('answered_at')) / 1000, tz=dt_timezone.utc)
+        except (TypeError, ValueError, OverflowError, OSError):
+            dropped += 1
+            continue
+        if question_id not in on_paper or not earliest <= answered_at <= latest:
+            dropped += 1
+            continue
+        previous = accepted.get(question_id)
+        if previous is not None:
+            dropped += 1
+            if previous[0] > answered_at:
+                continue
+        accepted[question_id] = (answered_at, entry)
+    return {question_id: entry for question_id, (_, entry) in accepted.items()}, dropped
+
+
+def grade_entries(attempt, entries):
+    """
+    Grade the accepted entries ({question_id: entry}) in bulk. Returns
+    (unsaved StudentAnswer rows, number of entries that could not be graded).
+    """
+    questions = Question.objects.filter(id__in=entries).prefetch_related('choices')
+    rows = []
+    dropped = 0
+    for question in questions:
+        entry = entries[question.id]
+        if question.question_type == 'MS':
+            selected = entry.get('selected_choice_ids', entry.get('answer_text'))
+            graded = multiple_select_rows(attempt, question, question.choices.all(),
+                                          parse_selected_choice_ids(selected))
+            if graded is None:
+                dropped += 1
+                continue
+            rows.extend(graded[0])
+            continue
+
+        chosen_choice = None
+        answer_text = str(entry.get('answer_text') or '').strip()
+        if question.question_type == 'FB':
+            is_correct, score = grade_fill_in_blank(question, answer_text)
+        else:  # MC, TF questions
+            if entry.get('chosen_choice_id') not in (None, ''):
+                choices = {str(choice.id): choice for choice in question.choices.all()}
+                chosen_choice = choices.get(str(entry['chosen_choice_id']))
+                if chosen_choice is None:
+                    dropped += 1
+                    continue
+            is_correct, score = grade_choice(question, chosen_choice)
+        rows.append(StudentAnswer(
+            attempt=attempt, question=question, chosen_choice=chosen_choice,
+            answer_text=answer_text, is_correct=is_correct, score=score
+        ))
+    return rows, dropped
+
+
+def save_log(attempt, entries, rows):
+    """Replace the attempt's answers to the logged questions with `rows`. Must run inside a transaction."""
+    StudentAnswer.objects.filter(attempt=attempt, question_id__in=entries).delete()
+    StudentAnswer.objects.bulk_create(rows)
@@ -0,0 +1,187 @@
+# backend/exams/ranking.py
+"""
+Where a result places among an exam's results: rank and percentile in
+O(log n), for ExamAttemptResultSerializer.
+
+Percentages have one decimal, so an exam's results fit in BUCKETS buckets
+(0.0, 0.1, ... 100.0). Each exam keeps a Fenwick tree (binary indexed tree)
+of bucket counts in the cache, one cache key per tree node:
+
+  - scoring an attempt (gradebook.record_attempt) adds one to its bucket
+    once the transaction commits: an atomic incr() on each of the ~10 nodes
+    that cover it, so concurrent submissions need no lock. Until then the
+    attempt carries the change (ranking_pending) for its own result;
+  - a rank reads the ~10 nodes of three prefix sums (results below, at or
+    below, and in total) in one get_many().
+
+rank is 1 + the number of better results (ties share a rank) and percentile
+the share of the other results that are lower, PERCENT_RANK() as in the
+gradebook. A tree missing from the cache (first use, eviction, expiry) is
+rebuilt from GradebookEntry with one grouped query; manage.py
+rebuild_rankings rebuilds them all, e.g. after a cache flush or regrading.
+
+Every add() also bumps the exam's change counter, counted or not: a rebuild
+that sees it move between its query and its writes may have missed (or
+double-counted) that result, and leaves the tree to be rebuilt again. Trees
+expire after RANKING_CACHE_TIMEOUT so any drift left corrects itself.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import GradebookEntry
+
+BUCKETS = 1001  # percentages 0.0 to 100.0 in steps of 0.1
+
+
+def bucket(percentage):
+    return min(max(int(round(float(percentage) * 10)), 0), BUCKETS - 1)
+
+
+def node_key(exam_id, index):
+    return f"exams:ranking:{exam_id}:{index}"
+
+
+def ready_key(exam_id):
+    return f"exams:ranking:{exam_id}:ready"
+
+
+def changes_key(exam_id):
+    return f"exams:ranking:{exam_id}:changes"
+
+
+def _timeout():
+    return getattr(settings, 'RANKING_CACHE_TIMEOUT', 3600)
+
+
+def _count_change(exam_id):
+    key = changes_key(exam_id)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted in between: any new value still differs from what build() read
+        cache.set(key, 1, None)
+
+
+def _update_path(position):
+    """Tree nodes (1-based) covering bucket `position` (0-based)."""
+    index = position + 1
+    while index <= BUCKETS:
+        yield index
+        index += index & -index
+
+
+def _prefix_path(count):
+    """Tree nodes whose sum is the number of results in the first `count` buckets."""
+    while count > 0:
+        yield count
+        count -= count & -count
+
+
+def total(tree):
+    """Number of results counted in a tree returned by build()."""
+    return sum(tree[index] for index in _prefix_path(BUCKETS))
+
+
+def build(exam_ids, save=True):
+    """
+    Rebuild the trees of these exams from GradebookEntry, in one query.
+    Returns {exam id: tree}; with save=False they are not cached.
+    """
+    counts = {exam_id: [0] * (BUCKETS + 1) for exam_id in exam_ids}
+    if save:
+        before = cache.get_many([changes_key(exam_id) for exam_id in counts])
+    rows = (GradebookEntry.objects.filter(exam_id__in=counts).order_by()
+            .values_list('exam_id', 'percentage').annotate(n=Count('id')))
+    for exam_id, percentage, n in rows:
+        counts[exam_id][bucket(percentage) + 1] += n
+    for exam_id, tree in counts.items():
+        # In-place O(n) construction: every node passes its sum on to its parent
+        for index in range(1, BUCKETS + 1):
+            parent = index + (index & -index)
+            if parent <= BUCKETS:
+                tree[parent] += tree[index]
+        if not save:
+            continue
+        cache.set_many({node_key(exam_id, index): tree[index] for index in range(1, BUCKETS + 1)}, _timeout())
+        cache.set(ready_key(exam_id), True, _timeout())
+    if save:
+        # A result added meanwhile may be missing from the query or the nodes
+        after = cache.get_many([changes_key(exam_id) for exam_id in counts])
+        invalidate([exam_id for exam_id in counts
+                    if before.get(changes_key(exam_id)) != after.get(changes_key(exam_id))])
+    return counts
+
+
+def add(exam_id, percentage, delta=1):
+    """Count a result (delta=-1: uncount it). A tree not in the cache is left to be rebuilt."""
+    _count_change(exam_id)
+    if not cache.get(ready_key(exam_id)):
+        return
+    try:
+        for index in _update_path(bucket(percentage)):
+            cache.incr(node_key(exam_id, index), delta)
+    except ValueError:
+        # A node was evicted: the tree is incomplete, rebuild it on next use
+        cache.delete(ready_key(exam_id))
+
+
+def invalidate(exam_ids):
+    cache.delete_many([ready_key(exam_id) for exam_id in exam_ids])
+
+
+def positions(results, pending=None):
+    """
+    [(exam id, percentage), ...] -> [{'rank', 'percentile', 'out_of'}, ...]:
+    one get_many() for all of them, and one query when trees must be rebuilt.
+    `pending` ({exam id: [(percentage, delta), ...]}) are changes made by the
+    caller's transaction, which the cached trees only count once it commits.
+    """
+    pending = pending or {}
+    results = [(exam_id, bucket(percentage)) for exam_id, percentage in results]
+    paths = [
+        (set(_prefix_path(position)), set(_prefix_path(position + 1)), set(_prefix_path(BUCKETS)))
+        for _, position in results
+    ]
+    exam_ids = {exam_id for exam_id, _ in results}
+    keys = {ready_key(exam_id) for exam_id in exam_ids}
+    for (exam_id, _), path in zip(results, paths):
+        keys.update(node_key(exam_id, index) for index in set().union(*path))
+    nodes = cache.get_many(list(keys))
+
+    def complete(exam_id, path):
+        return ready_key(exam_id) in nodes and all(node_key(exam_id, index) in nodes for index in set().union(*path))
+
+    missing = {exam_id for (exam_id, _), path in zip(results, paths) if not complete(exam_id, path)}
+    if missing:
+        # A tree rebuilt inside that transaction already counts its changes,
+        # and is not cached: they are added on commit
+        for exam_ids, save in ((missing - pending.keys(), True), (missing & pending.keys(), False)):
+            if not exam_ids:
+                continue
+            for exam_id, tree in build(exam_ids, save).items():
+                nodes.update((node_key(exam_id, index), tree[index]) for index in range(1, BUCKETS + 1))
+
+    rankings = []
+    for (exam_id, position), (below_path, at_or_below_path, total_path) in zip(results, paths):
+        below, at_or_below, total = (
+            sum(nodes[node_key(exam_id, index)] for index in path)
+            for path in (below_path, at_or_below_path, total_path)
+        )
+        for percentage, delta in () if exam_id in missing else pending.get(exam_id, ()):
+            changed = bucket(percentage)
+            below += delta if changed < position else 0
+            at_or_below += delta if changed <= position else 0
+            total += delta
+        rankings.append({
+            'rank': total - at_or_below + 1,
+            'percentile': round(100 * below / (total - 1), 1) if total > 1 else 0.0,
+            'out_of': total,
+        })
+    return rankings
+
+
+def position(exam_id, percentage, pending=()):
+    """{'rank', 'percentile', 'out_of'} of a result of this percentage at the exam (see positions)."""
+    return positions([(exam_id, percentage)], {exam_id: pending} if pending else None)[0]
@@ -1,6 +1,12 @@
 # backend/exams/serializers.py
+from datetime import timedelta
+
+from django.urls import reverse
 from rest_framework import serializers
+from users.serializers import UserSerializer
 from .models import Exam, Question, Choice, ExamAttempt, StudentAnswer
+from .ranking import position, positions
+from .utils import parse_selected_choice_ids, remaining_seconds
 
 class ChoiceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -42,16 +48,21 @@ class ExamSerializer(serializers.ModelSerializer):
             'questions_to_ask',
             'randomize_questions',
             'randomize_choices',
+            'delivery_mode',
+            'adaptive',
             'is_active',
         ]
     
     def get_total_questions_available(self, obj):
         """Return total number of questions in the question bank."""
-        return obj.questions.count()
+        # Annotated by list views to avoid a COUNT per exam
+        if getattr(obj, 'question_total', None) is None:
+            obj.question_total = obj.questions.count()
+        return obj.question_total
     
     def get_questions_to_ask(self, obj):
         """Return number of questions that will be asked to students."""
-        return obj.total_questions_to_ask or obj.questions.count()
+        return obj.total_questions_to_ask or self.get_total_questions_available(obj)
 
 class ExamAttemptSerializer(serializers.ModelSerializer):
     exam_title = serializers.CharField(source='exam.title', read_only=True)
@@ -76,10 +87,24 @@ class ExamAttemptSerializer(serializers.ModelSerializer):
     
     def get_questions_assigned(self, obj):
         """Return number of questions assigned to this attempt."""
-        if obj.assigned_question_ids:
-            return len(obj.assigned_question_ids)
+        if obj.question_count:
+            return obj.question_count
         return obj.exam.total_questions_to_ask or obj.exam.questions.count()
 
+class ExamAttemptStartSerializer(ExamAttemptSerializer):
+    """An attempt as returned by start/resume: the time left and where to fetch the paper."""
+    remaining_seconds = serializers.SerializerMethodField()
+    paper_url = serializers.SerializerMethodField()
+
+    class Meta(ExamAttemptSerializer.Meta):
+        fields = ExamAttemptSerializer.Meta.fields + ['remaining_seconds', 'paper_url']
+
+    def get_remaining_seconds(self, obj):
+        return remaining_seconds(obj, obj.exam)
+
+    def get_paper_url(self, obj):
+        return reverse('exam-questions', kwargs={'exam_id': obj.exam_id})
+
 class StudentAnswerSerializer(serializers.ModelSerializer):
     question_text = serializers.CharField(source='question.question_text', read_only=True)
     chosen_choice_text = serializers.CharField(source='chosen_choice.choice_text', read_only=True)
@@ -109,6 +134,7 @@ class ExamAttemptResultSerializer(serializers.ModelSerializer):
     passed = serializers.SerializerMethodField()
     time_taken = serializers.SerializerMethodField()
     questions_assigned = serializers.SerializerMethodField()
+    ranking = serializers.SerializerMethodField()
     
     class Meta:
         model = ExamAttempt
@@ -128,7 +154,10 @@ class ExamAttemptResultSerializer(serializers.ModelSerializer):
             'passed',
             'time_taken',
             'is_completed',
-            'attempt_id'
+            'attempt_id',
+            'ability',
+            'ability_se',
+            'ranking'
         ]
     
     def get_correct_answers(self, obj):
@@ -137,19 +166,11 @@ class ExamAttemptResultSerializer(serializers.ModelSerializer):
         if 'correct_answers' in self.context:
             return self.context['correct_answers']
         
-        # Fallback calculation
-        ms_correct = obj.student_answers.filter(
-            question__question_type='MS',
-            chosen_choice__isnull=True,  # Summary records
-            is_correct=True
-        ).count()
-        
-        other_correct = obj.student_answers.filter(
-            question__question_type__in=['MC', 'TF', 'FB'],
-            is_correct=True
-        ).count()
-        
-        return ms_correct + other_correct
+        # Annotated by ExamAttempt.objects.with_results(); otherwise count once.
+        # Answer rows only (slot 0), MS selection rows are skipped
+        if getattr(obj, 'correct_answer_count', None) is None:
+            obj.correct_answer_count = obj.student_answers.filter(slot=0, is_correct=True).count()
+        return obj.correct_answer_count
     
     def get_total_questions(self, obj):
         """Get total number of questions in this attempt."""
@@ -157,17 +178,17 @@ class ExamAttemptResultSerializer(serializers.ModelSerializer):
         if 'total_questions' in self.context:
             return self.context['total_questions']
         
-        # Use assigned questions if available
-        if obj.assigned_question_ids:
-            return len(obj.assigned_question_ids)
+        # Use the attempt's paper if available
+        if obj.question_count:
+            return obj.question_count
         
         # Fallback to exam total
         return obj.exam.total_questions_to_ask or obj.exam.questions.count()
     
     def get_questions_assigned(self, obj):
         """Return number of questions assigned to this attempt."""
-        if obj.assigned_question_ids:
-            return len(obj.assigned_question_ids)
+        if obj.question_count:
+            return obj.question_count
         return obj.exam.total_questions_to_ask or obj.exam.questions.count()
     
     def get_percentage_score(self, obj):
@@ -189,18 +210,176 @@ class ExamAttemptResultSerializer(serializers.ModelSerializer):
             delta = obj.end_time - obj.start_time
             return round(delta.total_seconds() / 60, 1)
         return None
+    
+    def get_ranking(self, obj):
+        """Rank and percentile among the exam's results (see ranking.py); None until completed."""
+        if not obj.is_completed:
+            return None
+        return position(obj.exam_id, self.get_percentage_score(obj), getattr(obj, 'ranking_pending', ()))
 
 class ExamStatisticsSerializer(serializers.Serializer):
     """Serializer for exam statistics (used in admin/analytics)."""
+    exam_id = serializers.IntegerField()
+    title = serializers.CharField()
     total_questions_available = serializers.IntegerField()
     questions_to_ask = serializers.IntegerField()
     randomization_enabled = serializers.BooleanField()
     choice_randomization_enabled = serializers.BooleanField()
     question_type_distribution = serializers.DictField()
     difficulty_distribution = serializers.DictField()
-    
+    issues = serializers.ListField(child=serializers.CharField())
+
+
 class QuestionPreviewSerializer(serializers.Serializer):
     """Serializer for question preview (admin use)."""
     total_questions = serializers.IntegerField()
     preview_questions = serializers.ListField()
     showing_first = serializers.IntegerField()
+
+
+# --- Lean serializers for the hot endpoints ---------------------------------
+#
+# Plain functions producing exactly the data of QuestionSerializer,
+# StudentAnswerSerializer and ExamAttemptResultSerializer (tests compare
+# the rendered bytes), without per-call field construction, source lookups
+# or SerializerMethodField dispatch. The value formatting is shared: these
+# are the DRF fields those serializers use, built once. Keep them in step
+# with the serializers above.
+
+_points = serializers.DecimalField(max_digits=5, decimal_places=2).to_representation
+_attempt_score = serializers.DecimalField(max_digits=7, decimal_places=2).to_representation
+_datetime = serializers.DateTimeField().to_representation
+
+
+def question_data(question, choices):
+    """QuestionSerializer(question).data, with `choices` in the order given."""
+    return {
+        'id': question.id,
+        'question_text': str(question.question_text),
+        'question_type': question.question_type,
+        'score_points': _points(question.score_points),
+        'question_id': str(question.question_id),
+        'choices': [
+            {'id': choice.id, 'choice_text': str(choice.choice_text), 'choice_id': str(choice.choice_id)}
+            for choice in choices
+        ],
+    }
+
+
+def student_answer_data(answer):
+    """StudentAnswerSerializer(answer).data"""
+    data = {
+        'id': answer.id,
+        'question': answer.question_id,
+        'question_text': str(answer.question.question_text),
+        'chosen_choice': answer.chosen_choice_id,
+    }
+    if answer.chosen_choice is not None:
+        # DRF leaves the field out when there is no chosen choice
+        data['chosen_choice_text'] = str(answer.chosen_choice.choice_text)
+    data['answer_text'] = None if answer.answer_text is None else str(answer.answer_text)
+    data['is_correct'] = bool(answer.is_correct)
+    data['score'] = _points(answer.score)
+    data['answer_id'] = str(answer.answer_id)
+    return data
+
+
+def attempt_result_data(attempt, correct_answers=None, total_questions=None, ranked=True):
+    """
+    ExamAttemptResultSerializer(attempt).data; pass correct_answers and
+    total_questions where the serializer would get them from its context.
+    With ranked=False the ranking is left None, for attempt_results_data().
+    """
+    exam = attempt.exam
+    if correct_answers is None:
+        if getattr(attempt, 'correct_answer_count', None) is None:
+            attempt.correct_answer_count = attempt.student_answers.filter(slot=0, is_correct=True).count()
+        correct_answers = attempt.correct_answer_count
+    questions_assigned = attempt.question_count or exam.total_questions_to_ask or exam.questions.count()
+    if total_questions is None:
+        total_questions = questions_assigned
+    percentage = round((correct_answers / total_questions) * 100, 1) if total_questions else 0
+    time_taken = None
+    if attempt.end_time and attempt.start_time:
+        time_taken = round((attempt.end_time - attempt.start_time).total_seconds() / 60, 1)
+    return {
+        'id': attempt.id,
+        'exam': attempt.exam_id,
+        'exam_title': str(exam.title),
+        'student_name': str(attempt.student.get_full_name()),
+        'student_username': str(attempt.student.username),
+        'start_time': None if attempt.start_time is None else _datetime(attempt.start_time),
+        'end_time': None if attempt.end_time is None else _datetime(attempt.end_time),
+        'score': _attempt_score(attempt.score),
+        'correct_answers': correct_answers,
+        'total_questions': total_questions,
+        'questions_assigned': questions_assigned,
+        'percentage_score': percentage,
+        'passed': percentage >= exam.pass_mark,
+        'time_taken': time_taken,
+        'is_completed': bool(attempt.is_completed),
+        'attempt_id': str(attempt.attempt_id),
+        'ability': attempt.ability,
+        'ability_se': attempt.ability_se,
+        'ranking': (position(attempt.exam_id, percentage, getattr(attempt, 'ranking_pending', ()))
+                    if ranked and attempt.is_completed else None),
+    }
+
+
+def attempt_results_data(attempts):
+    """[attempt_result_data(attempt) for attempt in attempts], ranked with one lookup for all of them."""
+    results = [attempt_result_data(attempt, ranked=False) for attempt in attempts]
+    completed = [data for data in results if data['is_completed']]
+    for data, ranking in zip(completed, positions([(data['exam'], data['percentage_score']) for data in completed])):
+        data['ranking'] = ranking
+    return results
+
+
+def resume_data(attempt, questions, answer_rows):
+    """
+    The resume endpoint's payload: the attempt, the seconds left, the paper
+    (`questions` with paper_choices, in order) and the saved answers in paper
+    order, shaped like submit-answer requests (MS answers also as a list).
+    """
+    types = {question.id: question.question_type for question in questions}
+    position = {question_id: i for i, question_id in enumerate(types)}
+    answers = []
+    for question_id, chosen_choice_id, answer_text in sorted(answer_rows, key=lambda row: position.get(row[0], 0)):
+        answer = {'question_id': question_id, 'chosen_choice_id': chosen_choice_id, 'answer_text': answer_text}
+        if types.get(question_id) == 'MS':
+            answer['selected_choice_ids'] = parse_selected_choice_ids(answer_text)
+        answers.append(answer)
+    return {
+        'attempt': ExamAttemptSerializer(attempt).data,
+        'remaining_seconds': remaining_seconds(attempt, attempt.exam),
+        'questions': [question_data(question, question.paper_choices) for question in questions],
+        'answers': answers,
+    }
+
+
+def dashboard_data(user, exams, attempts, recent_results):
+    """
+    The dashboard's payload: the profile, the `exams` (annotated with
+    question_total) each with the student's attempt or None, and the
+    `recent_results` latest of the completed `attempts` (from with_results()).
+    """
+    attempt_by_exam = {attempt.exam_id: attempt for attempt in attempts}
+    exam_list = ExamSerializer(exams, many=True).data
+    for exam, data in zip(exams, exam_list):
+        attempt = attempt_by_exam.get(exam.id)
+        data['attempt'] = None if attempt is None else {
+            'id': attempt.id,
+            'status': 'completed' if attempt.is_completed else 'in_progress',
+            'start_time': _datetime(attempt.start_time),
+            'ends_at': _datetime(attempt.start_time + timedelta(minutes=exam.duration_minutes)),
+        }
+
+    completed = sorted(
+        (attempt for attempt in attempts if attempt.is_completed),
+        key=lambda attempt: attempt.end_time or attempt.start_time, reverse=True
+    )
+    return {
+        'profile': {**UserSerializer(user).data, 'student_class': user.student_class},
+        'exams': exam_list,
+        'recent_results': attempt_results_data(completed[:recent_results]),
+    }
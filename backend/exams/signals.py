@@ -0,0 +1,71 @@
+# backend/exams/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import (
+    bump_exam_list_version, invalidate_dashboard, invalidate_exam, invalidate_live_roster, invalidate_question_bank,
+    invalidate_statistics
+)
+from .models import Choice, Exam, ExamAttempt, GradebookEntry, Question
+from .ranking import invalidate as invalidate_ranking
+
+
+@receiver(post_save, sender=Exam)
+@receiver(post_delete, sender=Exam)
+def exam_changed(sender, instance, **kwargs):
+    """
+    Drop the cached exam so the next request sees the new settings, once the
+    change is committed (see attempt_changed).
+    """
+    exam_id = instance.pk
+    transaction.on_commit(lambda: invalidate_exam(exam_id))
+    transaction.on_commit(lambda: invalidate_statistics(exam_id))
+    transaction.on_commit(bump_exam_list_version)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    """Drop the cached question bank (see caching.get_question_bank) and statistics once committed."""
+    exam_id = instance.exam_id
+    transaction.on_commit(lambda: invalidate_question_bank(exam_id))
+    transaction.on_commit(lambda: invalidate_statistics(exam_id))
+    transaction.on_commit(bump_exam_list_version)
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def choice_changed(sender, instance, **kwargs):
+    try:
+        exam_id = instance.question.exam_id
+    except Question.DoesNotExist:
+        return  # deleted together with its question, which already invalidated
+    transaction.on_commit(lambda: invalidate_question_bank(exam_id))
+    transaction.on_commit(lambda: invalidate_statistics(exam_id))
+
+
+@receiver(post_save, sender=ExamAttempt)
+@receiver(post_delete, sender=ExamAttempt)
+def attempt_changed(sender, instance, **kwargs):
+    """
+    Drop the student's cached dashboard and the exam's live rosters once the
+    change is committed (a dashboard rebuilt before the commit would cache
+    the old state again). Attempts started by start_or_resume() send no
+    signal; StartExamView invalidates those itself.
+    """
+    student_id, exam_id = instance.student_id, instance.exam_id
+    transaction.on_commit(lambda: invalidate_dashboard(student_id))
+    transaction.on_commit(lambda: invalidate_live_roster(exam_id))
+
+
+@receiver(post_delete, sender=GradebookEntry)
+def gradebook_entry_deleted(sender, instance, **kwargs):
+    """
+    A deleted result (e.g. with its attempt) leaves the exam's ranking:
+    rebuild it on its next read. Again after the commit, as a ranking rebuilt
+    in between would still count the result.
+    """
+    exam_id = instance.exam_id
+    invalidate_ranking([exam_id])
+    transaction.on_commit(lambda: invalidate_ranking([exam_id]))
@@ -1,3 +1,1922 @@
-from django.test import TestCase
+import json
+import os
+import random
+import re
+import tempfile
+import uuid
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, transaction
+from django.db.models import F, Q, Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, resolve
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from cbt_project import urls as project_urls
+from cbt_project.db_routers import ReplicaPinningMiddleware, ReplicaRouter, replica_reads
+from cbt_project.fastjson import FastJSONParser, FastJSONRenderer
+
+from . import export, ingest, live, ranking, urls as exam_urls
+from .analysis import update_item_analysis
+from .async_views import AsyncStartExamView
+from .caching import get_item_bank
+from .collusion import encode_responses, score_pairs
+from .gradebook import record_attempt
+from .irt import fit
+from .models import AttemptQuestion, Choice, CollusionFlag, Exam, ExamAttempt, GradebookEntry, ItemAnalysis, Question, StudentAnswer
+from .offline import sign_log
+from .serializers import (
+    ExamAttemptResultSerializer, QuestionSerializer, StudentAnswerSerializer, attempt_result_data,
+    question_data, student_answer_data
+)
+from .timing import timing_key
+from .utils import calculate_and_save_score
+
+
+@override_settings(REPLICA_DATABASE_ALIAS='replica', REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def test_reads_stay_on_primary_outside_replica_block(self):
+        self.assertEqual(self.router.db_for_read(Exam), DEFAULT_DB_ALIAS)
+
+    def test_reads_use_replica_inside_replica_block(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Exam), 'replica')
+        self.assertEqual(self.router.db_for_read(Exam), DEFAULT_DB_ALIAS)
+
+    def test_writes_always_go_to_primary(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(Exam), DEFAULT_DB_ALIAS)
+            # Once this request has written, its reads follow the write.
+            self.assertEqual(self.router.db_for_read(Exam), DEFAULT_DB_ALIAS)
+
+    @override_settings(REPLICA_DATABASE_ALIAS=None)
+    def test_no_replica_configured(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Exam), DEFAULT_DB_ALIAS)
+
+    def test_caller_is_pinned_to_primary_after_writing(self):
+        seen = []
+
+        def writes(request):
+            self.router.db_for_write(ExamAttempt)
+            return HttpResponse()
+
+        def reads(request):
+            with replica_reads():
+                seen.append(self.router.db_for_read(ExamAttempt))
+            return HttpResponse()
+
+        student = {'HTTP_AUTHORIZATION': 'Token abc'}
+        other = {'HTTP_AUTHORIZATION': 'Token xyz'}
+
+        ReplicaPinningMiddleware(writes)(self.factory.post('/', **student))
+        ReplicaPinningMiddleware(reads)(self.factory.get('/', **student))
+        ReplicaPinningMiddleware(reads)(self.factory.get('/', **other))
+
+        self.assertEqual(seen, [DEFAULT_DB_ALIAS, 'replica'])
+
+
+@skipUnless('replica' in settings.DATABASES, "needs a 'replica' entry in DATABASES")
+class ReplicaRoutingDatabaseTests(TransactionTestCase):
+    """Run with a settings file that defines two databases, e.g. two SQLite files."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            email='student@example.com', password='pass', username='student', is_student=True
+        )
+        self.headers = {'HTTP_AUTHORIZATION': f"Token {Token.objects.create(user=user).key}"}
+
+    def test_history_is_read_from_replica(self):
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.get('/api/attempts/history/', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('exams_examattempt' in q['sql'] for q in replica_queries))
+
+    def test_history_is_read_from_primary_after_a_write(self):
+        exam = Exam.objects.create(title='Maths', duration_minutes=30, is_active=True)
+        self.client.post(f'/api/exams/{exam.id}/start/', **self.headers)
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.client.get('/api/attempts/history/', **self.headers)
+        self.assertEqual(len(replica_queries), 0)
+
+
+class HotPathIndexTests(TestCase):
+    """The hot-path query shapes must be served by index scans, not table scans."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = get_user_model().objects.create_user(
+            email='student@example.com', password='pass', username='student', is_student=True
+        )
+        cls.exam = Exam.objects.create(title='Maths', duration_minutes=30, is_active=True)
+        cls.question = Question.objects.create(exam=cls.exam, question_text='2 + 2?', question_type='MC')
+        cls.attempt = ExamAttempt.objects.create(student=cls.student, exam=cls.exam)
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be sequentially scanned.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertIndexScan(self, queryset, *index_names):
+        plan = queryset.explain()
+        table = queryset.model._meta.db_table
+        if connection.vendor == 'postgresql':
+            self.assertIn('Index', plan)
+            self.assertNotIn('Seq Scan', plan)
+        else:
+            self.assertIn('USING', plan)
+            self.assertNotRegex(plan, rf'SCAN {table}(?! USING)')
+        if index_names:
+            self.assertTrue(any(name in plan for name in index_names), plan)
+
+    def test_attempt_lookup_by_student_exam_status(self):
+        self.assertIndexScan(
+            ExamAttempt.objects.filter(student=self.student, exam=self.exam, is_completed=True),
+            'attempt_student_exam_idx'
+        )
+        self.assertIndexScan(
+            ExamAttempt.objects.filter(student=self.student, exam=self.exam, is_completed=False),
+            'attempt_student_exam_idx', 'unique_open_attempt'
+        )
+
+    def test_attempt_history(self):
+        self.assertIndexScan(
+            ExamAttempt.objects.filter(student=self.student, is_completed=True).order_by('-end_time'),
+            'attempt_history_idx', 'attempt_student_exam_idx'
+        )
+
+    def test_open_attempt_expiry(self):
+        cutoff = timezone.now() - timedelta(minutes=30)
+        self.assertIndexScan(
+            ExamAttempt.objects.filter(is_completed=False, start_time__lt=cutoff),
+            'attempt_open_start_idx'
+        )
+
+    def test_answer_lookup_by_attempt_question(self):
+        self.assertIndexScan(StudentAnswer.objects.filter(attempt=self.attempt, question=self.question))
+
+    def test_question_lookup_by_exam_type(self):
+        self.assertIndexScan(
+            Question.objects.filter(exam=self.exam, question_type='MS'),
+            'question_exam_type_idx'
+        )
+
+
+class HotPathConstraintTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = get_user_model().objects.create_user(
+            email='student@example.com', password='pass', username='student', is_student=True
+        )
+        cls.exam = Exam.objects.create(title='Maths', duration_minutes=30, is_active=True)
+        cls.question = Question.objects.create(exam=cls.exam, question_text='2 + 2?', question_type='MC')
+        cls.right = Choice.objects.create(question=cls.question, choice_text='4', is_correct=True)
+        cls.wrong = Choice.objects.create(question=cls.question, choice_text='5')
+
+    def test_only_one_open_attempt_per_student_and_exam(self):
+        ExamAttempt.objects.create(student=self.student, exam=self.exam)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ExamAttempt.objects.create(student=self.student, exam=self.exam)
+        # Completed attempts do not count.
+        ExamAttempt.objects.create(student=self.student, exam=self.exam, is_completed=True)
+
+    def test_upsert_overwrites_the_answer_row(self):
+        attempt = ExamAttempt.objects.create(student=self.student, exam=self.exam)
+        first, created = StudentAnswer.objects.upsert(
+            attempt, self.question, chosen_choice=self.wrong, answer_text='', is_correct=False, score=Decimal('0')
+        )
+        self.assertTrue(created)
+        second, created = StudentAnswer.objects.upsert(
+            attempt, self.question, chosen_choice=self.right, answer_text='', is_correct=True, score=Decimal('1')
+        )
+        self.assertFalse(created)
+        self.assertEqual((second.pk, second.answer_id), (first.pk, first.answer_id))
+
+        answer = StudentAnswer.objects.get(attempt=attempt, question=self.question)
+        self.assertEqual(answer.chosen_choice, self.right)
+        self.assertTrue(answer.is_correct)
+
+
+class StartOrResumeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = get_user_model().objects.create_user(
+            email='student@example.com', password='pass', username='student', is_student=True
+        )
+        cls.exam = Exam.objects.create(title='Maths', duration_minutes=30, is_active=True, randomize_choices=True)
+        for i in range(3):
+            question = Question.objects.create(exam=cls.exam, question_text=f'Q{i}', question_type='MC')
+            Choice.objects.create(question=question, choice_text='a', is_correct=True)
+            Choice.objects.create(question=question, choice_text='b')
+        cls.headers = {'HTTP_AUTHORIZATION': f"Token {Token.objects.create(user=cls.student).key}"}
+
+    def setUp(self):
+        cache.clear()
+
+    def start(self):
+        paper = self.exam.pick_questions(self.exam.get_question_bank(), self.student.id)
+        return ExamAttempt.objects.start_or_resume(self.student, self.exam, paper)
+
+    def test_start_then_resume_the_same_attempt(self):
+        attempt, created = self.start()
+        self.assertTrue(created)
+        self.assertEqual(attempt.paper.count(), 3)
+
+        resumed, created = self.start()
+        self.assertFalse(created)
+        self.assertEqual((resumed.pk, resumed.attempt_id), (attempt.pk, attempt.attempt_id))
+        self.assertEqual(resumed.start_time, ExamAttempt.objects.get(pk=attempt.pk).start_time)
+        self.assertEqual(ExamAttempt.objects.count(), 1)
+
+    def test_completed_exam_is_not_restarted(self):
+        ExamAttempt.objects.create(student=self.student, exam=self.exam, is_completed=True)
+        self.assertEqual(self.start(), (None, False))
+        self.assertEqual(ExamAttempt.objects.count(), 1)
+
+    def test_start_endpoint_returns_clock_and_paper_handle(self):
+        response = self.client.post(f'/api/exams/{self.exam.id}/start/', **self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['total_questions'], 3)
+        self.assertEqual(response.json()['paper_url'], f'/api/exams/{self.exam.id}/questions/')
+        self.assertGreater(response.json()['remaining_seconds'], 30 * 60 - 5)
+
+        # Resuming is the token lookup plus a single statement.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/exams/{self.exam.id}/start/', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        statements = [q['sql'] for q in queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(len(statements), 2, statements)
+
+    def test_expired_attempt_is_submitted_on_resume(self):
+        attempt, _ = self.start()
+        ExamAttempt.objects.filter(pk=attempt.pk).update(start_time=timezone.now() - timedelta(minutes=31))
+        response = self.client.post(f'/api/exams/{self.exam.id}/start/', **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['is_completed'])
+        self.assertIn('Time limit exceeded', response.json()['detail'])
+
+
+TRANSACTION_CONTROL = {'SAVEPOINT', 'RELEASE', 'ROLLBACK', 'BEGIN', 'COMMIT'}
+
+
+def sql_shape(sql):
+    """Reduce a statement to its verb and main table, e.g. 'SELECT exams_exam'."""
+    sql = sql.strip()
+    verb = sql.split(None, 1)[0].upper()
+    if verb in TRANSACTION_CONTROL:
+        return verb
+    pattern = {
+        'SELECT': r'\bFROM\s+"?(\w+)"?',
+        'INSERT': r'\bINTO\s+"?(\w+)"?',
+        'UPDATE': r'^UPDATE\s+"?(\w+)"?',
+        'DELETE': r'\bFROM\s+"?(\w+)"?',
+    }.get(verb)
+    match = pattern and re.search(pattern, sql, re.IGNORECASE)
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Every endpoint and admin page below has a query budget: at most `max`
+    queries, only of the listed shapes (see sql_shape), and the same number of
+    queries whatever the amount of data behind it. Each request is measured
+    against a small and a larger data set; a count that grows with the data is
+    an N+1.
+    """
+    SIZES = (2, 12)
+
+    # name: (max queries, allowed shapes)
+    BUDGETS = {
+        'available-exams': (2, {'SELECT authtoken_token', 'SELECT exams_exam'}),
+        'exam-questions': (5, {
+            'SELECT authtoken_token', 'SELECT exams_exam', 'SELECT exams_examattempt',
+            'SELECT exams_attemptquestion', 'SELECT exams_choice',
+        }),
+        # Cold cache: the exam and its question bank are loaded too
+        'start-exam': (5, {'SELECT authtoken_token', 'SELECT exams_exam', 'SELECT exams_question',
+                           'SELECT exams_choice', 'INSERT exams_examattempt'}),
+        'submit-answer': (5, {
+            'SELECT authtoken_token', 'SELECT exams_examattempt', 'SELECT exams_question',
+            'SELECT exams_choice', 'INSERT exams_studentanswer',
+        }),
+        'submit-answer-ms': (6, {
+            'SELECT authtoken_token', 'SELECT exams_examattempt', 'SELECT exams_question',
+            'SELECT exams_choice', 'DELETE exams_studentanswer', 'INSERT exams_studentanswer',
+        }),
+        # The paper's time-on-task UPDATE only runs when timing counters exist
+        # ... and the ranking is rebuilt from the gradebook when not cached
+        'submit-exam': (8, {
+            'SELECT authtoken_token', 'SELECT exams_examattempt', 'SELECT exams_studentanswer',
+            'UPDATE exams_attemptquestion', 'UPDATE exams_examattempt', 'SELECT exams_gradebookentry',
+            'INSERT exams_gradebookentry',
+        }),
+        'resume-attempt': (5, {
+            'SELECT authtoken_token', 'SELECT exams_examattempt', 'SELECT exams_attemptquestion',
+            'SELECT exams_choice', 'SELECT exams_studentanswer',
+        }),
+        # Results are ranked with one lookup; cold, one grouped query on the gradebook
+        'student-dashboard': (4, {'SELECT authtoken_token', 'SELECT exams_exam', 'SELECT exams_examattempt',
+                                  'SELECT exams_gradebookentry'}),
+        'exam-results': (3, {'SELECT authtoken_token', 'SELECT exams_examattempt', 'SELECT exams_gradebookentry'}),
+        'past-attempts-history': (3, {'SELECT authtoken_token', 'SELECT exams_examattempt',
+                                      'SELECT exams_gradebookentry'}),
+        # Admin pages: session, user, list filters, two COUNTs and the rows
+        'admin-exams': (6, None),
+        'admin-questions': (8, None),
+        'admin-choices': (7, None),
+        'admin-attempts': (7, None),
+        'admin-attempt-change': (9, None),
+        'admin-answers': (7, None),
+        'admin-gradebook': (7, None),
+    }
+
+    def setUp(self):
+        cache.clear()
+
+    def seed(self, size):
+        """A student mid-exam (`size` questions) with `size` completed exams behind them."""
+        User = get_user_model()
+        student = User.objects.create_user(
+            email=f'student{size}@example.com', password='pass', username=f'student{size}', is_student=True
+        )
+        admin = User.objects.create_superuser(email=f'admin{size}@example.com', password='pass', username=f'admin{size}')
+        token = Token.objects.create(user=student)
+
+        def make_exam(title):
+            exam = Exam.objects.create(title=title, duration_minutes=30, is_active=True, randomize_choices=True)
+            for i in range(size):
+                qtype = ['MC', 'MS', 'FB', 'TF'][i % 4]
+                question = Question.objects.create(
+                    exam=exam, question_text=f'{title} Q{i}', question_type=qtype,
+                    correct_answer='paris' if qtype == 'FB' else None
+                )
+                if qtype != 'FB':
+                    Choice.objects.create(question=question, choice_text='a', is_correct=True)
+                    Choice.objects.create(question=question, choice_text='b', is_correct=qtype == 'MS')
+                    Choice.objects.create(question=question, choice_text='c')
+            return exam
+
+        def sit(exam, complete):
+            paper = exam.pick_questions(exam.get_question_bank(), student.id)
+            attempt, _ = ExamAttempt.objects.start_or_resume(student, exam, paper)
+            for question in exam.questions.all():
+                StudentAnswer.objects.upsert(attempt, question, answer_text='x', is_correct=True, score=Decimal('1'))
+            if complete:
+                ExamAttempt.objects.filter(pk=attempt.pk).update(is_completed=True, end_time=timezone.now())
+            return attempt
+
+        past = [sit(make_exam(f'Past {size}-{i}'), complete=True) for i in range(size)]
+        exam = make_exam(f'Current {size}')
+        attempt = sit(exam, complete=False)
+        questions = {q.question_type: q for q in exam.questions.all()}
+        return {
+            'student': student, 'admin': admin, 'headers': {'HTTP_AUTHORIZATION': f'Token {token.key}'},
+            'exam': exam, 'attempt': attempt, 'past': past, 'questions': questions,
+        }
+
+    def requests(self, data):
+        """(name, method, url, payload, uses admin session)"""
+        exam, attempt, questions = data['exam'], data['attempt'], data['questions']
+        mc, ms = questions['MC'], questions['MS']
+        return [
+            ('available-exams', 'get', '/api/exams/available/', None, False),
+            ('exam-questions', 'get', f'/api/exams/{exam.id}/questions/', None, False),
+            ('start-exam', 'post', f'/api/exams/{exam.id}/start/', None, False),
+            ('submit-answer', 'post', f'/api/attempts/{attempt.id}/submit-answer/',
+             {'question_id': mc.id, 'chosen_choice_id': mc.choices.first().id}, False),
+            ('submit-answer-ms', 'post', f'/api/attempts/{attempt.id}/submit-answer/',
+             {'question_id': ms.id, 'answer_text': ','.join(str(c.id) for c in ms.choices.all()[:2])}, False),
+            ('resume-attempt', 'get', f'/api/attempts/{attempt.id}/resume/', None, False),
+            ('student-dashboard', 'get', '/api/dashboard/', None, False),
+            ('exam-results', 'get', f"/api/attempts/{data['past'][0].id}/results/", None, False),
+            ('past-attempts-history', 'get', '/api/attempts/history/', None, False),
+            ('submit-exam', 'post', f'/api/attempts/{attempt.id}/submit/', None, False),
+            ('admin-exams', 'get', '/admin/exams/exam/', None, True),
+            ('admin-questions', 'get', '/admin/exams/question/', None, True),
+            ('admin-choices', 'get', '/admin/exams/choice/', None, True),
+            ('admin-attempts', 'get', '/admin/exams/examattempt/', None, True),
+            ('admin-attempt-change', 'get', f'/admin/exams/examattempt/{attempt.id}/change/', None, True),
+            ('admin-answers', 'get', '/admin/exams/studentanswer/', None, True),
+            ('admin-gradebook', 'get', '/admin/exams/gradebookentry/', None, True),
+        ]
+
+    def measure(self, size):
+        """{name: [sql, ...]} for every budgeted request at this data size."""
+        measured = {}
+        with transaction.atomic():
+            data = self.seed(size)
+            for name, method, url, payload, as_admin in self.requests(data):
+                cache.clear()
+                ContentType.objects.clear_cache()
+                if as_admin:
+                    self.client.force_login(data['admin'])
+                    headers = {}
+                else:
+                    self.client.logout()
+                    headers = data['headers']
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(self.client, method)(url, payload, content_type='application/json', **headers) \
+                        if method == 'post' else self.client.get(url, **headers)
+                self.assertLess(response.status_code, 300, f'{name}: {response.status_code}')
+                # Savepoints only exist because the test runs inside a transaction.
+                measured[name] = [q['sql'] for q in queries if sql_shape(q['sql']) not in TRANSACTION_CONTROL]
+            transaction.set_rollback(True)
+        return measured
+
+    def test_query_budgets(self):
+        runs = [self.measure(size) for size in self.SIZES]
+        for name, (max_queries, shapes) in self.BUDGETS.items():
+            with self.subTest(endpoint=name):
+                counts = [len(run[name]) for run in runs]
+                detail = '\n'.join(runs[-1][name])
+                self.assertEqual(len(set(counts)), 1, f'{name} grows with data: {counts}\n{detail}')
+                self.assertLessEqual(counts[-1], max_queries, f'{name} is over budget:\n{detail}')
+                if shapes is not None:
+                    unexpected = Counter(sql_shape(sql) for sql in runs[-1][name]).keys() - shapes
+                    self.assertFalse(unexpected, f'{name} runs unexpected queries: {unexpected}')
+
+
+class ResumeAttemptTests(TestCase):
+    """GET /api/attempts/<id>/resume/ returns everything a reloaded exam page needs."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.student = User.objects.create_user(
+            email='resume@example.com', password='pass', username='resume', is_student=True
+        )
+        cls.other = User.objects.create_user(
+            email='other@example.com', password='pass', username='other', is_student=True
+        )
+        cls.exam = Exam.objects.create(title='Resume', duration_minutes=30, is_active=True)
+        cls.mc = Question.objects.create(exam=cls.exam, question_text='MC', question_type='MC')
+        cls.ms = Question.objects.create(exam=cls.exam, question_text='MS', question_type='MS')
+        cls.fb = Question.objects.create(exam=cls.exam, question_text='FB', question_type='FB',
+                                         correct_answer='paris')
+        for question in (cls.mc, cls.ms):
+            for text in 'abc':
+                Choice.objects.create(question=question, choice_text=text, is_correct=text == 'a')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+        response = self.client.post(f'/api/exams/{self.exam.id}/start/')
+        self.attempt_id = response.json()['id']
+        self.url = f'/api/attempts/{self.attempt_id}/resume/'
+
+    def test_returns_paper_answers_and_remaining_time(self):
+        mc_choice = self.mc.choices.get(choice_text='b')
+        ms_ids = list(self.ms.choices.order_by('id').values_list('id', flat=True)[:2])
+        submit = f'/api/attempts/{self.attempt_id}/submit-answer/'
+        self.client.post(submit, {'question_id': self.mc.id, 'chosen_choice_id': mc_choice.id},
+                         content_type='application/json')
+        self.client.post(submit, {'question_id': self.ms.id, 'answer_text': ','.join(map(str, ms_ids))},
+                         content_type='application/json')
+        self.client.post(submit, {'question_id': self.fb.id, 'answer_text': 'Paris'},
+                         content_type='application/json')
+
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['attempt']['id'], self.attempt_id)
+        self.assertGreater(data['remaining_seconds'], 29 * 60)
+        paper = [question['id'] for question in data['questions']]
+        self.assertEqual(sorted(paper), sorted([self.mc.id, self.ms.id, self.fb.id]))
+        self.assertNotIn('is_correct', data['questions'][0]['choices'][0])
+        # Answers come back in paper order, in the shape submit-answer takes
+        answers = data['answers']
+        self.assertEqual([answer['question_id'] for answer in answers], paper)
+        by_question = {answer['question_id']: answer for answer in answers}
+        self.assertEqual(by_question[self.mc.id]['chosen_choice_id'], mc_choice.id)
+        self.assertEqual(by_question[self.ms.id]['selected_choice_ids'], ms_ids)
+        self.assertEqual(by_question[self.fb.id]['answer_text'], 'Paris')
+        self.assertNotIn('selected_choice_ids', by_question[self.fb.id])
+
+    def test_only_the_students_open_attempt(self):
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(self.student)
+        self.client.post(f'/api/attempts/{self.attempt_id}/submit/')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_expired_attempt_is_submitted(self):
+        ExamAttempt.objects.filter(pk=self.attempt_id).update(start_time=timezone.now() - timedelta(hours=1))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Time limit exceeded', response.json()['detail'])
+        self.assertTrue(ExamAttempt.objects.get(pk=self.attempt_id).is_completed)
+
+
+class AdaptiveExamTests(TestCase):
+    """Adaptive exams: one question at a time, picked from the ability estimate."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = get_user_model().objects.create_user(
+            email='cat@example.com', password='pass', username='cat', is_student=True
+        )
+        cls.exam = Exam.objects.create(title='Adaptive', duration_minutes=30, is_active=True, adaptive=True,
+                                       total_questions_to_ask=4)
+        cls.questions = []
+        for i, b in enumerate([-2.0, -1.0, -0.5, 0.0, 0.5, 1.0, 2.0, 3.0]):
+            question = Question.objects.create(exam=cls.exam, question_text=f'Q{i}', question_type='MC',
+                                               irt_difficulty=b, irt_discrimination=1.5)
+            for text in 'ab':
+                Choice.objects.create(question=question, choice_text=text, is_correct=text == 'a')
+            cls.questions.append(question)
+
+    def setUp(self):
+        cache.clear()
+        # Always the most informative question, so that the order is predictable
+        self.enterContext(mock.patch('exams.adaptive.RANDOMESQUE', 1))
+        self.client.force_login(self.student)
+        response = self.client.post(f'/api/exams/{self.exam.id}/start/')
+        self.assertEqual(response.status_code, 201)
+        self.attempt_id = response.json()['id']
+        self.submit = f'/api/attempts/{self.attempt_id}/submit-answer/'
+
+    def answer(self, question_id, correct=True):
+        choice = Choice.objects.get(question_id=question_id, is_correct=correct)
+        return self.client.post(self.submit, {'question_id': question_id, 'chosen_choice_id': choice.id},
+                                content_type='application/json')
+
+    def test_questions_follow_the_answers(self):
+        paper = self.client.get(f'/api/exams/{self.exam.id}/questions/').json()
+        self.assertEqual(len(paper), 1)
+        question_id = paper[0]['id']
+
+        abilities = []
+        for _ in range(3):
+            data = self.answer(question_id).json()['adaptive']
+            self.assertFalse(data['finished'])
+            abilities.append(data['ability'])
+            question_id = data['next_question']['id']
+        # Right answers push the estimate up, and the questions get harder with it
+        self.assertEqual(abilities, sorted(abilities))
+        difficulty = dict(Question.objects.values_list('id', 'irt_difficulty'))
+        paper = list(AttemptQuestion.objects.filter(attempt_id=self.attempt_id).order_by('position')
+                     .values_list('question_id', flat=True))
+        self.assertEqual(len(paper), 4)
+        self.assertGreater(difficulty[paper[-1]], difficulty[paper[0]])
+
+        # An earlier question cannot be answered again
+        self.assertEqual(self.answer(paper[0], correct=False).status_code, 400)
+
+        data = self.answer(question_id).json()['adaptive']
+        self.assertTrue(data['finished'])
+        self.assertIsNone(data['next_question'])
+        attempt = ExamAttempt.objects.get(pk=self.attempt_id)
+        self.assertEqual(attempt.question_count, 4)
+        self.assertAlmostEqual(attempt.ability, data['ability'], places=4)
+
+        result = self.client.post(f'/api/attempts/{self.attempt_id}/submit/').json()
+        self.assertEqual((result['correct_answers'], result['total_questions']), (4, 4))
+        self.assertEqual(result['ability_se'], attempt.ability_se)
+
+    def test_stops_at_the_target_standard_error(self):
+        Exam.objects.filter(pk=self.exam.pk).update(adaptive_target_se=0.9, total_questions_to_ask=None)
+        cache.clear()
+        question_id = self.client.get(f'/api/exams/{self.exam.id}/questions/').json()[0]['id']
+        data = self.answer(question_id).json()['adaptive']
+        while not data['finished']:
+            data = self.answer(data['next_question']['id'], correct=False).json()['adaptive']
+        self.assertLessEqual(data['standard_error'], 0.9)
+        self.assertLess(ExamAttempt.objects.get(pk=self.attempt_id).question_count, len(self.questions))
+
+    def test_selection_avoids_the_paper_and_spreads_exposure(self):
+        bank = get_item_bank(self.exam)
+        on_paper = {bank.index[self.questions[3].id]}
+        picks = {bank.select(0.0, on_paper, random.Random(seed), top=2) for seed in range(50)}
+        # The two most informative at 0 once the question at b = 0 is taken, in turns
+        self.assertEqual(picks, {bank.index[self.questions[i].id] for i in (2, 4)})
+        self.assertIsNone(bank.select(0.0, set(range(len(bank))), random.Random(0)))
+
+        theta, se = bank.estimate([], [])
+        self.assertAlmostEqual(theta, 0.0)
+        self.assertAlmostEqual(se, 1.0, places=2)
+
+
+class DashboardTests(TestCase):
+    """GET /api/dashboard/: profile, class exams with attempt status and recent results, cached per student."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.student = User.objects.create_user(
+            email='dash@example.com', password='pass', username='dash', is_student=True, student_class='SS1A'
+        )
+        cls.exams = {}
+        for title, student_class in [('Done', 'SS1A'), ('Open', ''), ('Fresh', None), ('Other class', 'JS2')]:
+            exam = Exam.objects.create(title=title, duration_minutes=30, is_active=True, student_class=student_class)
+            question = Question.objects.create(exam=exam, question_text='Q', question_type='MC')
+            Choice.objects.create(question=question, choice_text='a', is_correct=True)
+            cls.exams[title] = exam
+        Exam.objects.create(title='Inactive', duration_minutes=30, is_active=False)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+
+    def start(self, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f"/api/exams/{self.exams[title].id}/start/").json()
+
+    def test_dashboard(self):
+        done = self.start('Done')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/attempts/{done['id']}/submit/")
+        self.start('Open')
+
+        data = self.client.get('/api/dashboard/').json()
+        self.assertEqual(data['profile']['email'], 'dash@example.com')
+        self.assertEqual(data['profile']['student_class'], 'SS1A')
+        self.assertEqual([exam['title'] for exam in data['exams']], ['Done', 'Fresh', 'Open'])
+        status = {exam['title']: exam['attempt'] and exam['attempt']['status'] for exam in data['exams']}
+        self.assertEqual(status, {'Done': 'completed', 'Fresh': None, 'Open': 'in_progress'})
+        self.assertEqual([result['id'] for result in data['recent_results']], [done['id']])
+        self.assertEqual(data['exams'][0]['total_questions_available'], 1)
+
+    def test_cached_and_invalidated(self):
+        self.assertIsNone(self.client.get('/api/dashboard/').json()['exams'][1]['attempt'])
+        with self.assertNumQueries(2):  # session and user only: the dashboard comes from the cache
+            self.client.get('/api/dashboard/')
+
+        # Starting and submitting an attempt invalidate the student's entry
+        attempt = self.start('Fresh')
+        self.assertEqual(self.client.get('/api/dashboard/').json()['exams'][1]['attempt']['status'], 'in_progress')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/attempts/{attempt['id']}/submit/")
+        data = self.client.get('/api/dashboard/').json()
+        self.assertEqual(data['exams'][1]['attempt']['status'], 'completed')
+        self.assertEqual(len(data['recent_results']), 1)
+
+        # An exam change makes every dashboard stale
+        Exam.objects.filter(pk=self.exams['Open'].pk).update(title='Renamed')
+        self.assertNotIn('Renamed', [exam['title'] for exam in self.client.get('/api/dashboard/').json()['exams']])
+        self.exams['Open'].title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exams['Open'].save()
+        self.assertIn('Renamed', [exam['title'] for exam in self.client.get('/api/dashboard/').json()['exams']])
+
+
+class OfflineDeliveryTests(TestCase):
+    """Offline exams: a signed bundle at start, one signed answer log at the end."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = get_user_model().objects.create_user(
+            email='offline@example.com', password='pass', username='offline', is_student=True
+        )
+        cls.exam = Exam.objects.create(title='Offline', duration_minutes=30, is_active=True, delivery_mode='offline')
+        cls.mc = Question.objects.create(exam=cls.exam, question_text='MC', question_type='MC')
+        cls.ms = Question.objects.create(exam=cls.exam, question_text='MS', question_type='MS')
+        cls.fb = Question.objects.create(exam=cls.exam, question_text='FB', question_type='FB', correct_answer='Paris')
+        for question in (cls.mc, cls.ms):
+            for text in 'abc':
+                Choice.objects.create(question=question, choice_text=text,
+                                      is_correct=text == 'a' or (question is cls.ms and text == 'b'))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+        self.start = self.client.post(f'/api/exams/{self.exam.id}/start/').json()
+        self.url = f"/api/attempts/{self.start['id']}/sync/"
+        self.now_ms = int(timezone.now().timestamp() * 1000)
+
+    def upload(self, entries, key=None, token=None):
+        log = json.dumps(entries)
+        return self.client.post(self.url, {
+            'bundle_token': token or self.start['bundle_token'],
+            'log': log,
+            'signature': sign_log(key or self.start['log_key'], log),
+        }, content_type='application/json')
+
+    def test_bundle(self):
+        bundle = self.start['bundle']
+        self.assertEqual(bundle['attempt'], self.start['id'])
+        self.assertEqual(sorted(q['id'] for q in bundle['questions']), [self.mc.id, self.ms.id, self.fb.id])
+        self.assertNotIn('is_correct', bundle['questions'][0]['choices'][0])
+        # Starting again (e.g. after a reload) hands out the same bundle
+        again = self.client.post(f'/api/exams/{self.exam.id}/start/').json()
+        self.assertEqual(again['bundle'], bundle)
+        self.assertEqual(again['log_key'], self.start['log_key'])
+
+    def test_sync_grades_and_submits(self):
+        mc_a, mc_b = self.mc.choices.get(choice_text='a'), self.mc.choices.get(choice_text='b')
+        ms_ids = list(self.ms.choices.filter(is_correct=True).values_list('id', flat=True))
+        t = self.now_ms
+        response = self.upload([
+            {'question_id': self.mc.id, 'chosen_choice_id': mc_a.id, 'answered_at': t + 2000},
+            {'question_id': self.mc.id, 'chosen_choice_id': mc_b.id, 'answered_at': t + 1000},  # older: ignored
+            {'question_id': self.ms.id, 'selected_choice_ids': ms_ids, 'answered_at': t},
+            {'question_id': self.fb.id, 'answer_text': ' paris ', 'answered_at': t + 3600 * 1000},  # after the deadline
+        ])
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertTrue(data['is_completed'])
+        self.assertEqual((data['correct_answers'], data['accepted_answers'], data['rejected_answers']), (2, 2, 2))
+        self.assertEqual(Decimal(data['score']), Decimal('2.00'))
+        self.assertEqual(StudentAnswer.objects.filter(attempt_id=self.start['id'], slot=0).count(), 2)
+
+        # A retried upload gets the result again
+        retry = self.upload([])
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json()['correct_answers'], 2)
+
+    def test_rejected_uploads(self):
+        entries = [{'question_id': self.fb.id, 'answer_text': 'Paris', 'answered_at': self.now_ms}]
+        self.assertEqual(self.upload(entries, key='0' * 64).status_code, 400)
+        self.assertEqual(self.upload(entries, token='forged').status_code, 400)
+        ExamAttempt.objects.filter(pk=self.start['id']).update(start_time=timezone.now() - timedelta(hours=2))
+        response = self.upload(entries)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('upload deadline', response.json()['detail'])
+        self.assertFalse(ExamAttempt.objects.get(pk=self.start['id']).is_completed)
+
+    @override_settings(ANSWER_INGEST='buffered')
+    def test_online_answers_are_refused(self):
+        # Nothing may sit in the answer buffer to overwrite the log on scoring
+        mc_a, mc_b = self.mc.choices.get(choice_text='a'), self.mc.choices.get(choice_text='b')
+        response = self.client.post(f"/api/attempts/{self.start['id']}/submit-answer/",
+                                    {'question_id': self.mc.id, 'chosen_choice_id': mc_b.id},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.upload([{'question_id': self.mc.id, 'chosen_choice_id': mc_a.id, 'answered_at': self.now_ms}])
+        self.assertEqual(response.json()['correct_answers'], 1)
+        self.assertEqual(StudentAnswer.objects.get(attempt_id=self.start['id']).chosen_choice, mc_a)
+
+
+@override_settings(ANSWER_INGEST='buffered')
+class BufferedIngestTests(TestCase):
+    """ANSWER_INGEST = 'buffered': answers are acknowledged from the cache and written in batches."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = get_user_model().objects.create_user(
+            email='buffered@example.com', password='pass', username='buffered', is_student=True
+        )
+        cls.exam = Exam.objects.create(title='Buffered', duration_minutes=30, is_active=True)
+        cls.mc = Question.objects.create(exam=cls.exam, question_text='MC', question_type='MC')
+        cls.ms = Question.objects.create(exam=cls.exam, question_text='MS', question_type='MS')
+        cls.fb = Question.objects.create(exam=cls.exam, question_text='FB', question_type='FB', correct_answer='Paris')
+        for question in (cls.mc, cls.ms):
+            for text in 'abc':
+                Choice.objects.create(question=question, choice_text=text, is_correct=text == 'a')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student)
+        self.attempt_id = self.client.post(f'/api/exams/{self.exam.id}/start/').json()['id']
+        self.right = self.mc.choices.get(choice_text='a')
+        self.wrong = self.mc.choices.get(choice_text='b')
+
+    def answer(self, question, **payload):
+        return self.client.post(f'/api/attempts/{self.attempt_id}/submit-answer/',
+                                {'question_id': question.id, **payload}, content_type='application/json')
+
+    def answer_all(self):
+        ms_right = self.ms.choices.get(choice_text='a')
+        with CaptureQueriesContext(connection) as queries:
+            for choice in (self.right, self.wrong, self.right):  # a student changing their mind
+                self.assertEqual(self.answer(self.mc, chosen_choice_id=choice.id).status_code, 202)
+            self.assertEqual(self.answer(self.ms, answer_text=str(ms_right.id)).status_code, 202)
+            self.assertEqual(self.answer(self.fb, answer_text='paris').status_code, 202)
+        writes = [q['sql'] for q in queries if sql_shape(q['sql']).split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+        self.assertEqual(writes, [])
+        self.assertFalse(StudentAnswer.objects.filter(attempt_id=self.attempt_id).exists())
+
+    def test_submit_flushes_the_buffer(self):
+        self.answer_all()
+        data = self.client.post(f'/api/attempts/{self.attempt_id}/submit/').json()
+        self.assertEqual((data['correct_answers'], Decimal(data['score'])), (3, Decimal('3.00')))
+        # One row per question (plus the MS selection row), the latest MC answer
+        answers = StudentAnswer.objects.filter(attempt_id=self.attempt_id)
+        self.assertEqual(answers.count(), 4)
+        self.assertEqual(answers.get(question=self.mc).chosen_choice, self.right)
+
+    def test_flush_command_and_resume(self):
+        self.answer_all()
+        with self.captureOnCommitCallbacks(execute=True):
+            resumed = self.client.get(f'/api/attempts/{self.attempt_id}/resume/').json()
+        self.assertEqual({a['question_id'] for a in resumed['answers']}, {self.mc.id, self.ms.id, self.fb.id})
+
+        self.answer(self.fb, answer_text='Lagos')
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('flush_answer_buffer', stdout=out)
+        self.assertIn('Flushed 1 answers of 1 attempts', out.getvalue())
+        self.assertEqual(StudentAnswer.objects.get(attempt_id=self.attempt_id, question=self.fb).answer_text, 'Lagos')
+        # Nothing new since: nothing to write
+        call_command('flush_answer_buffer', stdout=out)
+        self.assertIn('Flushed 0 answers of 0 attempts', out.getvalue())
+
+    def test_lock_held_until_commit(self):
+        self.answer_all()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(ingest.flush_answers(self.attempt_id), 3)
+            # A periodic flush must not see the scorer's answers as unflushed
+            self.assertIsNotNone(cache.get(ingest.lock_key(self.attempt_id)))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(ingest.lock_key(self.attempt_id)))
+
+    def test_periodic_flush_skips_an_attempt_scored_meanwhile(self):
+        self.answer_all()
+        get_many = cache.get_many
+
+        def scored_meanwhile(keys):
+            ExamAttempt.objects.filter(pk=self.attempt_id).update(is_completed=True)
+            return get_many(keys)
+
+        with mock.patch.object(ingest.cache, 'get_many', side_effect=scored_meanwhile):
+            self.assertEqual(ingest.flush_pending(), (0, 0))
+        self.assertFalse(StudentAnswer.objects.filter(attempt_id=self.attempt_id).exists())
+
+    def test_periodic_flush_survives_a_failing_attempt(self):
+        self.answer_all()
+        with mock.patch('exams.ingest._write', side_effect=IntegrityError('unique_answer_slot')), \
+                self.assertLogs('exams.ingest', 'ERROR'):
+            self.assertEqual(ingest.flush_pending(), (0, 0))
+        self.assertIsNone(cache.get(ingest.lock_key(self.attempt_id)))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ingest.flush_pending(), (1, 3))
+
+    def test_expired_attempts_are_swept(self):
+        self.answer_all()
+        ExamAttempt.objects.filter(pk=self.attempt_id).update(start_time=timezone.now() - timedelta(hours=1))
+        call_command('submit_expired_attempts', stdout=StringIO())
+        attempt = ExamAttempt.objects.get(pk=self.attempt_id)
+        self.assertTrue(attempt.is_completed)
+        self.assertEqual(attempt.score, Decimal('3.00'))
+
+
+class TimeOnTaskTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.student = User.objects.create_user(
+            email='timing@example.com', password='pass', username='timing', is_student=True
+        )
+        cls.staff = User.objects.create_user(email='timing-staff@example.com', password='pass',
+                                             username='timing-staff', is_staff=True)
+        cls.exam = Exam.objects.create(title='Timing', duration_minutes=30, is_active=True)
+        cls.mc = Question.objects.create(exam=cls.exam, question_text='MC', question_type='MC')
+        cls.fb = Question.objects.create(exam=cls.exam, question_text='FB', question_type='FB', correct_answer='Paris')
+        for text in 'abc':
+            Choice.objects.create(question=cls.mc, choice_text=text, is_correct=text == 'a')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_times_reach_the_paper_and_the_report(self):
+        self.client.force_login(self.student)
+        attempt_id = self.client.post(f'/api/exams/{self.exam.id}/start/').json()['id']
+        submit = f'/api/attempts/{attempt_id}/submit-answer/'
+        choices = list(self.mc.choices.order_by('id'))
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            for choice, spent in ((choices[1], 40000), (choices[0], 5000), (choices[0], 'soon')):
+                self.client.post(submit, {'question_id': self.mc.id, 'chosen_choice_id': choice.id,
+                                          'time_spent_ms': spent}, content_type='application/json')
+        self.assertFalse([q['sql'] for q in queries if 'exams_attemptquestion' in q['sql'] and 'UPDATE' in q['sql']])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(submit, {'question_id': self.fb.id, 'answer_text': 'Paris', 'time_spent_ms': 10 ** 9},
+                             content_type='application/json')
+        self.client.post(f'/api/attempts/{attempt_id}/submit/')
+
+        paper = dict(AttemptQuestion.objects.filter(attempt_id=attempt_id)
+                     .values_list('question_id', 'time_spent_ms'))
+        self.assertEqual(paper, {self.mc.id: 45000, self.fb.id: 30 * 60000})  # clamped to the duration
+
+        self.client.force_login(self.staff)
+        report = self.client.get(f'/api/exams/{self.exam.id}/question-timing/').json()
+        mc = next(item for item in report['questions'] if item['question_id'] == self.mc.id)
+        self.assertEqual((mc['attempts'], mc['mean_seconds'], mc['mean_changes'], mc['changed_rate']),
+                         (1, 45.0, 2.0, 1.0))
+
+    def test_rejected_answers_are_not_timed(self):
+        ms = Question.objects.create(exam=self.exam, question_text='MS', question_type='MS')
+        unkeyed = Choice.objects.create(question=ms, choice_text='a')
+        self.client.force_login(self.student)
+        attempt_id = self.client.post(f'/api/exams/{self.exam.id}/start/').json()['id']
+        submit = f'/api/attempts/{attempt_id}/submit-answer/'
+        with self.captureOnCommitCallbacks(execute=True):
+            unknown_choice = self.client.post(submit, {'question_id': self.mc.id, 'chosen_choice_id': 999999,
+                                                       'time_spent_ms': 5000}, content_type='application/json')
+            no_correct_answers = self.client.post(submit, {'question_id': ms.id, 'answer_text': str(unkeyed.id),
+                                                           'time_spent_ms': 5000}, content_type='application/json')
+        self.assertEqual((unknown_choice.status_code, no_correct_answers.status_code), (404, 400))
+        self.assertEqual(cache.get_many([timing_key(attempt_id, question.id) for question in (self.mc, ms)]), {})
+
+    def test_staff_only(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(f'/api/exams/{self.exam.id}/question-timing/').status_code, 403)
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+@mock.patch.object(live, 'STREAM_SECONDS', 0)  # one snapshot per stream
+@mock.patch.object(live, 'INTERVAL', 0)  # ... not shared between streams
+class LiveProgressTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.exam = Exam.objects.create(title='Live', duration_minutes=30, is_active=True, student_class='JSS1')
+        cls.questions = [
+            Question.objects.create(exam=cls.exam, question_text=f'Live {i}', question_type='FB', correct_answer='x')
+            for i in range(3)
+        ]
+        cls.students = {
+            username: User.objects.create_user(email=f'{username}@example.com', password='pass', username=username,
+                                               is_student=True, student_class='JSS1', last_name=username.title())
+            for username in ('amaka', 'bisi', 'chuks')
+        }
+        get_user_model().objects.create_user(email='other@example.com', password='pass', username='other',
+                                             is_student=True, student_class='JSS2')
+        cls.staff = User.objects.create_user(email='invigilator@example.com', password='pass', username='invigilator',
+                                             is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def sit(self, username, answers, submit=False):
+        self.client.force_login(self.students[username])
+        attempt_id = self.client.post(f'/api/exams/{self.exam.id}/start/').json()['id']
+        with self.captureOnCommitCallbacks(execute=True):
+            for question in answers:
+                self.client.post(f'/api/attempts/{attempt_id}/submit-answer/',
+                                 {'question_id': question.id, 'answer_text': 'x'}, content_type='application/json')
+        if submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'/api/attempts/{attempt_id}/submit/')
+        return attempt_id
+
+    def read(self, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(f'/api/exams/{self.exam.id}/live/', params, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = response.streaming_content
+        if response.is_async:  # AsyncLiveProgressView (EXAMS_ASYNC_VIEWS)
+            chunks = async_to_sync(_collect)(chunks)
+        events = b''.join(chunks).decode().split('\n\n')
+        self.assertTrue(events[0].startswith('retry: '))
+        return json.loads(events[1].removeprefix('data: '))
+
+    def test_progress(self):
+        # A changed answer counts once
+        self.sit('amaka', [self.questions[0], self.questions[1], self.questions[0]])
+        self.sit('bisi', self.questions, submit=True)
+
+        data = self.read()
+        self.assertEqual(data['summary'], {'not_started': 1, 'in_progress': 1, 'time_up': 0, 'submitted': 1})
+        students = {student['username']: student for student in data['students']}
+        self.assertEqual(list(students), ['amaka', 'bisi', 'chuks'])
+        amaka, bisi, chuks = students.values()
+        self.assertEqual((amaka['status'], amaka['answered'], amaka['questions']), ('in_progress', 2, 3))
+        self.assertGreater(amaka['remaining_seconds'], 29 * 60)
+        self.assertEqual((bisi['status'], bisi['answered'], bisi['remaining_seconds']), ('submitted', 3, 0))
+        self.assertIsNotNone(bisi['submitted_at'])
+        self.assertEqual((chuks['status'], chuks['attempt_id']), ('not_started', None))
+
+        ExamAttempt.objects.filter(student=self.students['amaka']).update(
+            start_time=timezone.now() - timedelta(minutes=31))
+        with self.captureOnCommitCallbacks(execute=True):
+            ExamAttempt.objects.get(student=self.students['amaka']).save()
+        self.assertEqual(self.read()['students'][0]['status'], 'time_up')
+        self.assertEqual([student['username'] for student in self.read(student_class='JSS2')['students']], ['other'])
+
+    def test_fed_from_the_cache(self):
+        self.sit('amaka', self.questions[:1])
+        self.read()
+        with CaptureQueriesContext(connection) as queries:
+            data = self.read()
+        self.assertFalse([q['sql'] for q in queries if 'exams_' in q['sql']])
+        self.assertEqual(data['students'][0]['answered'], 1)
+
+        # Answers show at once; a new attempt rebuilds the roster
+        self.sit('amaka', self.questions[1:])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sit('chuks', [])
+        data = self.read()
+        self.assertEqual([student['status'] for student in data['students']], ['in_progress', 'not_started', 'in_progress'])
+        self.assertEqual(data['students'][0]['answered'], 3)
+
+        # Streams share each interval's update
+        with mock.patch.object(live, 'INTERVAL', 60):
+            self.read()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.sit('bisi', [])
+            self.assertEqual(self.read()['summary']['not_started'], 1)
+
+    def test_rejected_answers_are_not_counted(self):
+        mc = Question.objects.create(exam=self.exam, question_text='Live MC', question_type='MC')
+        Choice.objects.create(question=mc, choice_text='a', is_correct=True)
+        attempt_id = self.sit('amaka', [])
+        submit = f'/api/attempts/{attempt_id}/submit-answer/'
+        with self.captureOnCommitCallbacks(execute=True):
+            rejected = self.client.post(submit, {'question_id': mc.id, 'chosen_choice_id': 999999},
+                                        content_type='application/json')
+        self.assertEqual(rejected.status_code, 404)
+        self.assertEqual(self.read()['students'][0]['answered'], 0)
+
+        self.sit('amaka', [mc])
+        self.assertEqual(self.read()['students'][0]['answered'], 1)
+
+    def test_staff_only(self):
+        self.client.force_login(self.students['amaka'])
+        self.assertEqual(self.client.get(f'/api/exams/{self.exam.id}/live/').status_code, 403)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get('/api/exams/999999/live/').status_code, 404)
+
+    def test_admin_page(self):
+        admin_user = get_user_model().objects.create_superuser(email='live-admin@example.com', password='pass',
+                                                               username='live-admin')
+        self.client.force_login(admin_user)
+        response = self.client.get(f'/admin/exams/exam/{self.exam.id}/live/')
+        self.assertContains(response, f'/api/exams/{self.exam.id}/live/?student_class=JSS1')
+
+
+class ExamStatisticsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.staff = User.objects.create_user(email='stats@example.com', password='pass', username='stats',
+                                             is_staff=True)
+        cls.exam = Exam.objects.create(title='Stats', duration_minutes=30, total_questions_to_ask=5)
+        cls.empty = Exam.objects.create(title='Empty', duration_minutes=30)
+        cls.mc = Question.objects.create(exam=cls.exam, question_text='MC', question_type='MC',
+                                         difficulty_level='easy')
+        Choice.objects.create(question=cls.mc, choice_text='a')
+        ms = Question.objects.create(exam=cls.exam, question_text='MS', question_type='MS', difficulty_level='hard')
+        Choice.objects.create(question=ms, choice_text='a', is_correct=True)
+        Question.objects.create(exam=cls.exam, question_text='FB', question_type='FB', correct_answer='')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.staff)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), [q['sql'] for q in queries if 'FROM "exams_question"' in q['sql']]
+
+    def test_statistics_and_issues_from_one_query(self):
+        data, queries = self.get(f'/api/exams/{self.exam.id}/statistics/')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(data['total_questions_available'], 3)
+        self.assertEqual(data['question_type_distribution'], {'MC': 1, 'MS': 1, 'FB': 1})
+        self.assertEqual(data['difficulty_distribution'], {'easy': 1, 'hard': 1, 'medium': 1})
+        self.assertEqual(data['issues'], [
+            "Cannot ask 5 questions when only 3 are available.",
+            "1 multiple choice/select questions don't have correct answers marked.",
+            "1 fill-in-blank questions don't have correct answers set.",
+        ])
+        self.assertEqual(self.get(f'/api/exams/{self.exam.id}/statistics/'), (data, []))
+
+        # Fixing a question invalidates the cached statistics once committed
+        with self.captureOnCommitCallbacks() as callbacks:
+            Choice.objects.create(question=self.mc, choice_text='b', is_correct=True)
+        self.assertEqual(self.get(f'/api/exams/{self.exam.id}/statistics/'), (data, []))
+        for callback in callbacks:
+            callback()
+        data, _ = self.get(f'/api/exams/{self.exam.id}/statistics/')
+        self.assertEqual(len(data['issues']), 2)
+
+    def test_overview(self):
+        overview, queries = self.get('/api/exams/statistics/')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([exam['title'] for exam in overview], ['Empty', 'Stats'])
+        self.assertEqual(overview[0]['issues'], ["No questions have been added to this exam."])
+        self.assertEqual(self.get('/api/exams/statistics/'), (overview, []))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.create(exam=self.empty, question_text='TF', question_type='TF')
+        overview, _ = self.get('/api/exams/statistics/')
+        self.assertEqual(overview[0]['question_type_distribution'], {'TF': 1})
+
+    def test_staff_only(self):
+        self.client.force_login(get_user_model().objects.create_user(
+            email='stats-student@example.com', password='pass', username='stats-student'
+        ))
+        self.assertEqual(self.client.get('/api/exams/statistics/').status_code, 403)
+
+
+def sit(student, exam, choose, attempt=None):
+    """
+    Complete an attempt at `exam` (a new one unless given), answering its
+    i-th question (in id order) with the Choice choose(i, question).
+    Returns the scored attempt.
+    """
+    if attempt is None:
+        paper = exam.pick_questions(exam.get_question_bank(), student.id)
+        attempt, _ = ExamAttempt.objects.start_or_resume(student, exam, paper)
+    for i, question in enumerate(exam.questions.order_by('id')):
+        choice = choose(i, question)
+        StudentAnswer.objects.upsert(attempt, question, chosen_choice=choice, answer_text='',
+                                     is_correct=choice.is_correct, score=Decimal(choice.is_correct))
+    return calculate_and_save_score(attempt)[0]
+
+
+def right_first(correct):
+    """A sit() chooser getting the first `correct` questions right and the rest wrong."""
+    return lambda i, question: question.choices.get(is_correct=i < correct)
+
+
+class GradebookTests(TestCase):
+
+    # Correct answers out of 4 per student, for the two exams (None: not sat)
+    RESULTS = {'ada': (4, 2), 'bola': (3, 2), 'chidi': (3, None), 'dayo': (1, 4)}
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.exams = []
+        for title, pass_mark in (('Biology', 50), ('Algebra', 75)):
+            exam = Exam.objects.create(title=title, duration_minutes=30, is_active=True, pass_mark=pass_mark)
+            for i in range(4):
+                question = Question.objects.create(exam=exam, question_text=f'{title} {i}', question_type='MC')
+                Choice.objects.create(question=question, choice_text='right', is_correct=True)
+                Choice.objects.create(question=question, choice_text='wrong')
+            cls.exams.append(exam)
+        cls.students = {
+            username: User.objects.create_user(email=f'{username}@example.com', password='pass', username=username,
+                                               student_class='SS1' if username != 'dayo' else 'SS2')
+            for username in cls.RESULTS
+        }
+        cls.staff = User.objects.create_user(email='gradebook@example.com', password='pass', username='gradebook',
+                                             is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        for username, results in self.RESULTS.items():
+            for exam, correct in zip(self.exams, results):
+                if correct is not None:
+                    sit(self.students[username], exam, right_first(correct))
+        self.client.force_login(self.staff)
+
+    def test_class_grid(self):
+        data = self.client.get('/api/gradebook/', {'student_class': 'SS1'}).json()
+        algebra, biology = data['exams']
+        self.assertEqual((algebra['title'], biology['title']), ('Algebra', 'Biology'))
+        self.assertEqual((biology['students'], biology['average'], biology['median']), (3, 83.3, 75.0))
+        self.assertEqual((biology['pass_rate'], algebra['pass_rate']), (1.0, 0.0))
+
+        students = {student['username']: student for student in data['students']}
+        # Ranked on the average over the exams sat: ada and chidi tie at 75%
+        self.assertEqual([student['username'] for student in data['students']], ['ada', 'chidi', 'bola'])
+        self.assertEqual([student['class_rank'] for student in data['students']], [1, 1, 3])
+        ada, bola, chidi = students['ada'], students['bola'], students['chidi']
+        self.assertEqual(ada['results'][1], {'percentage': 100.0, 'passed': True, 'rank': 1, 'percentile': 100.0})
+        # Ties share a rank
+        self.assertEqual([bola['results'][1]['rank'], chidi['results'][1]['rank']], [2, 2])
+        self.assertEqual(bola['results'][1]['percentile'], 0.0)
+        self.assertIsNone(chidi['results'][0])
+        self.assertEqual(ada['results'][0]['passed'], False)
+
+    def test_grid_is_cached_until_a_result_in_the_class_changes(self):
+        self.client.get('/api/gradebook/', {'student_class': 'SS1'})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/gradebook/', {'student_class': 'SS1'})
+        self.assertFalse([q['sql'] for q in queries if 'exams_gradebookentry' in q['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sit(self.students['chidi'], self.exams[1], right_first(4))
+        data = self.client.get('/api/gradebook/', {'student_class': 'SS1'}).json()
+        chidi = next(student for student in data['students'] if student['username'] == 'chidi')
+        self.assertEqual((chidi['results'][0]['percentage'], chidi['class_rank']), (100.0, 1))
+
+    def test_overview_and_rebuild(self):
+        overview = self.client.get('/api/gradebook/').json()['classes']
+        self.assertEqual([(c['student_class'], c['students'], c['results']) for c in overview],
+                         [('SS1', 3, 5), ('SS2', 1, 2)])
+
+        # A retake (e.g. after a reset) replaces the student's result
+        ada, biology = self.students['ada'], self.exams[0]
+        retake = ExamAttempt.objects.create(student=ada, exam=biology, start_time=timezone.now(), question_count=4)
+        sit(ada, biology, right_first(0), attempt=retake)
+        self.assertEqual(GradebookEntry.objects.get(student=ada, exam=biology).attempt_id, retake.id)
+
+        incremental = sorted(GradebookEntry.objects.values_list('attempt_id', 'percentage', 'passed'))
+        out = StringIO()
+        call_command('rebuild_gradebook', stdout=out)
+        self.assertIn('Wrote 7 gradebook entries', out.getvalue())
+        self.assertEqual(sorted(GradebookEntry.objects.values_list('attempt_id', 'percentage', 'passed')), incremental)
+
+    def test_staff_only(self):
+        self.client.force_login(self.students['ada'])
+        self.assertEqual(self.client.get('/api/gradebook/').status_code, 403)
+
+
+class RankingTests(TestCase):
+    """Per-exam rank and percentile from the cached Fenwick tree, checked against direct counting."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.exam = Exam.objects.create(title='Ranked', duration_minutes=30, is_active=True)
+        for i in range(4):
+            question = Question.objects.create(exam=cls.exam, question_text=f'Ranked {i}', question_type='MC')
+            Choice.objects.create(question=question, choice_text='right', is_correct=True)
+            Choice.objects.create(question=question, choice_text='wrong')
+        cls.students = [
+            User.objects.create_user(email=f'ranked{i}@example.com', password='pass', username=f'ranked{i}')
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_matches_direct_counting(self):
+        ranking.build([self.exam.id])
+        rng = random.Random(48)
+        percentages = [round(rng.uniform(0, 100), 1) for _ in range(500)] + [0.0, 100.0, 100.0]
+        for percentage in percentages:
+            ranking.add(self.exam.id, percentage)
+        probes = sorted(set(percentages))[::7] + [0.0, 50.05, 100.0]
+        for probe, result in zip(probes, ranking.positions([(self.exam.id, probe) for probe in probes])):
+            probe = round(probe, 1)
+            below = sum(1 for percentage in percentages if percentage < probe)
+            better = sum(1 for percentage in percentages if percentage > probe)
+            self.assertEqual(result, {
+                'rank': better + 1, 'percentile': round(100 * below / (len(percentages) - 1), 1),
+                'out_of': len(percentages)
+            })
+
+    def test_results_are_ranked(self):
+        ranking.build([self.exam.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            for student, correct in zip(self.students, (4, 2, 2)):
+                sit(student, self.exam, right_first(correct))
+        with self.captureOnCommitCallbacks() as callbacks:
+            attempt = sit(self.students[3], self.exam, right_first(1))
+        # Until the commit only the submitted result itself counts its change
+        self.assertEqual(ranking.position(self.exam.id, 25.0)['out_of'], 3)
+        self.assertEqual(ExamAttemptResultSerializer(attempt).data['ranking'],
+                         {'rank': 4, 'percentile': 0.0, 'out_of': 4})
+        for callback in callbacks:
+            callback()
+        self.assertEqual(ranking.position(self.exam.id, 25.0)['out_of'], 4)
+        self.assertEqual(ExamAttemptResultSerializer(attempt).data['ranking'],
+                         {'rank': 4, 'percentile': 0.0, 'out_of': 4})
+
+        self.client.force_login(self.students[1])
+        history = self.client.get('/api/attempts/history/').json()
+        self.assertEqual(history[0]['ranking'], {'rank': 2, 'percentile': 33.3, 'out_of': 4})
+        # A read touches a logarithmic number of nodes, not the exam's results
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(ranking.position(self.exam.id, 100.0), {'rank': 1, 'percentile': 100.0, 'out_of': 4})
+        self.assertEqual(len(queries), 0)
+
+        ExamAttempt.objects.filter(student=self.students[0]).delete()
+        self.assertEqual(ranking.position(self.exam.id, 50.0), {'rank': 1, 'percentile': 50.0, 'out_of': 3})
+
+    def test_rolled_back_scoring_is_not_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            attempt = sit(self.students[0], self.exam, right_first(2))
+        self.assertEqual(ranking.position(self.exam.id, 50.0), {'rank': 1, 'percentile': 0.0, 'out_of': 1})
+
+        # A new result and a regraded one, rolled back with the scoring
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                sit(self.students[1], self.exam, right_first(4))
+                record_attempt(attempt, 4, 4)
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(GradebookEntry.objects.filter(exam=self.exam).count(), 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(ranking.position(self.exam.id, 50.0), {'rank': 1, 'percentile': 0.0, 'out_of': 1})
+        self.assertEqual(len(queries), 0)
+
+        # Committed, the regrade moves the result
+        with self.captureOnCommitCallbacks(execute=True):
+            record_attempt(attempt, 4, 4)
+        self.assertEqual(ranking.position(self.exam.id, 100.0), {'rank': 1, 'percentile': 0.0, 'out_of': 1})
+        self.assertEqual(ranking.position(self.exam.id, 50.0)['rank'], 2)
+
+    def test_rebuilt_after_a_lost_node(self):
+        for student, correct in zip(self.students, (4, 3, 2, 1, 0)):
+            sit(student, self.exam, right_first(correct))
+        expected = ranking.position(self.exam.id, 75.0)
+        self.assertEqual(expected, {'rank': 2, 'percentile': 75.0, 'out_of': 5})
+
+        # A lost node stops increments; the next read rebuilds from the gradebook
+        cache.delete(ranking.node_key(self.exam.id, ranking.bucket(75.0) + 1))
+        ranking.add(self.exam.id, 75.0)
+        self.assertEqual(ranking.position(self.exam.id, 75.0), expected)
+
+        cache.clear()
+        out = StringIO()
+        call_command('rebuild_rankings', stdout=out)
+        self.assertIn('Rebuilt the rankings of 1 exams, 5 results', out.getvalue())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(ranking.position(self.exam.id, 75.0), expected)
+        self.assertEqual(len(queries), 0)
+
+    def test_result_added_during_a_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            sit(self.students[0], self.exam, right_first(4))
+        set_many = cache.set_many
+
+        def scored_meanwhile(*args, **kwargs):
+            # Committed after the rebuild's query, counted before its tree is ready
+            with self.captureOnCommitCallbacks(execute=True):
+                sit(self.students[1], self.exam, right_first(2))
+            return set_many(*args, **kwargs)
+
+        with mock.patch.object(ranking.cache, 'set_many', side_effect=scored_meanwhile):
+            ranking.build([self.exam.id])
+        self.assertIsNone(cache.get(ranking.ready_key(self.exam.id)))
+        self.assertEqual(ranking.position(self.exam.id, 50.0), {'rank': 2, 'percentile': 0.0, 'out_of': 2})
+
+
+@skipUnless(export.pa is not None, "needs pyarrow")
+class ResultsExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.staff = User.objects.create_user(email='export@example.com', password='pass', username='export',
+                                             is_staff=True)
+        cls.students = [
+            User.objects.create_user(email=f'export{i}@example.com', password='pass', username=f'export{i}',
+                                     is_student=True, student_class='SS3')
+            for i in range(2)
+        ]
+        cls.exams = []
+        for title in ('Physics', 'Chemistry'):
+            exam = Exam.objects.create(title=title, duration_minutes=30, is_active=True, pass_mark=50)
+            mc = Question.objects.create(exam=exam, question_text=f'{title} MC', question_type='MC')
+            ms = Question.objects.create(exam=exam, question_text=f'{title} MS', question_type='MS')
+            for question in (mc, ms):
+                Choice.objects.create(question=question, choice_text='right', is_correct=True)
+                Choice.objects.create(question=question, choice_text='wrong')
+            cls.exams.append(exam)
+
+        # Completed in January and February; one attempt still open
+        cls.completed = [
+            cls.sit(cls.students[0], cls.exams[0], timezone.make_aware(timezone.datetime(2026, 1, 10, 9)), 2),
+            cls.sit(cls.students[1], cls.exams[0], timezone.make_aware(timezone.datetime(2026, 2, 3, 9)), 1),
+            cls.sit(cls.students[0], cls.exams[1], timezone.make_aware(timezone.datetime(2026, 2, 4, 9)), 0),
+        ]
+        cls.sit(cls.students[1], cls.exams[1], None, 1)
+
+    @classmethod
+    def sit(cls, student, exam, end_time, correct):
+        attempt = ExamAttempt.objects.create(student=student, exam=exam, question_count=2,
+                                             is_completed=end_time is not None, end_time=end_time)
+        mc, ms = exam.questions.order_by('id')
+        right, wrong = mc.choices.order_by('id')
+        StudentAnswer.objects.create(attempt=attempt, question=mc, chosen_choice=right if correct else wrong,
+                                     is_correct=bool(correct), score=Decimal(bool(correct)))
+        selected = ms.choices.order_by('id').first()
+        StudentAnswer.objects.create(attempt=attempt, question=ms, answer_text=str(selected.id),
+                                     is_correct=correct == 2, score=Decimal(correct == 2))
+        StudentAnswer.objects.create(attempt=attempt, question=ms, chosen_choice=selected, slot=selected.id)
+        return attempt
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def read(self, *path):
+        return export.pq.read_table(os.path.join(self.dir, *path)).to_pylist()
+
+    def test_partitioned_by_month(self):
+        out = StringIO()
+        call_command('export_results', self.dir, '--partition', 'month', stdout=out)
+        self.assertIn('attempts: 3 rows in 2 files', out.getvalue())
+        self.assertIn('answers: 9 rows in 2 files', out.getvalue())
+        self.assertEqual(sorted(os.listdir(os.path.join(self.dir, 'attempts'))), ['month=2026-01', 'month=2026-02'])
+
+        january = self.read('attempts', 'month=2026-01')
+        self.assertEqual(len(january), 1)
+        self.assertEqual({key: january[0][key] for key in ('attempt_id', 'exam_title', 'student_class', 'questions',
+                                                            'correct_answers', 'percentage', 'passed')},
+                         {'attempt_id': self.completed[0].id, 'exam_title': 'Physics', 'student_class': 'SS3',
+                          'questions': 2, 'correct_answers': 2, 'percentage': 100.0, 'passed': True})
+        self.assertEqual(january[0]['end_time'], self.completed[0].end_time)
+
+        table = export.pq.read_table(os.path.join(self.dir, 'answers', 'month=2026-02'))
+        self.assertEqual(str(table.schema.field('chosen_choice').type), 'dictionary<values=string, indices=int32, ordered=0>')
+        self.assertEqual(str(table.schema.field('score').type), 'decimal128(5, 2)')
+        self.assertEqual(sorted(table.column('attempt_id').unique().to_pylist()),
+                         [self.completed[1].id, self.completed[2].id])
+
+    @mock.patch.object(export, 'SETTLE', timedelta(0))
+    def test_incremental(self):
+        call_command('export_results', self.dir, '--exam', str(self.exams[0].id), stdout=StringIO())
+        self.assertEqual(os.listdir(os.path.join(self.dir, 'attempts')), [f'exam={self.exams[0].id}'])
+        with self.assertRaisesMessage(CommandError, 'already holds an export'):
+            call_command('export_results', self.dir, stdout=StringIO())
+
+        # Nothing new: no new files
+        out = StringIO()
+        call_command('export_results', self.dir, '--incremental', stdout=out)
+        self.assertIn('attempts: 0 rows in 0 files', out.getvalue())
+
+        late = self.sit(self.students[1], self.exams[0], timezone.now(), 2)
+        self.sit(self.students[1], self.exams[1], timezone.now(), 2)  # not an exported exam
+        call_command('export_results', self.dir, '--incremental', stdout=StringIO())
+        partition = os.path.join(self.dir, 'attempts', f'exam={self.exams[0].id}')
+        parts = sorted(os.listdir(partition))
+        self.assertEqual(len(parts), 2)
+        self.assertEqual([row['attempt_id'] for row in self.read(partition, parts[1])], [late.id])
+        self.assertEqual(len(self.read('attempts')), 3)
+
+    @mock.patch.object(export, 'BATCH_SIZE', 2)
+    def test_endpoint(self):
+        self.client.force_login(self.staff)
+        response = self.client.get('/api/exports/results/', {'dataset': 'answers'})
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.parquet')
+        parquet = export.pq.ParquetFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(parquet.metadata.num_rows, 9)
+        self.assertGreater(parquet.metadata.num_row_groups, 1)  # written as it streams
+
+        response = self.client.get('/api/exports/results/', {
+            'exam': self.exams[0].id, 'since': '2026-01-31T00:00:00+00:00'
+        })
+        rows = export.pq.read_table(BytesIO(b''.join(response.streaming_content))).to_pylist()
+        self.assertEqual([row['attempt_id'] for row in rows], [self.completed[1].id])
+        self.assertIn('X-Export-Until', response)
+
+        self.assertEqual(self.client.get('/api/exports/results/', {'dataset': 'choices'}).status_code, 400)
+        self.client.force_login(self.students[0])
+        self.assertEqual(self.client.get('/api/exports/results/').status_code, 403)
+
+
+class ItemAnalysisTests(TestCase):
+    """Item analysis from running sums, checked against a direct computation."""
+
+    # Correct (1) or not (0) per student and question
+    RESPONSES = [(1, 1, 1), (1, 1, 0), (1, 0, 0), (0, 0, 0)]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.exam = Exam.objects.create(title='Analysis', duration_minutes=30, is_active=True)
+        cls.questions = []
+        for i in range(3):
+            question = Question.objects.create(exam=cls.exam, question_text=f'Q{i}', question_type='MC')
+            Choice.objects.create(question=question, choice_text='right', is_correct=True)
+            Choice.objects.create(question=question, choice_text='wrong')
+            cls.questions.append(question)
+        cls.students = [
+            get_user_model().objects.create_user(email=f'ia{i}@example.com', password='pass', username=f'ia{i}')
+            for i in range(len(cls.RESPONSES))
+        ]
+        cls.admin = get_user_model().objects.create_superuser(email='ia-admin@example.com', password='pass',
+                                                             username='ia-admin')
+
+    def sit(self, student, responses):
+        sit(student, self.exam, lambda i, question: question.choices.get(is_correct=bool(responses[i])))
+
+    def test_matches_direct_computation(self):
+        self.sit(self.students[0], self.RESPONSES[0])
+        self.sit(self.students[1], self.RESPONSES[1])
+        self.assertEqual(update_item_analysis(self.exam).attempt_count, 2)
+        self.sit(self.students[2], self.RESPONSES[2])
+        self.sit(self.students[3], self.RESPONSES[3])
+
+        self.client.force_login(self.admin)
+        report = self.client.get(f'/api/exams/{self.exam.id}/item-analysis/').json()
+        self.assertEqual(report['attempts'], 4)
+
+        X = np.array(self.RESPONSES, dtype=float)
+        T = X.sum(axis=1)
+        for i, item in enumerate(report['questions']):
+            self.assertAlmostEqual(item['facility'], X[:, i].mean())
+            self.assertAlmostEqual(item['discrimination'], np.corrcoef(X[:, i], T - X[:, i])[0, 1], places=4)
+            right, wrong = item['choices']
+            self.assertAlmostEqual(right['selection_rate'], X[:, i].mean())
+            self.assertAlmostEqual(wrong['selection_rate'], 1 - X[:, i].mean())
+        pq = (X.mean(axis=0) * (1 - X.mean(axis=0))).sum()
+        self.assertAlmostEqual(report['kr20'], 3 / 2 * (1 - pq / T.var()), places=4)
+        self.assertAlmostEqual(report['mean_correct'], 1.5)
+        self.assertEqual([b['count'] for b in report['score_distribution']], [1, 0, 0, 1, 0, 0, 1, 0, 0, 1])
+
+        # Incremental sums equal a rebuild from scratch
+        incremental = ItemAnalysis.objects.get(exam=self.exam).sums
+        self.assertEqual(update_item_analysis(self.exam, rebuild=True).sums, incremental)
+
+    def test_staff_only(self):
+        self.client.force_login(self.students[0])
+        self.assertEqual(self.client.get(f'/api/exams/{self.exam.id}/item-analysis/').status_code, 403)
+
+
+class IrtCalibrationTests(TestCase):
+
+    def test_fit_recovers_parameters(self):
+        rng = np.random.default_rng(3)
+        ability = rng.standard_normal(3000)
+        a, b = rng.lognormal(0, 0.3, 20), rng.normal(0, 1, 20)
+        on_paper = rng.random((3000, 20)) < 0.8
+        correct = (rng.random((3000, 20)) < 1 / (1 + np.exp(-a * (ability[:, None] - b)))) & on_paper
+
+        calibration = fit(correct, on_paper)
+        self.assertTrue(calibration.converged)
+        self.assertEqual(calibration.responses.tolist(), on_paper.sum(axis=0).tolist())
+        self.assertLess(np.sqrt(((calibration.b - b) ** 2).mean()), 0.15)
+        self.assertGreater(np.corrcoef(calibration.a, a)[0, 1], 0.9)
+
+        calibration = fit(correct, on_paper, model='1pl')
+        self.assertEqual(len(set(calibration.a.tolist())), 1)
+        self.assertGreater(np.corrcoef(calibration.b, b)[0, 1], 0.95)
+
+    def test_command_writes_parameters(self):
+        call_command('generate_synthetic_data', stdout=StringIO(), students=150, exams=1, classes=1, answers=1500,
+                     bank_size=10, paper_size=10, in_progress=0, seed=5)
+        out = StringIO()
+        call_command('calibrate_irt', min_responses=100, stdout=out)
+        self.assertIn('Calibrated 10 questions in 1 exams', out.getvalue())
+
+        questions = Question.objects.all()
+        self.assertFalse(questions.filter(irt_difficulty__isnull=True).exists())
+        difficulty = {
+            level: np.mean([q.irt_difficulty for q in questions if q.difficulty_level == level])
+            for level in {q.difficulty_level for q in questions}
+        }
+        self.assertLess(difficulty['easy'], difficulty['hard'])
+
+        call_command('calibrate_irt', min_responses=1000, stdout=StringIO())
+        self.assertFalse(questions.filter(irt_difficulty__isnull=False).exists())
+
+
+class CollusionDetectionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.exam = Exam.objects.create(title='Collusion', duration_minutes=30, is_active=True)
+        cls.questions = []
+        for i in range(12):
+            question = Question.objects.create(exam=cls.exam, question_text=f'Q{i}', question_type='MC')
+            Choice.objects.create(question=question, choice_text='right', is_correct=True)
+            for text in 'abc':
+                Choice.objects.create(question=question, choice_text=text)
+            cls.questions.append(question)
+
+    def sit(self, username, student_class, choose):
+        """A new student's completed attempt answering question i with its choice choose(i) (0 is right)."""
+        student = get_user_model().objects.create_user(
+            email=f'{username}@example.com', password='pass', username=username, student_class=student_class
+        )
+        return sit(student, self.exam, lambda i, question: question.choices.order_by('id')[choose(i)])
+
+    def test_identical_wrong_answers_are_flagged_within_a_class(self):
+        rng = random.Random(7)
+        for i in range(15):
+            self.sit(f'honest{i}', 'SS1', lambda _: rng.choice([0, 0, 1, 2, 3]))
+        copied = [rng.choice([1, 2, 3]) for _ in self.questions]
+        first = self.sit('copier1', 'SS1', copied.__getitem__)
+        second = self.sit('copier2', 'SS1', copied.__getitem__)
+        self.sit('elsewhere', 'SS2', copied.__getitem__)
+
+        out = StringIO()
+        call_command('detect_collusion', stdout=out)
+        self.assertIn('1 pairs flagged', out.getvalue())
+        flag = CollusionFlag.objects.get()
+        self.assertEqual((flag.first_attempt_id, flag.second_attempt_id), (first.id, second.id))
+        self.assertEqual(flag.student_class, 'SS1')
+        self.assertEqual(flag.identical_wrong, flag.both_wrong)
+        self.assertEqual(flag.identical_wrong, len(self.questions))
+        self.assertLess(flag.expected_identical_wrong, flag.identical_wrong / 2)
+
+        # Reviewed flags survive a rerun, unreviewed ones are replaced
+        flag.reviewed, flag.notes = True, 'Seated apart; coincidence.'
+        flag.save()
+        call_command('detect_collusion', exam=[self.exam.id], stdout=StringIO())
+        self.assertEqual(list(CollusionFlag.objects.values_list('id', 'reviewed')), [(flag.id, True)])
+
+    def test_attempt_completed_while_encoding(self):
+        early = self.sit('early', 'SS1', lambda i: i % 4)
+        late = self.sit('late', 'SS1', lambda i: i % 4)
+        # `late` is completed between the attempts query and the answers query
+        attempts = ExamAttempt.objects.filter
+        with mock.patch.object(ExamAttempt.objects, 'filter',
+                               lambda *args, **kwargs: attempts(*args, **kwargs).exclude(pk=late.pk)):
+            attempt_ids, _, codes, _, _ = encode_responses(self.exam)
+        self.assertEqual(attempt_ids, [early.id])
+        self.assertEqual(codes.shape, (1, len(self.questions)))
+
+    def test_pair_counts_match_direct_counting(self):
+        rng = np.random.default_rng(44)
+        codes = rng.integers(-1, 6, size=(40, 30)).astype(np.int32)
+        codes[codes > 0] += (np.nonzero(codes > 0)[1] * 5).astype(np.int32)  # codes are per question
+        codes[0, 0] = 1000  # given once: no column of its own
+        pi = rng.uniform(0, 0.5, size=30)
+        pairs = score_pairs(codes, pi, z_threshold=-np.inf, min_identical=0)
+        self.assertEqual(len(pairs), 40 * 39 // 2)
+        for i, j, both_wrong, identical, expected, _ in pairs:
+            wrong = (codes[i] > 0) & (codes[j] > 0)
+            self.assertEqual(both_wrong, wrong.sum())
+            self.assertEqual(identical, (wrong & (codes[i] == codes[j])).sum())
+            self.assertAlmostEqual(expected, pi[wrong].sum(), places=4)
+
+
+class MetricsEndpointTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        student = User.objects.create_user(
+            email='student@example.com', password='pass', username='student', is_student=True
+        )
+        staff = User.objects.create_user(email='staff@example.com', password='pass', username='staff', is_staff=True)
+        cls.student_headers = {'HTTP_AUTHORIZATION': f"Token {Token.objects.create(user=student).key}"}
+        cls.staff_headers = {'HTTP_AUTHORIZATION': f"Token {Token.objects.create(user=staff).key}"}
+        cls.exam = Exam.objects.create(title='Maths', duration_minutes=30, is_active=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get('/api/metrics/', **self.student_headers).status_code, 403)
+
+    def test_routes_are_reported(self):
+        self.client.post(f'/api/exams/{self.exam.id}/start/', **self.student_headers)
+        self.client.post(f'/api/exams/{self.exam.id}/start/', **self.student_headers)
+
+        response = self.client.get('/api/metrics/', **self.staff_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        labels = 'route="start-exam",method="POST"'
+        self.assertRegex(body, rf'cbt_http_requests_total\{{{labels},status="201"\}} \d+')
+        self.assertRegex(body, rf'cbt_http_requests_total\{{{labels},status="200"\}} \d+')
+        self.assertRegex(body, rf'cbt_http_request_duration_seconds_count\{{{labels}\}} [1-9]')
+        self.assertRegex(body, rf'cbt_db_queries_per_request_sum\{{{labels}\}} [1-9]')
+        # The first start missed the exam cache, the second one hit it.
+        self.assertRegex(body, rf'cbt_cache_lookups_total\{{{labels},result="hit"\}} [1-9]')
+        self.assertRegex(body, rf'cbt_cache_lookups_total\{{{labels},result="miss"\}} [1-9]')
+
+
+class ProfilingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        student = User.objects.create_user(
+            email='student@example.com', password='pass', username='student', is_student=True
+        )
+        cls.staff = User.objects.create_user(
+            email='staff@example.com', password='pass', username='staff', is_staff=True
+        )
+        cls.student_headers = {'HTTP_AUTHORIZATION': f"Token {Token.objects.create(user=student).key}"}
+        cls.staff_headers = {'HTTP_AUTHORIZATION': f"Token {Token.objects.create(user=cls.staff).key}"}
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        override = override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.dir, PROFILING_MAX_ARTIFACTS=2)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_off_by_default(self):
+        with override_settings(PROFILING_ENABLED=False):
+            response = self.client.get('/api/exams/available/', HTTP_X_PROFILE='1', **self.staff_headers)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_only_staff_can_ask_for_a_profile(self):
+        response = self.client.get('/api/exams/available/', HTTP_X_PROFILE='1', **self.student_headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+
+    def test_profile_captures_sql_with_origin(self):
+        for mode, suffix in (('1', '.prof'), ('sample', '.folded')):
+            response = self.client.get('/api/exams/available/', HTTP_X_PROFILE=mode, **self.staff_headers)
+            profile_id = response['X-Profile-Id']
+            self.assertTrue(os.path.exists(os.path.join(self.dir, profile_id + suffix)))
+            with open(os.path.join(self.dir, profile_id + '.json')) as fh:
+                meta = json.load(fh)
+            self.assertEqual(meta['route'], 'available-exams')
+            self.assertEqual(meta['sql_count'], len(meta['sql']))
+            self.assertTrue(any('exams/views.py' in frame for query in meta['sql'] for frame in query['stack']))
+
+    def test_ring_is_bounded(self):
+        ids = [
+            self.client.get('/api/exams/available/', HTTP_X_PROFILE='1', **self.staff_headers)['X-Profile-Id']
+            for _ in range(3)
+        ]
+        kept = sorted(name[:-5] for name in os.listdir(self.dir) if name.endswith('.json'))
+        self.assertEqual(kept, ids[1:])
+        self.assertFalse(os.path.exists(os.path.join(self.dir, ids[0] + '.prof')))
+
+    def test_admin_pages(self):
+        profile_id = self.client.get(
+            '/api/exams/available/', HTTP_X_PROFILE='1', **self.staff_headers
+        )['X-Profile-Id']
+        self.assertEqual(self.client.get('/admin/profiles/').status_code, 302)  # login required
+
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get('/admin/profiles/'), profile_id)
+        self.assertContains(self.client.get(f'/admin/profiles/{profile_id}/'), 'SELECT')
+        download = self.client.get(f'/admin/profiles/{profile_id}/download/.prof')
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(self.client.get(f'/admin/profiles/{profile_id}/download/.py').status_code, 404)
+        self.assertEqual(self.client.get('/admin/profiles/..%2Fsettings/').status_code, 404)
+
+
+class SyntheticDataTests(TestCase):
+    OPTIONS = dict(students=30, exams=9, classes=3, answers=600, bank_size=12, paper_size=8,
+                   in_progress=0.2, seed=7, until='2026-01-31', chunk_size=16)
+
+    def generate(self, **options):
+        call_command('generate_synthetic_data', stdout=StringIO(), **{**self.OPTIONS, **options})
+
+    def fingerprint(self):
+        return (
+            list(get_user_model().objects.order_by('student_id').values_list('email', 'student_id', 'student_class')),
+            list(Question.objects.order_by('question_id').values_list('question_id', 'question_type')),
+            list(ExamAttempt.objects.order_by('attempt_id').values_list('attempt_id', 'start_time', 'is_completed')),
+        )
+
+    def test_generated_data_is_consistent(self):
+        self.generate()
+        student = get_user_model().objects.get(email='synth1@example.com')
+        self.assertEqual(student.student_id, 'SYNTH-0000001')
+        self.assertTrue(student.check_password('Synthetic-pass-1'))
+        self.assertEqual(set(Question.objects.values_list('question_type', flat=True)), {'MC', 'TF', 'FB', 'MS'})
+
+        attempts = ExamAttempt.objects.annotate(answer_total=Sum('student_answers__score', filter=Q(student_answers__slot=0)))
+        self.assertAlmostEqual(attempts.count(), 600 / 8, delta=15)
+        for attempt in attempts.select_related('exam', 'student'):
+            self.assertEqual(attempt.exam.student_class, attempt.student.student_class)
+            self.assertEqual(attempt.paper.count(), attempt.question_count)
+            if attempt.is_completed:
+                self.assertEqual(attempt.score, attempt.answer_total or 0)
+        # Every answer is to a question on the attempt's paper
+        self.assertFalse(StudentAnswer.objects.exclude(
+            question__attempt_assignments__attempt=F('attempt')
+        ).exists())
+
+    def test_same_seed_same_data(self):
+        self.generate()
+        first = self.fingerprint()
+        get_user_model().objects.all().delete()
+        Exam.objects.all().delete()
+        self.generate()
+        self.assertEqual(self.fingerprint(), first)
+
+
+class LeanSerializerTests(TestCase):
+    """The lean serializers and the orjson renderer must produce exactly DRF's bytes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = get_user_model().objects.create_user(
+            email='student@example.com', password='pass', username='stüdent', first_name='Adé', last_name='Ọlá',
+            is_student=True
+        )
+        cls.exam = Exam.objects.create(title='Maths \u2028 “mock”', duration_minutes=30, pass_mark=40)
+        cls.mc = Question.objects.create(exam=cls.exam, question_text='2 + 2 = ?\u2029', question_type='MC',
+                                         score_points=Decimal('1.5'))
+        cls.fb = Question.objects.create(exam=cls.exam, question_text='Capital of France', question_type='FB',
+                                         correct_answer='Paris')
+        cls.choices = [Choice.objects.create(question=cls.mc, choice_text=text, is_correct=text == '4')
+                       for text in ('3', '4', 'ñ')]
+        now = timezone.now()
+        cls.attempt = ExamAttempt.objects.create(student=cls.student, exam=cls.exam, question_count=2)
+        ExamAttempt.objects.filter(pk=cls.attempt.pk).update(
+            start_time=now - timedelta(minutes=7, microseconds=123456), end_time=now, score=Decimal('1.5'),
+            is_completed=True
+        )
+        cls.answers = [
+            StudentAnswer.objects.create(attempt=cls.attempt, question=cls.mc, chosen_choice=cls.choices[1],
+                                         answer_text='', is_correct=True, score=Decimal('1.5')),
+            StudentAnswer.objects.create(attempt=cls.attempt, question=cls.fb, answer_text='Lyon'),
+        ]
+        cls.open_attempt = ExamAttempt.objects.create(
+            student=cls.student, exam=Exam.objects.create(title='Empty', duration_minutes=10)
+        )
+
+    def assertSameJSON(self, lean, drf):
+        self.assertEqual(lean, drf)
+        self.assertEqual(FastJSONRenderer().render(lean), JSONRenderer().render(drf))
+
+    def test_question(self):
+        choices = [self.choices[2], self.choices[0], self.choices[1]]
+        for question in (self.mc, self.fb):
+            drf = QuestionSerializer(question).data
+            drf['choices'] = [QuestionSerializer().fields['choices'].child.to_representation(c) for c in choices]
+            self.assertSameJSON(question_data(question, choices), drf)
+
+    def test_student_answer(self):
+        for answer in StudentAnswer.objects.select_related('question', 'chosen_choice'):
+            self.assertSameJSON(student_answer_data(answer), StudentAnswerSerializer(answer).data)
+
+    def test_attempt_result(self):
+        for attempt in ExamAttempt.objects.with_results():
+            self.assertSameJSON(attempt_result_data(attempt), ExamAttemptResultSerializer(attempt).data)
+        for attempt in ExamAttempt.objects.all():
+            self.assertSameJSON(attempt_result_data(attempt), ExamAttemptResultSerializer(attempt).data)
+        context = {'correct_answers': 1, 'total_questions': 3}
+        self.assertSameJSON(attempt_result_data(self.attempt, **context),
+                            ExamAttemptResultSerializer(self.attempt, context=context).data)
+
+    def test_history_endpoint(self):
+        self.client.force_login(self.student)
+        response = self.client.get('/api/attempts/history/')
+        expected = ExamAttemptResultSerializer(
+            ExamAttempt.objects.with_results().filter(is_completed=True), many=True
+        ).data
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+    def test_renderer_matches_drf(self):
+        data = {
+            'when': timezone.now(), 'day': timezone.now().date(), 'amount': Decimal('2.50'), 'id': uuid.uuid4(),
+            'lazy': gettext_lazy('Invalid token.'), 'big': 2 ** 70, 'text': 'line\u2028break ☃', 'nested': [None, 1.5],
+        }
+        for accepted in (None, 'application/json; indent=4'):
+            self.assertEqual(FastJSONRenderer().render(data, accepted), JSONRenderer().render(data, accepted))
+
+    def test_parser_matches_drf(self):
+        for body in (b'{"a": [1, 2.5, "\xc3\xa9"], "b": null}', b'123456789012345678901234567890'):
+            self.assertEqual(FastJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+        for body in (b'{"a": NaN}', b'{"a": ', b''):
+            with self.assertRaises(ParseError) as fast:
+                FastJSONParser().parse(BytesIO(body))
+            with self.assertRaises(ParseError) as drf:
+                JSONParser().parse(BytesIO(body))
+            self.assertEqual(str(fast.exception), str(drf.exception))
+
+
+# The exams API with the async hot path, whatever EXAMS_ASYNC_VIEWS, for the
+# Async*Tests below: their parents' tests, run against async_views.py
+urlpatterns = [path('api/', include(exam_urls.routes(async_hot_path=True)))] + project_urls.urlpatterns
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncStartOrResumeTests(StartOrResumeTests):
+
+    def test_served_by_the_async_view(self):
+        self.assertIs(resolve(f'/api/exams/{self.exam.id}/start/').func.view_class, AsyncStartExamView)
+
+    def test_exam_without_questions(self):
+        empty = Exam.objects.create(title='Empty', duration_minutes=30, is_active=True)
+        response = self.client.post(f'/api/exams/{empty.id}/start/', **self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()['total_questions'], response.json()['questions_assigned']), (0, 0))
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncResumeAttemptTests(ResumeAttemptTests):
+    pass
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncAdaptiveExamTests(AdaptiveExamTests):
+    pass
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncOfflineDeliveryTests(OfflineDeliveryTests):
+    pass
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncBufferedIngestTests(BufferedIngestTests):
+    pass
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncTimeOnTaskTests(TimeOnTaskTests):
+    pass
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncLiveProgressTests(LiveProgressTests):
+    pass
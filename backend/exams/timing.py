@@ -0,0 +1,122 @@
+# backend/exams/timing.py
+"""
+Time on task: how long students spend on each question and how often they
+change their answer.
+
+The client sends `time_spent_ms` with every answer: the time the question
+was on screen since its previous answer. Once the answer is saved or
+buffered (after the commit, in the sync view), the answer path adds it to
+one cache counter per (attempt, question), together with the answer count,
+packed into a single integer
+
+    answer_count << 32 | total milliseconds
+
+so recording is one cache add() and incr() and no database write. When the
+attempt is scored, save_answer_times() copies the counters onto the paper
+(AttemptQuestion.time_spent_ms and answer_count) in one UPDATE. Like
+buffered ingest this needs a shared cache (Redis) in production; a lost
+counter only loses timing, never answers.
+
+question_timing() aggregates an exam's completed attempts per question, for
+the question-timing endpoint.
+"""
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Value, When
+
+from .models import AttemptQuestion
+
+TIMING_TIMEOUT = getattr(settings, 'ANSWER_BUFFER_TIMEOUT', 24 * 3600)
+COUNT_SHIFT = 32
+TIME_MASK = (1 << COUNT_SHIFT) - 1
+
+
+def timing_key(attempt_id, question_id):
+    return f"exams:timing:{attempt_id}:{question_id}"
+
+
+def parse_time_spent(value, exam):
+    """The reported time_spent_ms, clamped to the exam's duration; 0 when missing or malformed."""
+    try:
+        milliseconds = int(value)
+    except (TypeError, ValueError):
+        return 0
+    return min(max(milliseconds, 0), exam.duration_minutes * 60000)
+
+
+def record_answer_time(attempt_id, question_id, time_spent_ms):
+    """
+    Count an answer to the question and the time spent on it. Returns True
+    for the question's first answer (see live.count_answered).
+    """
+    key = timing_key(attempt_id, question_id)
+    first = cache.add(key, 0, TIMING_TIMEOUT)
+    try:
+        cache.incr(key, (1 << COUNT_SHIFT) + time_spent_ms)
+    except ValueError:  # expired in between
+        cache.set(key, (1 << COUNT_SHIFT) + time_spent_ms, TIMING_TIMEOUT)
+    return first
+
+
+async def arecord_answer_time(attempt_id, question_id, time_spent_ms):
+    """Async version of record_answer_time()."""
+    key = timing_key(attempt_id, question_id)
+    first = await cache.aadd(key, 0, TIMING_TIMEOUT)
+    try:
+        await cache.aincr(key, (1 << COUNT_SHIFT) + time_spent_ms)
+    except ValueError:
+        await cache.aset(key, (1 << COUNT_SHIFT) + time_spent_ms, TIMING_TIMEOUT)
+    return first
+
+
+def save_answer_times(attempt_id, question_ids):
+    """
+    Write the attempt's timing counters for these questions (the answered
+    ones) to its paper, in one UPDATE. Returns the number of questions with
+    a counter.
+    """
+    keys = {timing_key(attempt_id, question_id): question_id for question_id in question_ids}
+    counters = {keys[key]: packed for key, packed in cache.get_many(list(keys)).items()}
+    if counters:
+        AttemptQuestion.objects.filter(attempt_id=attempt_id, question_id__in=counters).update(
+            time_spent_ms=Case(*(
+                When(question_id=question_id, then=Value(packed & TIME_MASK)) for question_id, packed in counters.items()
+            )),
+            answer_count=Case(*(
+                When(question_id=question_id, then=Value(packed >> COUNT_SHIFT)) for question_id, packed in counters.items()
+            )),
+        )
+    return len(counters)
+
+
+def question_timing(exam):
+    """
+    Per question of the exam, over the completed attempts that answered it:
+    the time spent (mean, median and 90th percentile, in seconds) and how
+    often students changed their answer.
+    """
+    rows = np.array(
+        AttemptQuestion.objects.filter(attempt__exam=exam, attempt__is_completed=True, answer_count__gt=0)
+        .values_list('question_id', 'time_spent_ms', 'answer_count'),
+        dtype=np.int64
+    ).reshape(-1, 3)
+    rows = rows[np.argsort(rows[:, 0], kind='stable')]
+    question_ids, starts = np.unique(rows[:, 0], return_index=True)
+    texts = dict(exam.questions.filter(id__in=question_ids.tolist()).values_list('id', 'question_text'))
+
+    report = []
+    for question_id, group in zip(question_ids.tolist(), np.split(rows, starts[1:])):
+        seconds = group[:, 1] / 1000
+        changes = group[:, 2] - 1
+        report.append({
+            'question_id': question_id,
+            'question_text': texts.get(question_id, ''),
+            'attempts': len(group),
+            'mean_seconds': round(float(seconds.mean()), 1),
+            'median_seconds': round(float(np.median(seconds)), 1),
+            'p90_seconds': round(float(np.percentile(seconds, 90)), 1),
+            'changed_rate': round(float((changes > 0).mean()), 4),
+            'mean_changes': round(float(changes.mean()), 2),
+        })
+    return report
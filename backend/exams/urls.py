@@ -1,25 +1,50 @@
 # backend/exams/urls.py
 
+from django.conf import settings
 from django.urls import path
-from .views import AvailableExamsView, ExamQuestionsView, StartExamView, SubmitAnswerView, SubmitExamView, ExamResultsView, PastExamAttemptsView # Import your views
 
-urlpatterns = [
-    # Student Portal Endpoints
-    path('exams/available/', AvailableExamsView.as_view(), name='available-exams'),
-    path('exams/<int:exam_id>/questions/', ExamQuestionsView.as_view(), name='exam-questions'),
-    path('exams/<int:exam_id>/start/', StartExamView.as_view(), name='start-exam'), # <--- Add this line
-    path('attempts/<int:attempt_id>/submit-answer/', SubmitAnswerView.as_view(), name='submit-answer'), # <--- Add this line
+from . import async_views, views
 
-    # backend/exams/urls.py
+# Async hot path for ASGI deployments (see async_views.py)
+ASYNC_VIEWS = {
+    views.ExamQuestionsView: async_views.AsyncExamQuestionsView,
+    views.LiveProgressView: async_views.AsyncLiveProgressView,
+    views.ResumeAttemptView: async_views.AsyncResumeAttemptView,
+    views.StartExamView: async_views.AsyncStartExamView,
+    views.SubmitAnswerView: async_views.AsyncSubmitAnswerView,
+}
 
-    # backend/exams/urls.py
 
+def routes(async_hot_path=False):
+    """The exams API; with async_hot_path the views in ASYNC_VIEWS are swapped for their async versions."""
+    def view(view_class):
+        return (ASYNC_VIEWS.get(view_class, view_class) if async_hot_path else view_class).as_view()
 
-    # Future Endpoints (Placeholders)
-    path('attempts/<int:attempt_id>/submit/', SubmitExamView.as_view(), name='submit-exam'),
-    path('attempts/<int:pk>/results/', ExamResultsView.as_view(), name='exam-results'),
-    path('attempts/history/', PastExamAttemptsView.as_view(), name='past-attempts-history'),
-]
+    return [
+        # Student Portal Endpoints
+        path('exams/available/', view(views.AvailableExamsView), name='available-exams'),
+        path('dashboard/', view(views.DashboardView), name='student-dashboard'),
+        path('exams/<int:exam_id>/questions/', view(views.ExamQuestionsView), name='exam-questions'),
+        path('exams/<int:exam_id>/start/', view(views.StartExamView), name='start-exam'), # <--- Add this line
+        path('exams/<int:exam_id>/item-analysis/', view(views.ItemAnalysisView), name='item-analysis'),
+        path('exams/<int:exam_id>/question-timing/', view(views.QuestionTimingView), name='question-timing'),
+        path('exams/<int:exam_id>/live/', view(views.LiveProgressView), name='live-progress'),
+        path('exams/<int:exam_id>/statistics/', view(views.ExamStatisticsView), name='exam-statistics'),
+        path('exams/statistics/', view(views.ExamStatisticsOverviewView), name='exam-statistics-overview'),
+        path('gradebook/', view(views.GradebookView), name='gradebook'),
+        path('exports/results/', view(views.ResultsExportView), name='results-export'),
+        path('attempts/<int:attempt_id>/submit-answer/', view(views.SubmitAnswerView), name='submit-answer'), # <--- Add this line
+        path('attempts/<int:attempt_id>/resume/', view(views.ResumeAttemptView), name='resume-attempt'),
+        path('attempts/<int:attempt_id>/sync/', view(views.OfflineSyncView), name='offline-sync'),
+
+        # Future Endpoints (Placeholders)
+        path('attempts/<int:attempt_id>/submit/', view(views.SubmitExamView), name='submit-exam'),
+        path('attempts/<int:pk>/results/', view(views.ExamResultsView), name='exam-results'),
+        path('attempts/history/', view(views.PastExamAttemptsView), name='past-attempts-history'),
+    ]
+
+
+urlpatterns = routes(async_hot_path=settings.EXAMS_ASYNC_VIEWS)
 
 
 
@@ -1,36 +1,185 @@
 # backend/exams/utils.py
+from decimal import Decimal
+
+from django.db.models import Count, Exists, OuterRef, Q
 from django.utils import timezone
 
+from cbt_project.db_routers import replica_reads
+
+from .gradebook import record_attempt
+from .ingest import buffered_ingest, flush_answers
+from .models import Choice, Question, StudentAnswer
+from .timing import save_answer_times
+
+
+def normalize(text):
+    """Normalize text for comparison (remove extra spaces, convert to lowercase)"""
+    if not text:
+        return ""
+    return ' '.join(text.strip().lower().split())
+
+
+def is_attempt_expired(attempt, exam, now=None):
+    """Return True once the attempt has used up the exam's duration."""
+    now = now or timezone.now()
+    elapsed_time = (now - attempt.start_time).total_seconds() / 60
+    return elapsed_time >= exam.duration_minutes
+
+
+def remaining_seconds(attempt, exam, now=None):
+    """Whole seconds left on the attempt's clock (never negative)."""
+    now = now or timezone.now()
+    elapsed = (now - attempt.start_time).total_seconds()
+    return max(0, int(exam.duration_minutes * 60 - elapsed))
+
+
+def saved_answer_rows(attempt):
+    """(question_id, chosen_choice_id, answer_text) of every answered question (slot 0 rows)."""
+    return attempt.student_answers.filter(slot=0).values_list('question_id', 'chosen_choice_id', 'answer_text')
+
+
+def get_assigned_question(attempt, question_id):
+    """
+    Return the question if it is on the attempt's paper, else None.
+    One indexed join on AttemptQuestion (attempt, question).
+    """
+    try:
+        return Question.objects.filter(
+            id=question_id,
+            exam_id=attempt.exam_id,
+            attempt_assignments__attempt=attempt
+        ).first()
+    except (TypeError, ValueError):
+        return None
+
+
+def grade_fill_in_blank(question, answer_text):
+    """Return (is_correct, score) for a fill-in-the-blank answer."""
+    correct_answer = (question.correct_answer or '').strip().lower()
+    is_correct = normalize(answer_text) == normalize(correct_answer)
+    return is_correct, question.score_points if is_correct else Decimal('0.00')
+
+
+def grade_choice(question, chosen_choice):
+    """Return (is_correct, score) for a multiple choice / true-false answer."""
+    if chosen_choice is None:
+        return False, Decimal('0.00')
+    is_correct = chosen_choice.is_correct
+    return is_correct, question.score_points if is_correct else Decimal('0.00')
+
+
+def parse_selected_choice_ids(answer_text):
+    """Parse the choice IDs of a Multiple Select answer ("3,5,8" or a list)."""
+    if isinstance(answer_text, str) and answer_text:
+        try:
+            return [int(x.strip()) for x in answer_text.split(',') if x.strip().isdigit()]
+        except ValueError:
+            return []
+    elif isinstance(answer_text, list):
+        return [int(x) for x in answer_text if str(x).isdigit()]
+    return []
+
+
+def grade_multiple_select(question, selected_ids, correct_ids):
+    """
+    Return (is_correct, score) for a Multiple Select answer.
+    Score is (correct - incorrect) / total_correct * score_points, minimum 0.
+    """
+    total_correct = len(correct_ids)
+    selected_ids_set = set(selected_ids)
+    correct_selected = len(selected_ids_set & correct_ids)
+    incorrect_selected = len(selected_ids_set - correct_ids)
+
+    raw_score = (correct_selected - incorrect_selected) / total_correct
+    question_score = max(Decimal('0.00'), round(Decimal(str(raw_score)) * question.score_points, 2))
+
+    # Mark as correct only if all correct answers selected and no incorrect ones
+    is_correct = (correct_selected == total_correct and incorrect_selected == 0)
+    return is_correct, question_score
+
+
+def multiple_select_rows(attempt, question, choices, selected_ids):
+    """
+    Grade a Multiple Select answer and build (unsaved) its StudentAnswer rows:
+    one per selected choice plus a summary row (chosen_choice=None) that
+    carries the question score. `choices` are the question's choices.
+    Returns (rows, is_correct, score), or None if the question has no correct choices.
+    """
+    choices = {c.id: c for c in choices}
+    correct_ids = {choice_id for choice_id, c in choices.items() if c.is_correct}
+    if not correct_ids:
+        return None
+
+    is_correct, question_score = grade_multiple_select(question, selected_ids, correct_ids)
+    per_choice_score = question.score_points / len(correct_ids)
+
+    rows = []
+    for choice_id in dict.fromkeys(selected_ids):
+        choice = choices.get(choice_id)
+        if choice is None:
+            continue
+        is_choice_correct = choice.id in correct_ids
+        rows.append(StudentAnswer(
+            attempt=attempt,
+            question=question,
+            chosen_choice=choice,
+            slot=choice.id,
+            is_correct=is_choice_correct,
+            score=round(per_choice_score if is_choice_correct else Decimal('0.00'), 2),
+            answer_text=choice.choice_text
+        ))
+
+    # Also create a summary record with the total score for this MS question
+    rows.append(StudentAnswer(
+        attempt=attempt,
+        question=question,
+        chosen_choice=None,
+        answer_text=','.join(map(str, selected_ids)),
+        is_correct=is_correct,
+        score=question_score
+    ))
+    return rows, is_correct, question_score
+
+
+def save_multiple_select_answer(attempt, question, selected_ids):
+    """
+    Replace the stored Multiple Select answer for a question (see
+    multiple_select_rows). Must run inside a transaction.
+    Returns (is_correct, score), or None if the question has no correct choices.
+    """
+    graded = multiple_select_rows(attempt, question, question.choices.all(), selected_ids)
+    if graded is None:
+        return None
+    rows, is_correct, question_score = graded
+
+    # Clear existing answers for this question in this attempt
+    StudentAnswer.objects.filter(attempt=attempt, question=question).delete()
+    StudentAnswer.objects.bulk_create(rows)
+    return is_correct, question_score
+
 def calculate_and_save_score(attempt):
     """
     Calculate the final score for an exam attempt.
     Updated to work with assigned questions and handle different question types.
     """
-    # Get all student answers for this attempt
-    student_answers = attempt.student_answers.all()
-    
-    # For Multiple Select questions, we only want the summary records (chosen_choice=None)
+    if buffered_ingest():
+        # Answers still in the write-behind buffer count too (see ingest.py)
+        flush_answers(attempt.id)
+
+    # One row per answered question: slot 0 holds the MC/TF/FB answer and the
+    # Multiple Select summary; MS selection rows (slot = choice id) are skipped
     # to avoid double counting
-    ms_summary_answers = student_answers.filter(
-        question__question_type='MS',
-        chosen_choice__isnull=True
-    )
-    
-    # For other question types, get regular answers
-    other_answers = student_answers.filter(
-        question__question_type__in=['MC', 'TF', 'FB']
-    )
-    
-    # Combine both querysets
-    all_relevant_answers = list(ms_summary_answers) + list(other_answers)
-    
+    all_relevant_answers = list(attempt.student_answers.filter(slot=0))
+    # Time on task, from the counters kept during the attempt (see timing.py)
+    save_answer_times(attempt.id, [answer.question_id for answer in all_relevant_answers])
+
     # Calculate totals
     total_score = sum(answer.score for answer in all_relevant_answers)
     correct_answers = sum(1 for answer in all_relevant_answers if answer.is_correct)
     
     # Get total questions assigned to this attempt
-    if attempt.assigned_question_ids:
-        total_questions = len(attempt.assigned_question_ids)
+    if attempt.question_count:
+        total_questions = attempt.question_count
     else:
         # Fallback to all exam questions if no specific assignment
         total_questions = attempt.exam.questions.count()
@@ -39,37 +188,52 @@ def calculate_and_save_score(attempt):
     attempt.score = total_score
     attempt.is_completed = True
     attempt.end_time = timezone.now()
-    attempt.save()
+    attempt.save(update_fields=['score', 'is_completed', 'end_time'])
+    record_attempt(attempt, correct_answers, total_questions)
     
     return attempt, correct_answers, total_questions
 
 
-def get_exam_statistics(exam):
+CHOICE_TYPES = ('MC', 'TF', 'MS')
+
+
+def question_counts(exam_ids=None):
     """
-    Get statistics for an exam including question distribution.
+    {exam id: [row, ...]}: the exams' questions counted per (type, difficulty)
+    in one grouped aggregate, each row also counting the questions without a
+    correct answer (choice questions without a correct choice, Fill-in-the-
+    Blank questions without correct_answer). All exams when exam_ids is None.
     """
-    total_questions = exam.questions.count()
-    questions_to_ask = exam.total_questions_to_ask or total_questions
-    
-    # Question type distribution
-    question_types = exam.questions.values('question_type').distinct()
-    type_counts = {}
-    for q_type in question_types:
-        type_name = q_type['question_type']
-        count = exam.questions.filter(question_type=type_name).count()
-        type_counts[type_name] = count
-    
-    # Difficulty distribution (if using difficulty levels)
-    difficulty_counts = {}
-    difficulties = exam.questions.values('difficulty_level').distinct()
-    for diff in difficulties:
-        diff_name = diff['difficulty_level']
-        count = exam.questions.filter(difficulty_level=diff_name).count()
-        difficulty_counts[diff_name] = count
-    
+    questions = Question.objects.all()
+    if exam_ids is not None:
+        questions = questions.filter(exam_id__in=exam_ids)
+    has_correct_choice = Exists(Choice.objects.filter(question=OuterRef('pk'), is_correct=True))
+    rows = (
+        questions.order_by().values('exam_id', 'question_type', 'difficulty_level')
+        .annotate(
+            questions=Count('id'),
+            no_correct_choice=Count('id', filter=Q(question_type__in=CHOICE_TYPES) & ~has_correct_choice),
+            no_correct_answer=Count('id', filter=Q(question_type='FB') & (
+                Q(correct_answer__isnull=True) | Q(correct_answer='')
+            )),
+        )
+    )
+    counts = {}
+    for row in rows:
+        counts.setdefault(row['exam_id'], []).append(row)
+    return counts
+
+
+def exam_statistics(exam, rows):
+    """get_exam_statistics() from the exam's question_counts() rows."""
+    total_questions = sum(row['questions'] for row in rows)
+    type_counts, difficulty_counts = {}, {}
+    for row in rows:
+        type_counts[row['question_type']] = type_counts.get(row['question_type'], 0) + row['questions']
+        difficulty_counts[row['difficulty_level']] = difficulty_counts.get(row['difficulty_level'], 0) + row['questions']
     return {
         'total_questions_available': total_questions,
-        'questions_to_ask': questions_to_ask,
+        'questions_to_ask': exam.total_questions_to_ask or total_questions,
         'randomization_enabled': exam.randomize_questions,
         'choice_randomization_enabled': exam.randomize_choices,
         'question_type_distribution': type_counts,
@@ -77,47 +241,67 @@ def get_exam_statistics(exam):
     }
 
 
-def validate_exam_configuration(exam):
-    """
-    Validate that an exam is properly configured.
-    Returns a list of warnings/errors.
-    """
+def configuration_issues(exam, rows):
+    """validate_exam_configuration() from the exam's question_counts() rows."""
     issues = []
-    
-    total_questions = exam.questions.count()
-    
+
+    total_questions = sum(row['questions'] for row in rows)
+
     if total_questions == 0:
         issues.append("No questions have been added to this exam.")
         return issues
-    
+
     if exam.total_questions_to_ask and exam.total_questions_to_ask > total_questions:
         issues.append(f"Cannot ask {exam.total_questions_to_ask} questions when only {total_questions} are available.")
-    
+
     # Check if all questions have at least one correct answer (for MC, TF, MS)
-    mc_questions_without_correct = exam.questions.filter(
-        question_type__in=['MC', 'TF', 'MS']
-    ).exclude(
-        choices__is_correct=True
-    ).count()
-    
+    mc_questions_without_correct = sum(row['no_correct_choice'] for row in rows)
     if mc_questions_without_correct > 0:
         issues.append(f"{mc_questions_without_correct} multiple choice/select questions don't have correct answers marked.")
-    
+
     # Check fill-in-blank questions have correct answers
-    fb_questions_without_correct = exam.questions.filter(
-        question_type='FB',
-        correct_answer__isnull=True
-    ).count() + exam.questions.filter(
-        question_type='FB',
-        correct_answer__exact=''
-    ).count()
-    
+    fb_questions_without_correct = sum(row['no_correct_answer'] for row in rows)
     if fb_questions_without_correct > 0:
         issues.append(f"{fb_questions_without_correct} fill-in-blank questions don't have correct answers set.")
-    
+
     return issues
 
 
+def exam_configuration(exams):
+    """
+    Statistics and configuration issues of each exam, for the statistics
+    endpoints: one dict per exam, from a single query.
+    """
+    counts = question_counts([exam.pk for exam in exams])
+    return [
+        {
+            'exam_id': exam.pk,
+            'title': exam.title,
+            **exam_statistics(exam, counts.get(exam.pk, [])),
+            'issues': configuration_issues(exam, counts.get(exam.pk, [])),
+        }
+        for exam in exams
+    ]
+
+
+@replica_reads()
+def get_exam_statistics(exam):
+    """
+    Get statistics for an exam including question distribution.
+    """
+    return exam_statistics(exam, question_counts([exam.pk]).get(exam.pk, []))
+
+
+@replica_reads()
+def validate_exam_configuration(exam):
+    """
+    Validate that an exam is properly configured.
+    Returns a list of warnings/errors.
+    """
+    return configuration_issues(exam, question_counts([exam.pk]).get(exam.pk, []))
+
+
+@replica_reads()
 def preview_student_questions(exam, student_id, limit=5):
     """
     Preview what questions a student would get (for testing/admin purposes).
@@ -2,24 +2,79 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
 from django.db import transaction
-from decimal import Decimal
-
-from .models import Exam, Question, Choice, ExamAttempt, StudentAnswer
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.db.models import Count, Q, prefetch_related_objects
+
+from cbt_project.db_routers import replica_reads
+from cbt_project.fastjson import FastJSONRenderer
+
+from .adaptive import AdaptiveSession
+from .analysis import item_analysis_report, update_item_analysis
+from .export import DATASETS, SETTLE as EXPORT_SETTLE, ExportError, require_pyarrow, stream_dataset
+from .gradebook import class_gradebook, class_overview
+from .caching import (
+    get_dashboard, get_exam, get_gradebook, get_item_bank, get_question_bank, get_statistics, get_statistics_overview,
+    invalidate_dashboard, invalidate_live_roster
+)
+from .models import Exam, Choice, ExamAttempt, StudentAnswer
+from .ingest import buffer_answer, buffered_ingest, flush_answers
+from .live import EventStreamRenderer, count_answered, events
+from .offline import SyncRejected, grade_entries, issue_bundle, latest_entries, save_log, verify_upload
+from .timing import parse_time_spent, question_timing, record_answer_time
 from .serializers import (
-    ExamSerializer, QuestionSerializer, ExamAttemptSerializer,
-    StudentAnswerSerializer, ExamAttemptResultSerializer
+    ExamSerializer, QuestionSerializer, ExamAttemptStartSerializer, ExamStatisticsSerializer,
+    ExamAttemptResultSerializer, attempt_results_data, dashboard_data, question_data, resume_data, student_answer_data
+)
+from .utils import (
+    calculate_and_save_score, exam_configuration, get_assigned_question, grade_choice, grade_fill_in_blank,
+    is_attempt_expired, multiple_select_rows, parse_selected_choice_ids, save_multiple_select_answer,
+    saved_answer_rows
 )
-from .utils import calculate_and_save_score
 
-class AvailableExamsView(generics.ListAPIView):
-    queryset = Exam.objects.filter(is_active=True).order_by('title')
+class ReplicaReadMixin:
+    """Serve GET requests of this view from the read replica (when configured)."""
+
+    def get(self, request, *args, **kwargs):
+        with replica_reads():
+            return super().get(request, *args, **kwargs)
+
+
+class AvailableExamsView(ReplicaReadMixin, generics.ListAPIView):
+    queryset = Exam.objects.filter(is_active=True).annotate(question_total=Count('questions')).order_by('title')
     serializer_class = ExamSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
+class DashboardView(APIView):
+    """
+    Everything the student dashboard shows, in one request: the profile, the
+    active exams for the student's class (each with the student's attempt, if
+    any) and their most recent results. Built from two queries and cached per
+    student (see caching.get_dashboard). Reads go to the primary: a lagging
+    replica would put a stale dashboard in the cache.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, format=None):
+        user = request.user
+        return Response(get_dashboard(user.id, lambda: self.build(user)))
+
+    def build(self, user):
+        exams = Exam.objects.filter(is_active=True).annotate(question_total=Count('questions')).order_by('title')
+        if user.student_class:
+            exams = exams.filter(
+                Q(student_class__isnull=True) | Q(student_class='') | Q(student_class=user.student_class)
+            )
+        # At most one attempt per exam (see start_or_resume), so this is bounded by the number of exams
+        attempts = ExamAttempt.objects.with_results().filter(student=user)
+        return dashboard_data(user, list(exams), list(attempts), settings.DASHBOARD_RECENT_RESULTS)
+
+
 class ExamQuestionsView(generics.ListAPIView):
     serializer_class = QuestionSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -36,43 +91,34 @@ class ExamQuestionsView(generics.ListAPIView):
             is_completed=False
         ).first()
         
-        if attempt and attempt.assigned_question_ids:
-            # Return previously assigned questions for this attempt
-            return attempt.get_assigned_questions()
-        else:
-            # Get questions based on exam settings (randomized or not)
-            questions = exam.get_questions_for_student(student.id)
-            
-            # If there's an active attempt, update it with assigned questions
-            if attempt:
-                attempt.assigned_question_ids = [q.id for q in questions]
-                attempt.save()
-            
-            return questions
+        if attempt:
+            # Return previously assigned questions for this attempt, in paper order
+            questions = attempt.get_paper()
+            if questions:
+                return questions
+
+        # If there's an active attempt without a paper, assign one to it
+        if attempt:
+            attempt.exam = exam
+            paper = exam.pick_questions(get_question_bank(exam), student.id)
+            with transaction.atomic():
+                attempt.question_count = len(paper)
+                attempt.save(update_fields=['question_count'])
+                attempt.assign_questions(paper)
+            return attempt.get_paper()
+
+        # Get questions based on exam settings (randomized or not)
+        questions = exam.get_questions_for_student(student.id)
+        prefetch_related_objects(questions, 'choices')
+        for question in questions:
+            question.paper_choices = question.get_randomized_choices(student.id)
+        return questions
 
     def list(self, request, *args, **kwargs):
-        """Override list to include randomized choices if needed."""
-        queryset = self.get_queryset()
-        student_id = request.user.id
-        
-        # Serialize questions with potentially randomized choices
-        serialized_questions = []
-        for question in queryset:
-            serializer = self.get_serializer(question)
-            question_data = serializer.data
-            
-            # If choices should be randomized, apply randomization
-            if question.question_type in ['MC', 'TF', 'MS'] and question.exam.randomize_choices:
-                randomized_choices = question.get_randomized_choices(student_id)
-                # Update the choices in the serialized data
-                choice_serializer = self.get_serializer().fields['choices'].child
-                question_data['choices'] = [
-                    choice_serializer.to_representation(choice) for choice in randomized_choices
-                ]
-            
-            serialized_questions.append(question_data)
-        
-        return Response(serialized_questions)
+        """Override list to present choices in the order this student sees them."""
+        questions = self.get_queryset()
+        # question_data() is the lean equivalent of QuestionSerializer
+        return Response([question_data(question, question.paper_choices) for question in questions])
 
 
 class StartExamView(APIView):
@@ -80,7 +126,9 @@ class StartExamView(APIView):
 
     @transaction.atomic
     def post(self, request, exam_id, format=None):
-        exam = get_object_or_404(Exam, id=exam_id)
+        exam = get_exam(exam_id)
+        if exam is None:
+            raise Http404("No Exam matches the given query.")
         student = request.user
 
         # ✅ Check if exam is active
@@ -90,64 +138,86 @@ class StartExamView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # ✅ Check for completed attempts FIRST
-        completed_attempt = ExamAttempt.objects.filter(
-            student=student,
-            exam=exam,
-            is_completed=True
-        ).exists()
+        # Start a new attempt or resume the open one in a single statement
+        # (the paper is only written when the attempt is new)
+        paper = exam.pick_questions(get_question_bank(exam), student.id)
+        attempt, created = ExamAttempt.objects.start_or_resume(student, exam, paper)
+        if created:
+            # start_or_resume() sends no post_save (see signals.attempt_changed)
+            transaction.on_commit(lambda: invalidate_dashboard(student.id))
+            transaction.on_commit(lambda: invalidate_live_roster(exam.id))
 
-        if completed_attempt:
+        if attempt is None:
             return Response(
                 {"detail": "You have already completed this exam."},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        attempt.exam = exam
 
-        # ✅ If not completed, check if there's an in-progress attempt
-        existing_attempt = ExamAttempt.objects.filter(
-            student=student,
-            exam=exam,
-            is_completed=False
-        ).first()
+        # 🕒 Handle time expiration
+        if not created and is_attempt_expired(attempt, exam):
+            # Auto-submit
+            attempt, correct, total = calculate_and_save_score(attempt)
+            serializer = ExamAttemptResultSerializer(attempt, context={
+                'correct_answers': correct,
+                'total_questions': total
+            })
+            response_data = serializer.data
+            response_data["detail"] = "Time limit exceeded. Your attempt has been automatically submitted."
+            return Response(response_data, status=status.HTTP_200_OK)
+
+        response_data = ExamAttemptStartSerializer(attempt).data
+        if exam.delivery_mode == 'offline':
+            response_data.update(issue_bundle(attempt, attempt.get_paper()))
+        if not created:
+            # ✅ Continue the in-progress attempt
+            return Response(response_data, status=status.HTTP_200_OK)
 
-        if existing_attempt:
-            # 🕒 Handle time expiration
-            elapsed_time = (timezone.now() - existing_attempt.start_time).total_seconds() / 60
-            if elapsed_time >= exam.duration_minutes:
-                # Auto-submit
-                attempt, correct, total = calculate_and_save_score(existing_attempt)
-                serializer = ExamAttemptResultSerializer(attempt, context={
-                    'correct_answers': correct,
-                    'total_questions': total
-                })
-                response_data = serializer.data
-                response_data["detail"] = "Time limit exceeded. Your attempt has been automatically submitted."
-                return Response(response_data, status=status.HTTP_200_OK)
+        response_data['total_questions'] = len(paper)
+        response_data['message'] = f"Exam started with {len(paper)} questions"
+        
+        return Response(response_data, status=status.HTTP_201_CREATED)
 
-            # ✅ Continue the in-progress attempt
-            serializer = ExamAttemptSerializer(existing_attempt)
-            return Response(serializer.data, status=status.HTTP_200_OK)
 
-        # 🆕 If no completed or in-progress attempt, create a new one
-        # Get the questions that will be assigned to this student
-        assigned_questions = exam.get_questions_for_student(student.id)
-        assigned_question_ids = [q.id for q in assigned_questions]
+class ResumeAttemptView(APIView):
+    """
+    Pick an open attempt back up after a refresh or a dropped connection:
+    the attempt, the time left, the paper and the saved answers in one
+    response (see resume_data), from four queries whatever the paper size.
+    An attempt whose time is up is submitted instead, like in StartExamView.
+    """
+    permission_classes = [permissions.IsAuthenticated]
 
-        new_attempt = ExamAttempt.objects.create(
-            student=student,
-            exam=exam,
-            start_time=timezone.now(),
-            is_completed=False,
-            score=0,
-            assigned_question_ids=assigned_question_ids
+    def get(self, request, attempt_id, format=None):
+        attempt = get_object_or_404(
+            ExamAttempt.objects.select_related('exam', 'student'),
+            id=attempt_id, student=request.user, is_completed=False
         )
-        
-        serializer = ExamAttemptSerializer(new_attempt)
-        response_data = serializer.data
-        response_data['total_questions'] = len(assigned_question_ids)
-        response_data['message'] = f"Exam started with {len(assigned_question_ids)} questions"
-        
-        return Response(response_data, status=status.HTTP_201_CREATED)
+        exam = attempt.exam
+
+        if is_attempt_expired(attempt, exam):
+            with transaction.atomic():
+                attempt, correct, total = calculate_and_save_score(attempt)
+            response_data = ExamAttemptResultSerializer(attempt, context={
+                'correct_answers': correct,
+                'total_questions': total
+            }).data
+            response_data["detail"] = "Time limit exceeded. Your attempt has been automatically submitted."
+            return Response(response_data, status=status.HTTP_200_OK)
+
+        questions = attempt.get_paper()
+        if not questions:
+            # An attempt without a paper gets one, like in ExamQuestionsView
+            paper = exam.pick_questions(get_question_bank(exam), request.user.id)
+            with transaction.atomic():
+                attempt.question_count = len(paper)
+                attempt.save(update_fields=['question_count'])
+                attempt.assign_questions(paper)
+            questions = attempt.get_paper()
+
+        if buffered_ingest():
+            flush_answers(attempt.id, [question.id for question in questions])
+        return Response(resume_data(attempt, questions, saved_answer_rows(attempt)))
 
 
 class SubmitAnswerView(APIView):
@@ -156,151 +226,114 @@ class SubmitAnswerView(APIView):
     @transaction.atomic
     def post(self, request, attempt_id, format=None):
         student = request.user
-        attempt = get_object_or_404(ExamAttempt, id=attempt_id, student=student, is_completed=False)
+        attempt = get_object_or_404(
+            ExamAttempt.objects.select_related('exam'), id=attempt_id, student=student, is_completed=False
+        )
         exam = attempt.exam
+        if exam.delivery_mode == 'offline':
+            # Its answers arrive once, in the signed log (OfflineSyncView)
+            return Response(
+                {"error": "Answers to an offline exam are uploaded with the answer log."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         question_id = request.data.get('question_id')
         chosen_choice_id = request.data.get('chosen_choice_id')
         answer_text = request.data.get('answer_text', '').strip()
 
-        question = None
         chosen_choice = None
-        is_correct = False
-        question_score = Decimal('0.00')
 
-        if question_id:
-            # Ensure the question is in the student's assigned questions
-            if question_id not in attempt.assigned_question_ids:
+        if not question_id:
+            return Response(
+                {"error": "question_id is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Ensure the question is on the student's paper
+        question = get_assigned_question(attempt, question_id)
+        if question is None:
+            return Response(
+                {"error": "This question is not assigned to your attempt."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        session = None
+        if exam.adaptive:
+            session = AdaptiveSession(attempt, get_item_bank(exam))
+            if not session.can_answer(question.id):
                 return Response(
-                    {"error": "This question is not assigned to your attempt."},
+                    {"error": "Adaptive exams take each question once, in the order given."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
-            question = get_object_or_404(Question, id=question_id, exam=exam)
-
-            if question.question_type == 'FB':
-                # Use the correct_answer field from your model
-                correct_answer = (question.correct_answer or '').strip().lower()
-                is_correct = normalize(answer_text) == normalize(correct_answer)
-                if is_correct:
-                    question_score = question.score_points
-
-                student_answer, created = StudentAnswer.objects.get_or_create(
-                    attempt=attempt,
-                    question=question,
-                    defaults={
-                        'chosen_choice': None,
-                        'answer_text': answer_text,
-                        'is_correct': is_correct,
-                        'score': question_score
-                    }
-                )
-                if not created:
-                    student_answer.answer_text = answer_text
-                    student_answer.is_correct = is_correct
-                    student_answer.score = question_score
-                    student_answer.save()
-
-            elif question.question_type == 'MS':
-                # Parse selected IDs from answer_text
-                if isinstance(answer_text, str) and answer_text:
-                    try:
-                        selected_ids = [int(x.strip()) for x in answer_text.split(',') if x.strip().isdigit()]
-                    except ValueError:
-                        selected_ids = []
-                elif isinstance(answer_text, list):
-                    selected_ids = [int(x) for x in answer_text if str(x).isdigit()]
-                else:
-                    selected_ids = []
-
-                # Clear existing answers for this question in this attempt
-                StudentAnswer.objects.filter(attempt=attempt, question=question).delete()
-
-                # Get correct answer IDs
-                correct_ids = set(question.choices.filter(is_correct=True).values_list('id', flat=True))
-                total_correct = len(correct_ids)
-                
-                if total_correct == 0:
-                    return Response(
-                        {"error": "This question has no correct answers defined."}, 
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                selected_ids_set = set(selected_ids)
-                correct_selected = len(selected_ids_set & correct_ids)
-                incorrect_selected = len(selected_ids_set - correct_ids)
-
-                # Calculate score: (correct - incorrect) / total_correct * question_score, minimum 0
-                raw_score = (correct_selected - incorrect_selected) / total_correct
-                question_score = max(Decimal('0.00'), round(Decimal(str(raw_score)) * question.score_points, 2))
-
-                # Mark as correct only if all correct answers selected and no incorrect ones
-                is_correct = (correct_selected == total_correct and incorrect_selected == 0)
-
-                # Create StudentAnswer for each selected choice
-                for choice_id in selected_ids:
-                    try:
-                        choice = Choice.objects.get(id=choice_id, question=question)
-                        is_choice_correct = choice.id in correct_ids
-                        
-                        # Individual score for this choice
-                        individual_score = (question.score_points / total_correct) if is_choice_correct else Decimal('0.00')
-                        
-                        StudentAnswer.objects.create(
-                            attempt=attempt,
-                            question=question,
-                            chosen_choice=choice,
-                            is_correct=is_choice_correct,
-                            score=round(individual_score, 2),
-                            answer_text=choice.choice_text
-                        )
-                    except Choice.DoesNotExist:
-                        continue
-
-                # Also create a summary record with the total score for this MS question
-                StudentAnswer.objects.create(
-                    attempt=attempt,
-                    question=question,
-                    chosen_choice=None,
-                    answer_text=','.join(map(str, selected_ids)),
-                    is_correct=is_correct,
-                    score=question_score
+        # The next adaptive question depends on this answer, so it cannot wait in the buffer
+        buffered = buffered_ingest() and session is None
+        time_spent = parse_time_spent(request.data.get('time_spent_ms'), exam)
+
+        def record_time():
+            # Only for an answer saved or buffered, once its transaction commits
+            if record_answer_time(attempt.id, question.id, time_spent):
+                count_answered(attempt.id)
+
+        if question.question_type == 'MS':
+            selected_ids = parse_selected_choice_ids(answer_text)
+            if buffered:
+                graded = multiple_select_rows(attempt, question, question.choices.all(), selected_ids)
+                if graded is not None:
+                    rows, is_correct, question_score = graded
+                    buffer_answer(attempt.id, question.id, rows)
+            else:
+                graded = save_multiple_select_answer(attempt, question, selected_ids)
+                if graded is not None:
+                    is_correct, question_score = graded
+            if graded is None:
+                return Response(
+                    {"error": "This question has no correct answers defined."},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
+            transaction.on_commit(record_time)
+
+            response_data = {
+                "question_id": question_id,
+                "selected_choices": selected_ids,
+                "score": float(question_score),
+                "is_correct": is_correct,
+                "message": "Multiple select answer saved successfully."
+            }
+            if session is not None:
+                response_data['adaptive'] = session.record(question.id, is_correct)
+            return Response(
+                response_data, status=status.HTTP_202_ACCEPTED if buffered else status.HTTP_201_CREATED
+            )
 
-                return Response({
-                    "question_id": question_id,
-                    "selected_choices": selected_ids,
-                    "score": float(question_score),
-                    "is_correct": is_correct,
-                    "message": "Multiple select answer saved successfully."
-                }, status=status.HTTP_201_CREATED)
-
-            else:  # MC, TF questions
-                if chosen_choice_id:
-                    chosen_choice = get_object_or_404(Choice, id=chosen_choice_id, question=question)
-                    is_correct = chosen_choice.is_correct
-                    question_score = question.score_points if is_correct else Decimal('0.00')
-
-                student_answer, created = StudentAnswer.objects.get_or_create(
-                    attempt=attempt,
-                    question=question,
-                    defaults={
-                        'chosen_choice': chosen_choice,
-                        'answer_text': answer_text,
-                        'is_correct': is_correct,
-                        'score': question_score
-                    }
-                )
-                if not created:
-                    student_answer.chosen_choice = chosen_choice
-                    student_answer.answer_text = answer_text
-                    student_answer.is_correct = is_correct
-                    student_answer.score = question_score
-                    student_answer.save()
+        if question.question_type == 'FB':
+            is_correct, question_score = grade_fill_in_blank(question, answer_text)
+        else:  # MC, TF questions
+            if chosen_choice_id:
+                chosen_choice = get_object_or_404(Choice, id=chosen_choice_id, question=question)
+            is_correct, question_score = grade_choice(question, chosen_choice)
+
+        if buffered:
+            # Acknowledge once buffered; the answer is written in a later batch
+            student_answer = StudentAnswer(
+                attempt=attempt, question=question, chosen_choice=chosen_choice,
+                answer_text=answer_text, is_correct=is_correct, score=question_score
+            )
+            buffer_answer(attempt.id, question.id, [student_answer])
+            response_status = status.HTTP_202_ACCEPTED
+        else:
+            student_answer, created = StudentAnswer.objects.upsert(
+                attempt,
+                question,
+                chosen_choice=chosen_choice,
+                answer_text=answer_text,
+                is_correct=is_correct,
+                score=question_score
+            )
+            response_status = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        transaction.on_commit(record_time)
 
         # Check for timeout after saving
-        elapsed_time = (timezone.now() - attempt.start_time).total_seconds() / 60
-        if elapsed_time >= exam.duration_minutes:
+        if is_attempt_expired(attempt, exam):
             attempt, correct, total = calculate_and_save_score(attempt)
             serializer = ExamAttemptResultSerializer(attempt, context={
                 'correct_answers': correct,
@@ -311,18 +344,10 @@ class SubmitAnswerView(APIView):
                 "result": serializer.data
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        if question.question_type != 'MS':
-            serializer = StudentAnswerSerializer(student_answer)
-            return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
-        else:
-            return Response({"message": "Answer saved successfully."}, status=status.HTTP_201_CREATED)
-
-
-def normalize(text):
-    """Normalize text for comparison (remove extra spaces, convert to lowercase)"""
-    if not text:
-        return ""
-    return ' '.join(text.strip().lower().split())
+        response_data = student_answer_data(student_answer)
+        if session is not None:
+            response_data['adaptive'] = session.record(question.id, is_correct)
+        return Response(response_data, status=response_status)
 
 
 class SubmitExamView(APIView):
@@ -331,7 +356,10 @@ class SubmitExamView(APIView):
     @transaction.atomic
     def post(self, request, attempt_id, format=None):
         student = request.user
-        attempt = get_object_or_404(ExamAttempt, id=attempt_id, student=student, is_completed=False)
+        attempt = get_object_or_404(
+            ExamAttempt.objects.select_related('exam', 'student'),
+            id=attempt_id, student=student, is_completed=False
+        )
         if attempt.is_completed:
             return Response({"detail": "This exam attempt has already been submitted."},
                             status=status.HTTP_400_BAD_REQUEST)
@@ -343,13 +371,190 @@ class SubmitExamView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class ExamResultsView(generics.RetrieveAPIView):
+class OfflineSyncView(APIView):
+    """
+    The one upload of an offline exam: verify the signed answer log, grade
+    it in bulk and submit the attempt in one transaction (see offline.py).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, attempt_id, format=None):
+        attempt = get_object_or_404(ExamAttempt.objects.select_related('exam'), id=attempt_id, student=request.user)
+        try:
+            paper_ids, entries = verify_upload(
+                attempt, request.data, None if attempt.is_completed else timezone.now()
+            )
+        except SyncRejected as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        accepted, rejected = latest_entries(attempt, paper_ids, entries)
+        rows, ungraded = grade_entries(attempt, accepted)
+        with transaction.atomic():
+            # Lock the attempt: a concurrent sync or submit may have completed it
+            if attempt.is_completed or not ExamAttempt.objects.select_for_update().filter(
+                    pk=attempt.pk, is_completed=False).exists():
+                # A retried upload: return the result again
+                response_data = ExamAttemptResultSerializer(ExamAttempt.objects.with_results().get(pk=attempt.pk)).data
+                response_data["detail"] = "This exam attempt has already been submitted."
+                return Response(response_data, status=status.HTTP_200_OK)
+            save_log(attempt, accepted, rows)
+            attempt, correct, total = calculate_and_save_score(attempt)
+
+        response_data = ExamAttemptResultSerializer(attempt, context={
+            'correct_answers': correct,
+            'total_questions': total
+        }).data
+        response_data['accepted_answers'] = len(accepted) - ungraded
+        response_data['rejected_answers'] = rejected + ungraded
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class ItemAnalysisView(APIView):
+    """
+    Staff only: the exam's item analysis (see analysis.py), brought up to
+    date with the attempts completed since the last read.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, exam_id, format=None):
+        exam = get_object_or_404(Exam, id=exam_id)
+        return Response(item_analysis_report(update_item_analysis(exam)))
+
+
+class ExamStatisticsView(APIView):
+    """
+    Staff only: an exam's question distribution and configuration issues
+    (see utils.exam_configuration), cached until its questions change.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, exam_id, format=None):
+        exam = get_object_or_404(Exam, id=exam_id)
+        return Response(get_statistics(
+            exam.id, lambda: ExamStatisticsSerializer(exam_configuration([exam])[0]).data
+        ))
+
+
+class ExamStatisticsOverviewView(APIView):
+    """Staff only: the statistics of every exam, from one query, cached until any exam changes."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, format=None):
+        return Response(get_statistics_overview(
+            lambda: ExamStatisticsSerializer(exam_configuration(list(Exam.objects.order_by('title'))), many=True).data
+        ))
+
+
+class GradebookView(APIView):
+    """
+    Staff only: the class gradebook (see gradebook.py). Without parameters,
+    an overview of every class; with ?student_class=, the class's student x
+    exam grid with ranks, percentiles and per-exam cohort figures,
+    optionally limited to some exams (?exam=<id>, repeatable).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, format=None):
+        student_class = request.query_params.get('student_class')
+        try:
+            exam_ids = [int(exam_id) for exam_id in request.query_params.getlist('exam')] or None
+        except ValueError:
+            return Response({"error": "exam must be an exam id."}, status=status.HTTP_400_BAD_REQUEST)
+        with replica_reads():
+            if student_class is None:
+                return Response({'classes': class_overview()})
+            if exam_ids is not None:
+                return Response(class_gradebook(student_class, exam_ids))
+        # The full grid is cached rendered; it is built from the primary, since a
+        # lagging replica would put stale results in the cache.
+        body = get_gradebook(student_class, lambda: FastJSONRenderer().render(class_gradebook(student_class)))
+        return HttpResponse(body, content_type='application/json')
+
+
+class LiveProgressView(APIView):
+    """
+    Staff only: the live progress of a class sitting the exam (the exam's
+    class, or ?student_class=), as a stream of server-sent events fed from
+    the cache (see live.py).
+    """
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [EventStreamRenderer, FastJSONRenderer]
+
+    def get(self, request, exam_id, format=None):
+        exam = get_exam(exam_id)
+        if exam is None:
+            raise Http404("No Exam matches the given query.")
+        student_class = request.query_params.get('student_class', exam.student_class or '')
+        response = StreamingHttpResponse(events(exam, student_class), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # let nginx pass events through as they come
+        return response
+
+
+class ResultsExportView(APIView):
+    """
+    Staff only: completed attempts (?dataset=attempts, the default) or their
+    answers (?dataset=answers) as one Parquet file, streamed a row group at a
+    time (see export.py). Optionally limited to some exams (?exam=<id>,
+    repeatable) and to the attempts completed after ?since= (ISO 8601). The
+    X-Export-Until header is the `since` of the next incremental download.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, format=None):
+        dataset = request.query_params.get('dataset', 'attempts')
+        if dataset not in DATASETS:
+            return Response({"error": f"dataset must be one of {', '.join(DATASETS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            exam_ids = [int(exam_id) for exam_id in request.query_params.getlist('exam')] or None
+        except ValueError:
+            return Response({"error": "exam must be an exam id."}, status=status.HTTP_400_BAD_REQUEST)
+        since = request.query_params.get('since')
+        if since is not None:
+            since = parse_datetime(since)
+            if since is None:
+                return Response({"error": "since must be an ISO 8601 date and time."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        try:
+            require_pyarrow()
+        except ExportError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        until = timezone.now() - EXPORT_SETTLE
+
+        def content():
+            with replica_reads():
+                yield from stream_dataset(dataset, exam_ids=exam_ids, since=since, until=until)
+
+        response = StreamingHttpResponse(content(), content_type='application/vnd.apache.parquet')
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.parquet"'
+        response['X-Export-Until'] = until.isoformat()
+        return response
+
+
+class QuestionTimingView(APIView):
+    """
+    Staff only: time spent per question and how often answers were changed,
+    over the exam's completed attempts (see timing.py).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, exam_id, format=None):
+        exam = get_object_or_404(Exam, id=exam_id)
+        with replica_reads():
+            return Response({'exam_id': exam.id, 'questions': question_timing(exam)})
+
+
+class ExamResultsView(ReplicaReadMixin, generics.RetrieveAPIView):
     queryset = ExamAttempt.objects.all()
     serializer_class = ExamAttemptResultSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return ExamAttempt.objects.filter(student=self.request.user, is_completed=True)
+        return ExamAttempt.objects.with_results().filter(student=self.request.user, is_completed=True)
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -357,12 +562,20 @@ class ExamResultsView(generics.RetrieveAPIView):
         return Response(serializer.data)
 
 
-class PastExamAttemptsView(generics.ListAPIView):
+class PastExamAttemptsView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = ExamAttemptResultSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return ExamAttempt.objects.filter(
+        return ExamAttempt.objects.with_results().filter(
             student=self.request.user,
             is_completed=True
         ).order_by('-end_time')
+
+    def list(self, request, *args, **kwargs):
+        # attempt_results_data() is the lean equivalent of ExamAttemptResultSerializer
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(attempt_results_data(page))
+        return Response(attempt_results_data(queryset))
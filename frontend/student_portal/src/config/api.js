@@ -44,6 +44,7 @@ export const API_CONFIG = {
     // Exam Attempt Endpoints
     ATTEMPTS: {
       SUBMIT_ANSWER: (attemptId) => `/api/attempts/${attemptId}/submit-answer/`,
+      RESUME: (attemptId) => `/api/attempts/${attemptId}/resume/`,
       SUBMIT: (attemptId) => `/api/attempts/${attemptId}/submit/`,
       RESULTS: (pk) => `/api/attempts/${pk}/results/`,
       HISTORY: '/api/attempts/history/',
@@ -61,7 +62,7 @@ export const API_CONFIG = {
     // User Profile Endpoints
     USER: {
       PROFILE: '/api/user/profile/',
-      DASHBOARD: '/api/user/dashboard/',
+      DASHBOARD: '/api/dashboard/',
     }
   }
 };
@@ -192,6 +193,10 @@ export const examAPI = {
   getAvailableExams: () => 
     apiRequest(API_CONFIG.ENDPOINTS.EXAMS.AVAILABLE),
   
+  // Dashboard: profile, available exams with attempt status, recent results
+  getDashboard: () =>
+    apiRequest(API_CONFIG.ENDPOINTS.USER.DASHBOARD),
+  
   // Get exam questions
   getExamQuestions: (examId) => 
     apiRequest(API_CONFIG.ENDPOINTS.EXAMS.QUESTIONS(examId)),
@@ -203,13 +208,14 @@ export const examAPI = {
     }),
   
   // Submit answer
-  submitAnswer: (attemptId, questionId, chosenChoiceId, answerText = '') => 
+  submitAnswer: (attemptId, questionId, chosenChoiceId, answerText = '', timeSpentMs = null) => 
     apiRequest(API_CONFIG.ENDPOINTS.ATTEMPTS.SUBMIT_ANSWER(attemptId), {
       method: 'POST',
       body: JSON.stringify({
         question_id: questionId,
         chosen_choice_id: chosenChoiceId,
-        answer_text: answerText
+        answer_text: answerText,
+        time_spent_ms: timeSpentMs
       })
     }),
   
@@ -219,6 +225,10 @@ export const examAPI = {
       method: 'POST'
     }),
   
+  // Resume an open attempt: attempt, remaining time, paper and saved answers
+  resumeAttempt: (attemptId) =>
+    apiRequest(API_CONFIG.ENDPOINTS.ATTEMPTS.RESUME(attemptId)),
+  
   // Get exam results
   getExamResults: (attemptId) => 
     apiRequest(API_CONFIG.ENDPOINTS.ATTEMPTS.RESULTS(attemptId)),
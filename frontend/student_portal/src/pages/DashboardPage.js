@@ -26,14 +26,11 @@ const DashboardPage = () => {
       setLoading(true);
       setError(null);
 
-      // Fetch available exams and exam history using the new API
-      const [examsResponse, historyResponse] = await Promise.all([
-        examAPI.getAvailableExams(),
-        examAPI.getExamHistory()
-      ]);
+      // Exams (with this student's attempt status) and recent results in one request
+      const dashboard = await examAPI.getDashboard();
 
-      setAvailableExams(examsResponse || []);
-      setExamHistory(historyResponse || []);
+      setAvailableExams(dashboard.exams || []);
+      setExamHistory(dashboard.recent_results || []);
     } catch (err) {
       setError(err.message || 'Failed to load dashboard data');
       console.error('Dashboard fetch error:', err);
@@ -248,11 +245,9 @@ const DashboardPage = () => {
         ) : (
           <div className="exams-grid">
             {filteredExams.map(exam => {
-              // Check if user has attempted this exam
-              const hasAttempted = examHistory.some(attempt => attempt.exam === exam.id);
-              const hasCompleted = examHistory.some(attempt => 
-                attempt.exam === exam.id && attempt.is_completed
-              );
+              // The dashboard tells whether this student has an attempt at the exam
+              const hasAttempted = Boolean(exam.attempt);
+              const hasCompleted = exam.attempt?.status === 'completed';
               
               return (
                 <div key={exam.id} className="exam-card">
@@ -31,6 +31,9 @@ const ExamPage = () => {
   const autoSaveRef = useRef(null);
   const isSubmittedRef = useRef(false);
   const timeWarningShownRef = useRef(false);
+  // Time on task: which question is on screen since when, and time not yet reported per question
+  const shownRef = useRef({ questionId: null, since: 0 });
+  const timeSpentRef = useRef({});
 
   // Initialize exam and start attempt
   useEffect(() => {
@@ -42,11 +45,31 @@ const ExamPage = () => {
     };
   }, [examId]);
 
+  const attemptStorageKey = `exam-attempt-${examId}`;
+
   const initializeExam = async () => {
     try {
       setLoading(true);
       setError(null);
 
+      // After a refresh, pick the open attempt back up in a single request
+      const storedAttemptId = sessionStorage.getItem(attemptStorageKey);
+      if (storedAttemptId) {
+        try {
+          const resumed = await examAPI.resumeAttempt(storedAttemptId);
+          if (resumed.detail?.includes('Time limit exceeded')) {
+            sessionStorage.removeItem(attemptStorageKey);
+            navigate(`/exam-results/${resumed.id}`);
+            return;
+          }
+          applyResume(resumed);
+          return;
+        } catch (err) {
+          // Submitted or unknown attempt: start (or resume) it the usual way
+          sessionStorage.removeItem(attemptStorageKey);
+        }
+      }
+
       // Start the exam attempt - this matches your backend endpoint
       const attemptResponse = await examAPI.startExam(examId);
       
@@ -71,19 +94,10 @@ const ExamPage = () => {
         }
       }
 
-      const attemptData = attemptResponse;
-      setAttempt(attemptData);
-      setExam(attemptData.exam);
-
-      // Fetch questions for this attempt
-      const questionsResponse = await examAPI.getExamQuestions(examId);
-      setQuestions(questionsResponse || []);
+      sessionStorage.setItem(attemptStorageKey, attemptResponse.id);
 
-      // Calculate time remaining based on backend logic
-      calculateTimeRemaining(attemptData);
-
-      // Load any existing answers (initialize empty for now)
-      initializeAnswers(questionsResponse || []);
+      // Fetch the paper, saved answers and time left for this attempt
+      applyResume(await examAPI.resumeAttempt(attemptResponse.id));
 
     } catch (err) {
       console.error('Initialize exam error:', err);
@@ -99,18 +113,37 @@ const ExamPage = () => {
     }
   };
 
+  const applyResume = (resumeData) => {
+    // The server's remaining time is authoritative (the client clock may be off)
+    const attemptData = {
+      ...resumeData.attempt,
+      remaining_seconds: resumeData.remaining_seconds,
+      loadedAt: new Date(),
+    };
+    setAttempt(attemptData);
+    setExam(attemptData.exam);
+    setQuestions(resumeData.questions || []);
+    initializeAnswers(resumeData.questions || [], resumeData.answers || []);
+  };
+
   const calculateTimeRemaining = (attemptData) => {
-    // Parse the start_time from backend (ISO string)
-    const startTime = new Date(attemptData.start_time);
-    const now = new Date();
-    
-    // Calculate elapsed time in minutes (matching backend logic)
-    const elapsedMinutes = (now - startTime) / (1000 * 60);
-    const totalDurationMinutes = attemptData.exam_duration || 60;
-    
-    // Calculate remaining time in seconds
-    const remainingMinutes = Math.max(0, totalDurationMinutes - elapsedMinutes);
-    const remainingSeconds = Math.floor(remainingMinutes * 60);
+    let remainingSeconds;
+    if (typeof attemptData.remaining_seconds === 'number') {
+      const elapsedSeconds = (new Date() - (attemptData.loadedAt || new Date())) / 1000;
+      remainingSeconds = Math.max(0, Math.floor(attemptData.remaining_seconds - elapsedSeconds));
+    } else {
+      // Parse the start_time from backend (ISO string)
+      const startTime = new Date(attemptData.start_time);
+      const now = new Date();
+
+      // Calculate elapsed time in minutes (matching backend logic)
+      const elapsedMinutes = (now - startTime) / (1000 * 60);
+      const totalDurationMinutes = attemptData.exam_duration || 60;
+
+      // Calculate remaining time in seconds
+      const remainingMinutes = Math.max(0, totalDurationMinutes - elapsedMinutes);
+      remainingSeconds = Math.floor(remainingMinutes * 60);
+    }
     
     setTimeRemaining(remainingSeconds);
     
@@ -123,7 +156,7 @@ const ExamPage = () => {
     }
   };
 
-  const initializeAnswers = (questionsData) => {
+  const initializeAnswers = (questionsData, savedAnswers = []) => {
     const initialAnswers = {};
     questionsData.forEach(question => {
       if (question.question_type === 'MS') {
@@ -132,6 +165,16 @@ const ExamPage = () => {
         initialAnswers[question.id] = '';
       }
     });
+    // Restore what the student already saved
+    savedAnswers.forEach(answer => {
+      if (answer.selected_choice_ids) {
+        initialAnswers[answer.question_id] = answer.selected_choice_ids;
+      } else if (answer.chosen_choice_id) {
+        initialAnswers[answer.question_id] = answer.chosen_choice_id;
+      } else {
+        initialAnswers[answer.question_id] = answer.answer_text || '';
+      }
+    });
     setAnswers(initialAnswers);
   };
 
@@ -173,6 +216,7 @@ const ExamPage = () => {
     try {
       // Auto-submit the exam using your backend endpoint
       const response = await examAPI.submitExam(attempt.id);
+      sessionStorage.removeItem(attemptStorageKey);
       
       // Navigate to results page
       navigate(`/exam-results/${attempt.id}`);
@@ -193,6 +237,29 @@ const ExamPage = () => {
     }
   }, [attempt, exam]);
 
+  // Bank the time spent on the question being left
+  const shownQuestionId = questions[currentQuestionIndex]?.id;
+  useEffect(() => {
+    const now = Date.now();
+    const shown = shownRef.current;
+    if (shown.questionId !== null) {
+      timeSpentRef.current[shown.questionId] = (timeSpentRef.current[shown.questionId] || 0) + now - shown.since;
+    }
+    shownRef.current = { questionId: shownQuestionId ?? null, since: now };
+  }, [shownQuestionId]);
+
+  // Time spent on a question since its last saved answer; resets the count
+  const takeTimeSpent = (questionId) => {
+    const now = Date.now();
+    let spent = timeSpentRef.current[questionId] || 0;
+    if (shownRef.current.questionId === questionId) {
+      spent += now - shownRef.current.since;
+      shownRef.current.since = now;
+    }
+    timeSpentRef.current[questionId] = 0;
+    return Math.round(spent);
+  };
+
   const handleAnswerChange = (questionId, value) => {
     setAnswers(prev => ({
       ...prev,
@@ -232,8 +299,17 @@ const ExamPage = () => {
       }
 
       // Use the correct API endpoint
-      await examAPI.submitAnswer(attempt.id, questionId, payload.chosen_choice_id, payload.answer_text);
-      
+      const result = await examAPI.submitAnswer(
+        attempt.id, questionId, payload.chosen_choice_id, payload.answer_text, takeTimeSpent(questionId)
+      );
+
+      // Adaptive exams hand out the next question with each answer
+      const next = result?.adaptive?.next_question;
+      if (next) {
+        setQuestions(prev => (prev.some(q => q.id === next.id) ? prev : [...prev, next]));
+        setAnswers(prev => ({ ...prev, [next.id]: next.question_type === 'MS' ? [] : '' }));
+      }
+
     } catch (err) {
       console.error('Save answer error:', err);
       
@@ -261,6 +337,7 @@ const ExamPage = () => {
       }
       
       const response = await examAPI.submitExam(attempt.id);
+      sessionStorage.removeItem(attemptStorageKey);
       navigate(`/exam-results/${attempt.id}`);
     } catch (err) {
       console.error('Submit exam error:', err);